@@ -0,0 +1,23 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from .cache import get_token_user
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Аутентификация по токену с кэшированием пользователя.
+
+    Пользователь по ключу токена берется из кэшей, поэтому большинство
+    запросов аутентифицируется без обращения к базе данных.
+    """
+
+    def authenticate_credentials(self, key):
+        """Пользователь и токен по ключу."""
+        user = get_token_user(key)
+        if user is None:
+            raise AuthenticationFailed(_("Invalid token."))
+        if not user.is_active:
+            raise AuthenticationFailed(_("User inactive or deleted."))
+        return user, Token(key=key, user=user)
@@ -0,0 +1,184 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.authtoken.models import Token
+
+from config.cache import MISSING, LocalCache
+from users.models import Blacklist, Friendship, User
+
+FRIEND_IDS_KEY = "friend_ids:{}"
+BLOCKED_BY_IDS_KEY = "blocked_by_ids:{}"
+AUTH_TOKEN_KEY = "auth_token:{}"
+AUTH_USER_KEY = "auth_user:v2:{}"
+# Поля пользователя в кэше аутентификации: нужные для проверки доступа
+# и геолокации на каждом запросе. Пароль и личные данные не кэшируются
+AUTH_USER_FIELDS = (
+    "id",
+    "email",
+    "is_active",
+    "is_staff",
+    "is_superuser",
+    "is_geoip_allowed",
+)
+
+# Локальные кэши со сроком жизни RELATIONS_LOCAL_CACHE_TTL: сигналы
+# очищают их только в текущем процессе, поэтому в других процессах
+# изменения становятся видны по истечении этого срока
+friend_ids_cache = LocalCache(
+    maxsize=settings.RELATIONS_CACHE_SIZE,
+    ttl=settings.RELATIONS_LOCAL_CACHE_TTL,
+)
+blocked_by_ids_cache = LocalCache(
+    maxsize=settings.RELATIONS_CACHE_SIZE,
+    ttl=settings.RELATIONS_LOCAL_CACHE_TTL,
+)
+# Кэши аутентификации: id пользователя по ключу токена и значения полей
+# пользователя по id
+auth_token_cache = LocalCache(
+    maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_LOCAL_CACHE_TTL
+)
+auth_user_cache = LocalCache(
+    maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_LOCAL_CACHE_TTL
+)
+
+
+def _get_ids(local_cache, key_template, user_id, load):
+    """Множество id из локального кэша, общего кэша или базы данных."""
+    ids = local_cache.get(user_id)
+    if ids is not MISSING:
+        return ids
+    key = key_template.format(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(load(user_id))
+        cache.set(key, ids, settings.RELATIONS_CACHE_TTL)
+    local_cache.set(user_id, ids)
+    return ids
+
+
+def _invalidate_ids(local_cache, key_template, user_ids):
+    """Удаление множеств id пользователей из кэшей."""
+    for user_id in user_ids:
+        local_cache.delete(user_id)
+    cache.delete_many([key_template.format(user_id) for user_id in user_ids])
+
+
+def _load_friend_ids(user_id):
+    """Загрузка id друзей пользователя из базы данных."""
+    return Friendship.objects.filter(initiator_id=user_id).values_list(
+        "friend_id", flat=True
+    )
+
+
+def _load_blocked_by_ids(user_id):
+    """Загрузка id пользователей, заблокировавших пользователя."""
+    return Blacklist.objects.filter(blocked_user_id=user_id).values_list(
+        "user_id", flat=True
+    )
+
+
+def get_friend_ids(user_id):
+    """Множество id друзей пользователя.
+
+    Ищется в локальном кэше процесса, затем в общем кэше Django и только
+    после этого в базе данных.
+    """
+    return _get_ids(
+        friend_ids_cache, FRIEND_IDS_KEY, user_id, _load_friend_ids
+    )
+
+
+def is_friend(user_id, other_user_id):
+    """Проверка дружбы между пользователями."""
+    return other_user_id in get_friend_ids(user_id)
+
+
+def invalidate_friend_ids(*user_ids):
+    """Удаление множеств id друзей пользователей из кэша."""
+    _invalidate_ids(friend_ids_cache, FRIEND_IDS_KEY, user_ids)
+
+
+def get_blocked_by_ids(user_id):
+    """Множество id пользователей, добавивших пользователя в черный список."""
+    return _get_ids(
+        blocked_by_ids_cache, BLOCKED_BY_IDS_KEY, user_id, _load_blocked_by_ids
+    )
+
+
+def is_blocked_by(user_id, other_user_id):
+    """Проверка, что other_user_id добавил user_id в черный список."""
+    return other_user_id in get_blocked_by_ids(user_id)
+
+
+def invalidate_blocked_by_ids(*user_ids):
+    """Удаление множеств id заблокировавших пользователей из кэша."""
+    _invalidate_ids(blocked_by_ids_cache, BLOCKED_BY_IDS_KEY, user_ids)
+
+
+def _get_user_fields():
+    """Имена кэшируемых полей в порядке полей модели (для from_db)."""
+    return [
+        field.attname
+        for field in User._meta.concrete_fields
+        if field.attname in AUTH_USER_FIELDS
+    ]
+
+
+def _cache_user(user):
+    """Сохранение значений полей пользователя в кэшах."""
+    values = tuple(getattr(user, name) for name in _get_user_fields())
+    cache.set(AUTH_USER_KEY.format(user.pk), values, settings.AUTH_CACHE_TTL)
+    auth_user_cache.set(user.pk, values)
+    return values
+
+
+def _get_cached(local_cache, key_template, key):
+    """Значение из локального кэша или из общего кэша Django."""
+    value = local_cache.get(key)
+    if value is not MISSING:
+        return value
+    value = cache.get(key_template.format(key))
+    if value is not None:
+        local_cache.set(key, value)
+    return value
+
+
+def get_token_user(key):
+    """Пользователь по ключу токена или None, если токена нет.
+
+    Ищется в локальном кэше процесса, затем в общем кэше Django и только
+    после этого в базе данных. Каждый раз возвращается новый объект
+    пользователя, поэтому его изменения не попадают в кэш. Загружены
+    только поля AUTH_USER_FIELDS, остальные отложены: они читаются из
+    базы при обращении, а save() записывает только загруженные поля.
+    """
+    user_id = _get_cached(auth_token_cache, AUTH_TOKEN_KEY, key)
+    values = None
+    if user_id is not None:
+        values = _get_cached(auth_user_cache, AUTH_USER_KEY, user_id)
+    if values is None:
+        token = (
+            Token.objects.select_related("user")
+            .only("user", *(f"user__{name}" for name in AUTH_USER_FIELDS))
+            .filter(key=key)
+            .first()
+        )
+        if token is None:
+            return None
+        user_id = token.user_id
+        cache.set(AUTH_TOKEN_KEY.format(key), user_id, settings.AUTH_CACHE_TTL)
+        auth_token_cache.set(key, user_id)
+        values = _cache_user(token.user)
+    return User.from_db(DEFAULT_DB_ALIAS, _get_user_fields(), values)
+
+
+def invalidate_token(key):
+    """Удаление токена из кэшей аутентификации."""
+    auth_token_cache.delete(key)
+    cache.delete(AUTH_TOKEN_KEY.format(key))
+
+
+def invalidate_auth_user(user_id):
+    """Удаление пользователя из кэшей аутентификации."""
+    auth_user_cache.delete(user_id)
+    cache.delete(AUTH_USER_KEY.format(user_id))
@@ -2,12 +2,14 @@ import datetime
 from datetime import date
 
 import django_filters
-from django.db.models import Q
+from django.db.models import Exists, OuterRef, Q
 from django.utils import timezone
 from django_filters import rest_framework as filters
 
-from events.models import Event
-from users.models import Friendship, User
+from events.models import Event, EventMember
+from users.models import User
+
+from .cache import get_friend_ids
 
 
 class UserFilter(filters.FilterSet):
@@ -176,17 +178,15 @@ class EventsFilter(filters.FilterSet):
     def filter_organizer_is_friend(self, queryset, name, value):
         """Метод фильтрации по друзьям-организаторам."""
         if value and self.request.user.is_authenticated:
-            friendships = Friendship.objects.filter(
-                initiator=self.request.user
-            ) | Friendship.objects.filter(friend=self.request.user)
-            friends = []
-            for friendship in friendships:
-                if friendship.initiator == self.request.user:
-                    friends.append(friendship.friend)
-                else:
-                    friends.append(friendship.initiator)
-            friend_ids = [friend.id for friend in friends]
-            return Event.objects.filter(
-                event__user__in=friend_ids, event__is_organizer=True
+            # Exists вместо соединения, чтобы мероприятие с несколькими
+            # друзьями-организаторами не повторялось в выдаче
+            return queryset.filter(
+                Exists(
+                    EventMember.objects.filter(
+                        event=OuterRef("pk"),
+                        is_organizer=True,
+                        user__in=get_friend_ids(self.request.user.id),
+                    )
+                )
             )
         return queryset
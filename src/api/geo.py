@@ -1,91 +1,402 @@
-import http.client
+import ipaddress
+import math
+import re
+import threading
+import time
+from datetime import timedelta
+from functools import lru_cache
 
-from django.contrib.gis.geoip2 import GeoIP2
-from django.core.exceptions import ObjectDoesNotExist
+import numpy as np
+from django.conf import settings
+from django.contrib.gis.geoip2 import GeoIP2, GeoIP2Exception
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
-from geopy.distance import geodesic as gd
-from selenium import webdriver
-from selenium.common.exceptions import TimeoutException
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support import expected_conditions as ec
-from selenium.webdriver.support.ui import WebDriverWait
+from django.utils import timezone
+from geoip2.errors import AddressNotFoundError
+from rest_framework.settings import api_settings
 
-from events.models import EventLocation
-from users.models import UserLocation
+from config.cache import MISSING, LocalCache
+from config.constants import MAX_DISTANCE, MAX_LENGTH_GEOCODE_KEY
+from config.logging import logger
+from config.tasks import run_in_background, run_periodically
+from events.models import Event, EventLocation, GeocodeResult
+from users.models import User, UserLocation
 
-# Адрес сайта "Яндекс.Карты"
-URL_YANDEX_MAPS = "https://yandex.ru/maps"
+from .geocoding import GeocoderUnavailable, get_geocoder
 
+# Средний радиус Земли (км)
+EARTH_RADIUS_KM = 6371.0088
+# Большая полуось (км) и сжатие эллипсоида WGS-84
+WGS84_A = 6378.137
+WGS84_F = 1 / 298.257223563
+# Запас для ограничивающего прямоугольника: расстояния считаются на
+# эллипсоиде, а прямоугольник - на сфере (расхождение до 0,5%)
+BOUNDING_BOX_MARGIN = 1.01
+# Размер пакета при массовой записи геолокаций
+BATCH_SIZE = 1000
 
-def get_geo_event(city, address):
-    """Получение геолокации по Яндекс.Картам."""
-    # Время ожидания
-    delay = 3
-    # Подключение драйвера Google
-    options = Options()
-    options.add_argument("--headless")
-    driver = webdriver.Chrome(options=options)
-    # Переход на сайт
-    driver.get(URL_YANDEX_MAPS)
-    # Поиск формы ввода на сайте
-    elem_search_string = WebDriverWait(driver, delay).until(
-        ec.presence_of_element_located(
-            (By.XPATH, "//input[@class='input__control _bold']")
+
+def _normalize_geocode_part(value):
+    """Нормализация части адреса: регистр, буква ё, пунктуация, пробелы."""
+    value = str(value).casefold().replace("ё", "е")
+    return " ".join(re.sub(r"[\W_]+", " ", value).split())
+
+
+def get_geocode_key(city, address):
+    """Ключ кэша геокодирования по городу и адресу."""
+    key = f"{_normalize_geocode_part(city)}|{_normalize_geocode_part(address)}"
+    return key[:MAX_LENGTH_GEOCODE_KEY]
+
+
+class GeocodeCache:
+    """Кэш результатов геокодирования.
+
+    LRU-кэш в памяти процесса поверх таблицы GeocodeResult. Найденные
+    координаты хранятся бессрочно, ненайденные адреса - GEOCODE_MISS_TTL
+    секунд, после чего геокодер будет опрошен снова.
+    """
+
+    def __init__(self):
+        self.memory = LocalCache(maxsize=settings.GEOCODE_CACHE_SIZE)
+        self.db_hits = 0
+        self.db_misses = 0
+
+    @property
+    def stats(self):
+        """Счетчики попаданий и промахов по уровням кэша."""
+        return {
+            "memory_hits": self.memory.hits,
+            "memory_misses": self.memory.misses,
+            "db_hits": self.db_hits,
+            "db_misses": self.db_misses,
+        }
+
+    @staticmethod
+    def _get_miss_ttl():
+        """Время хранения ненайденного адреса в секундах."""
+        return settings.GEOCODE_MISS_TTL
+
+    def get(self, key):
+        """Координаты по ключу, None для ненайденного адреса или MISSING."""
+        value = self.memory.get(key)
+        if value is not MISSING:
+            return value
+        row = GeocodeResult.objects.filter(key=key).first()
+        if row is not None and row.lat is not None:
+            value = [float(row.lat), float(row.lon)]
+            self.memory.set(key, value, ttl=None)
+            self.db_hits += 1
+            return value
+        if row is not None:
+            expires_at = row.updated_at + timedelta(
+                seconds=self._get_miss_ttl()
+            )
+            if expires_at > timezone.now():
+                ttl = (expires_at - timezone.now()).total_seconds()
+                self.memory.set(key, None, ttl=ttl)
+                self.db_hits += 1
+                return None
+        self.db_misses += 1
+        return MISSING
+
+    def set(self, key, value):
+        """Сохранение результата геокодирования."""
+        lat, lon = value if value else (None, None)
+        GeocodeResult.objects.update_or_create(
+            key=key, defaults={"lat": lat, "lon": lon}
         )
+        ttl = None if value else self._get_miss_ttl()
+        self.memory.set(key, value, ttl=ttl)
+
+
+geocode_cache = GeocodeCache()
+
+
+def get_geo_event(city, address):
+    """Получение геолокации адреса с кэшированием результатов.
+
+    Если геокодер недоступен, возвращается None без кэширования, чтобы
+    адрес был геокодирован при следующем обращении.
+    """
+    key = get_geocode_key(city, address)
+    data = geocode_cache.get(key)
+    if data is MISSING:
+        try:
+            data = get_geocoder().geocode(city, address)
+        except GeocoderUnavailable as e:
+            logger.warning(f"Геокодер недоступен: {e}")
+            return None
+        geocode_cache.set(key, data)
+    return data
+
+
+def get_max_distance(query_params):
+    """Получение максимального расстояния поиска из параметров запроса."""
+    search = query_params.get("search")
+    if search:
+        return int(search)
+    return MAX_DISTANCE
+
+
+def get_bounding_box(lat, lon, radius_km):
+    """Ограничивающий прямоугольник для окружности вокруг точки.
+
+    Возвращает кортеж (min_lat, max_lat, min_lon, max_lon). Если окружность
+    захватывает полюс, долгота не ограничивается. Если min_lon > max_lon,
+    прямоугольник пересекает 180-й меридиан.
+    """
+    lat, lon = float(lat), float(lon)
+    angle = radius_km * BOUNDING_BOX_MARGIN / EARTH_RADIUS_KM
+    delta_lat = math.degrees(angle)
+    min_lat, max_lat = lat - delta_lat, lat + delta_lat
+    cos_lat = math.cos(math.radians(lat))
+    if min_lat <= -90 or max_lat >= 90 or math.sin(angle) >= cos_lat:
+        return max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0
+    delta_lon = math.degrees(math.asin(math.sin(angle) / cos_lat))
+    min_lon, max_lon = lon - delta_lon, lon + delta_lon
+    if min_lon < -180:
+        min_lon += 360
+    if max_lon > 180:
+        max_lon -= 360
+    return min_lat, max_lat, min_lon, max_lon
+
+
+def get_bounding_box_filter(lat, lon, radius_km, prefix=""):
+    """Условие отбора координат внутри ограничивающего прямоугольника.
+
+    prefix - путь к полям lat/lon модели геолокации, например
+    "eventlocation__".
+    """
+    min_lat, max_lat, min_lon, max_lon = get_bounding_box(lat, lon, radius_km)
+    condition = Q(**{f"{prefix}lat__range": (min_lat, max_lat)})
+    if min_lon <= max_lon:
+        return condition & Q(**{f"{prefix}lon__range": (min_lon, max_lon)})
+    return condition & (
+        Q(**{f"{prefix}lon__gte": min_lon})
+        | Q(**{f"{prefix}lon__lte": max_lon})
     )
-    # Вписываем данные в форму
-    elem_search_string.send_keys(f"{city}, {address}")
-    # Запускаем поиск
-    elem_search_string.send_keys(Keys.ENTER)
-    # Поиск координат на сайте
-    try:
-        elem_search = WebDriverWait(driver, delay).until(
-            ec.presence_of_element_located(
-                (
-                    By.XPATH,
-                    "//div[@class='toponym-card-title-view__coords-badge']",
-                )
-            )
+
+
+def _get_central_angles(lat1, lon1, lat2, lon2):
+    """Центральные углы между точками (радианы) по формуле гаверсинусов."""
+    h = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+
+def _get_lambert_distances(lat1, lon1, lat2, lon2):
+    """Расстояния (км) на эллипсоиде WGS-84 по формуле Ламберта."""
+    beta1 = np.arctan((1 - WGS84_F) * np.tan(lat1))
+    beta2 = np.arctan((1 - WGS84_F) * np.tan(lat2))
+    sigma = _get_central_angles(beta1, lon1, beta2, lon2)
+    p = (beta1 + beta2) / 2
+    q = (beta2 - beta1) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = (
+            (sigma - np.sin(sigma))
+            * (np.sin(p) * np.cos(q)) ** 2
+            / np.cos(sigma / 2) ** 2
         )
-        # Возврат координат адреса
-        if elem_search.text:
-            return list(map(float, elem_search.text.split(", ")))
-    except TimeoutException:
-        pass
-    return None
+        y = (
+            (sigma + np.sin(sigma))
+            * (np.cos(p) * np.sin(q)) ** 2
+            / np.sin(sigma / 2) ** 2
+        )
+        distances = WGS84_A * (sigma - WGS84_F / 2 * (x + y))
+    # Совпадающие и диаметрально противоположные точки формула Ламберта
+    # не обрабатывает: для них берется расстояние по сфере
+    return np.where(np.isfinite(distances), distances, EARTH_RADIUS_KM * sigma)
 
 
-def get_current_ip():
-    """Получение текущего IP-адреса."""
-    conn = http.client.HTTPConnection("ifconfig.me")
-    conn.request("GET", "/ip")
-    return conn.getresponse().read().decode("utf-8")
+def get_distances(origin, points, accurate=False):
+    """Расстояния (км) от точки origin до каждой из точек points.
 
+    origin - пара (широта, долгота), points - последовательность таких пар
+    или массив формы (N, 2). Координаты могут быть Decimal или float.
 
-def get_geo_ip():
-    """Получение текущей геолокации."""
+    По умолчанию используется формула гаверсинусов на сфере среднего
+    радиуса Земли: относительная погрешность относительно эллипсоида WGS-84
+    не превышает 0,5%. При accurate=True расстояния считаются на эллипсоиде
+    WGS-84 по формуле Ламберта: погрешность не превышает ~10 м на
+    расстояниях до 10 000 км.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    lat1, lon1 = np.radians(np.asarray(origin, dtype=np.float64))
+    lat2, lon2 = np.radians(points[:, 0]), np.radians(points[:, 1])
+    if accurate:
+        return _get_lambert_distances(lat1, lon1, lat2, lon2)
+    return EARTH_RADIUS_KM * _get_central_angles(lat1, lon1, lat2, lon2)
+
+
+def get_distance(origin, point):
+    """Расстояние (км) между двумя точками на эллипсоиде WGS-84."""
+    return round(float(get_distances(origin, [point], accurate=True)[0]), 3)
+
+
+@lru_cache(maxsize=None)
+def get_geoip_reader():
+    """Общий для процесса экземпляр GeoIP2 с базами, отображенными в память."""
+    return GeoIP2(cache=GeoIP2.MODE_MMAP)
+
+
+def get_request_ip(request):
+    """IP-адрес клиента с учетом доверенных прокси.
+
+    Прокси дописывают адрес своего клиента в конец X-Forwarded-For, а
+    начало заголовка задает сам клиент. Поэтому адрес берется из записи,
+    добавленной первым из NUM_PROXIES доверенных прокси (настройка
+    REST_FRAMEWORK). Без прокси заголовок не учитывается. Возвращает
+    None, если адрес некорректен.
+    """
+    num_proxies = api_settings.NUM_PROXIES
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR")
+    if forwarded and num_proxies:
+        addresses = forwarded.split(",")
+        address = addresses[-min(num_proxies, len(addresses))].strip()
+    else:
+        address = request.META.get("REMOTE_ADDR")
     try:
-        g = GeoIP2()
-        address = get_current_ip()
-        return g.city(address)
-    except ObjectDoesNotExist:
+        return ipaddress.ip_address(address)
+    except ValueError:
         return None
 
 
-def save_user_location(user):
-    """Сохранение геолокации пользователя."""
+def get_client_ip(request):
+    """Публичный IP-адрес клиента или None."""
+    ip = get_request_ip(request)
+    return str(ip) if ip is not None and ip.is_global else None
+
+
+geoip_cache = LocalCache(
+    maxsize=settings.GEOIP_CACHE_SIZE, ttl=settings.GEOIP_CACHE_TTL
+)
+
+
+def get_geo_ip(address):
+    """Получение координат [широта, долгота] по IP-адресу."""
+    if not address:
+        return None
+    data = geoip_cache.get(address)
+    if data is not MISSING:
+        return data
+    try:
+        city = get_geoip_reader().city(address)
+    except AddressNotFoundError:
+        city = None
+    except GeoIP2Exception as e:
+        logger.warning(f"Ошибка поиска геолокации по IP {address}: {e}")
+        return None
+    data = None
+    if city and city["latitude"] is not None:
+        data = [city["latitude"], city["longitude"]]
+    geoip_cache.set(address, data)
+    return data
+
+
+class LocationBuffer:
+    """Буфер отложенной записи геолокаций пользователей.
+
+    Новая геолокация не записывается, если пользователь сместился меньше
+    чем на USER_LOCATION_MIN_DISTANCE км или его геолокация обновлялась
+    менее USER_LOCATION_REFRESH_INTERVAL секунд назад. Остальные
+    обновления накапливаются и раз в USER_LOCATION_FLUSH_INTERVAL секунд
+    записываются в базу одним запросом в фоновом потоке.
+    """
+
+    def __init__(self):
+        self.written = LocalCache(maxsize=settings.USER_LOCATION_CACHE_SIZE)
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _is_actual(self, user_id, lat, lon):
+        """Проверка, что сохраненная геолокация не требует обновления."""
+        last = self.written.get(user_id)
+        if last is MISSING:
+            return False
+        last_lat, last_lon, written_at = last
+        if (
+            time.monotonic() - written_at
+            < settings.USER_LOCATION_REFRESH_INTERVAL
+        ):
+            return True
+        distance = get_distances((last_lat, last_lon), [(lat, lon)])[0]
+        return distance < settings.USER_LOCATION_MIN_DISTANCE
+
+    def update(self, user_id, lat, lon):
+        """Добавление геолокации в буфер. Возвращает True, если добавлена."""
+        if self._is_actual(user_id, lat, lon):
+            return False
+        self.written.set(user_id, (lat, lon, time.monotonic()))
+        with self._lock:
+            self._pending[user_id] = (lat, lon)
+        interval = settings.USER_LOCATION_FLUSH_INTERVAL
+        if interval:
+            run_periodically(self.flush, interval)
+        else:
+            self.flush()
+        return True
+
+    def forget(self, user_id):
+        """Удаление пользователя из буфера."""
+        self.written.delete(user_id)
+        with self._lock:
+            self._pending.pop(user_id, None)
+
+    def flush(self):
+        """Запись накопленных геолокаций. Возвращает число записанных.
+
+        Геолокации удаляются из буфера только после успешной записи,
+        чтобы при ошибке базы они были записаны следующим вызовом.
+        """
+        with self._lock:
+            pending = dict(self._pending)
+        if not pending:
+            return 0
+        # Пользователь мог быть удален или запретить геолокацию
+        allowed = set(
+            User.objects.filter(
+                pk__in=pending, is_geoip_allowed=True
+            ).values_list("pk", flat=True)
+        )
+        locations = [
+            UserLocation(user_id=user_id, lat=lat, lon=lon)
+            for user_id, (lat, lon) in pending.items()
+            if user_id in allowed
+        ]
+        UserLocation.objects.bulk_create(
+            locations,
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=["user"],
+            update_fields=["lat", "lon"],
+        )
+        with self._lock:
+            for user_id, location in pending.items():
+                # Более новая геолокация остается до следующей записи
+                if self._pending.get(user_id) == location:
+                    del self._pending[user_id]
+        # Массовая запись не отправляет сигналы, индекс обновляется здесь
+        from .spatial import user_location_index
+
+        for location in locations:
+            user_location_index.add(
+                location.user_id, location.lat, location.lon
+            )
+        return len(locations)
+
+
+location_buffer = LocationBuffer()
+
+
+def save_user_location(request):
+    """Сохранение геолокации пользователя по IP-адресу запроса."""
+    user = request.user
     if user and user.is_authenticated and user.is_geoip_allowed:
-        data = get_geo_ip()
+        data = get_geo_ip(get_client_ip(request))
         if data:
-            values_for_update = {
-                "lon": data["longitude"],
-                "lat": data["latitude"],
-            }
-            UserLocation.objects.update_or_create(
-                user=user, defaults=values_for_update
-            )
+            location_buffer.update(user.id, *data)
 
 
 def get_user_location(user):
@@ -108,15 +419,28 @@ def get_user_distance(user1, user2, location2=None):
             location2 = None
     if data1 and location2:
         return {
-            "distance": round(
-                gd((data1["latitude"], data1["longitude"]), location2).km, 3
+            "distance": get_distance(
+                (data1["latitude"], data1["longitude"]), location2
             )
         }
     return None
 
 
+def geocode_event(event_id, city, address):
+    """Фоновая задача геокодирования мероприятия."""
+    data = get_geo_event(city, address)
+    if data and Event.objects.filter(pk=event_id).exists():
+        EventLocation.objects.update_or_create(
+            event_id=event_id, defaults={"lon": data[1], "lat": data[0]}
+        )
+
+
 def save_event_location(event, validated_data):
-    """Сохранение геолокации мероприятия."""
+    """Постановка мероприятия в очередь на геокодирование.
+
+    Координаты сохраняются в EventLocation фоновой задачей после фиксации
+    транзакции, поэтому запрос не ждет ответа геокодера.
+    """
     if event:
         if "city" in validated_data:
             city = validated_data["city"]
@@ -126,14 +450,8 @@ def save_event_location(event, validated_data):
             address = validated_data["address"]
         else:
             address = event.address
-        data = None
         if city and address:
-            data = get_geo_event(city, address)
-            if data:
-                values_for_update = {"lon": data[1], "lat": data[0]}
-                EventLocation.objects.update_or_create(
-                    event=event, defaults=values_for_update
-                )
+            run_in_background(geocode_event, event.pk, str(city), address)
 
 
 def get_event_location(event):
@@ -156,8 +474,8 @@ def get_event_distance(user, event, location2=None):
             location2 = None
     if data1 and location2:
         return {
-            "distance": round(
-                gd((data1["latitude"], data1["longitude"]), location2).km, 3
+            "distance": get_distance(
+                (data1["latitude"], data1["longitude"]), location2
             )
         }
     return None
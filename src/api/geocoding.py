@@ -0,0 +1,155 @@
+import hashlib
+import queue
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.support import expected_conditions as ec
+from selenium.webdriver.support.ui import WebDriverWait
+
+# Адрес сайта "Яндекс.Карты"
+URL_YANDEX_MAPS = "https://yandex.ru/maps"
+# Элементы страницы с формой поиска и координатами найденного адреса
+XPATH_SEARCH_INPUT = "//input[@class='input__control _bold']"
+XPATH_COORDS_BADGE = "//div[@class='toponym-card-title-view__coords-badge']"
+
+
+class GeocoderUnavailable(Exception):
+    """Геокодер временно недоступен, результат не должен кэшироваться."""
+
+
+class BaseGeocoder:
+    """Базовый класс геокодера.
+
+    Геокодер по городу и адресу возвращает координаты [широта, долгота]
+    или None, если адрес не найден. Если геокодер не может выполнить
+    поиск, вызывается GeocoderUnavailable.
+    """
+
+    def geocode(self, city, address):
+        """Получение координат адреса."""
+        raise NotImplementedError
+
+
+class StubGeocoder(BaseGeocoder):
+    """Офлайн-геокодер для тестов и локальной разработки.
+
+    Не обращается к внешним сервисам и возвращает детерминированные
+    координаты в пределах европейской части России, вычисленные по хэшу
+    адреса.
+    """
+
+    def geocode(self, city, address):
+        """Получение координат адреса."""
+        digest = hashlib.md5(f"{city}, {address}".encode()).digest()
+        lat = 50 + int.from_bytes(digest[:4], "big") / 2**32 * 10
+        lon = 30 + int.from_bytes(digest[4:8], "big") / 2**32 * 20
+        return [round(lat, 6), round(lon, 6)]
+
+
+class SeleniumGeocoder(BaseGeocoder):
+    """Геокодер по Яндекс.Картам через пул headless-браузеров.
+
+    Браузеры создаются по мере необходимости (не более pool_size) и
+    переиспользуются между запросами. Браузер, завершившийся с ошибкой,
+    закрывается и заменяется новым.
+    """
+
+    def __init__(self, pool_size=None, delay=None):
+        self.pool_size = pool_size or settings.GEOCODER_POOL_SIZE
+        self.delay = delay or settings.GEOCODER_TIMEOUT
+        self._drivers = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _create_driver():
+        """Запуск headless-браузера."""
+        options = Options()
+        options.add_argument("--headless")
+        return webdriver.Chrome(options=options)
+
+    def _acquire(self):
+        """Получение свободного браузера из пула."""
+        try:
+            return self._drivers.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_create = self._created < self.pool_size
+            if can_create:
+                self._created += 1
+        if not can_create:
+            return self._drivers.get()
+        try:
+            return self._create_driver()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def _release(self, driver, broken=False):
+        """Возврат браузера в пул."""
+        if not broken:
+            self._drivers.put(driver)
+            return
+        with self._lock:
+            self._created -= 1
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+    def _search(self, driver, city, address):
+        """Поиск координат адреса на Яндекс.Картах."""
+        driver.get(URL_YANDEX_MAPS)
+        # Поиск формы ввода на сайте
+        elem_search_string = WebDriverWait(driver, self.delay).until(
+            ec.presence_of_element_located((By.XPATH, XPATH_SEARCH_INPUT))
+        )
+        # Вписываем данные в форму и запускаем поиск
+        elem_search_string.send_keys(f"{city}, {address}")
+        elem_search_string.send_keys(Keys.ENTER)
+        # Поиск координат на сайте
+        try:
+            elem_search = WebDriverWait(driver, self.delay).until(
+                ec.presence_of_element_located((By.XPATH, XPATH_COORDS_BADGE))
+            )
+            if elem_search.text:
+                return list(map(float, elem_search.text.split(", ")))
+        except TimeoutException:
+            pass
+        return None
+
+    def geocode(self, city, address):
+        """Получение координат адреса."""
+        try:
+            driver = self._acquire()
+        except WebDriverException as e:
+            raise GeocoderUnavailable(f"Ошибка запуска браузера: {e}") from e
+        try:
+            result = self._search(driver, city, address)
+        except WebDriverException as e:
+            self._release(driver, broken=True)
+            raise GeocoderUnavailable(
+                f"Ошибка геокодирования адреса {address}: {e}"
+            ) from e
+        self._release(driver)
+        return result
+
+
+@lru_cache(maxsize=None)
+def _load_geocoder(backend):
+    """Создание экземпляра геокодера по пути к классу."""
+    return import_string(backend)()
+
+
+def get_geocoder():
+    """Геокодер, заданный в настройке GEOCODER_BACKEND."""
+    return _load_geocoder(settings.GEOCODER_BACKEND)
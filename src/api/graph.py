@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+
+EMPTY = np.empty(0, dtype=np.int64)
+
+
+class FriendGraph:
+    """Граф дружбы пользователей в памяти процесса.
+
+    Связи хранятся в разреженном виде CSR: для пользователя из _rows
+    его друзья - срез _indices[_indptr[row]:_indptr[row + 1]]. Изменения
+    после построения накапливаются в множествах добавленных и удаленных
+    связей. Граф полностью перестраивается из базы раз в ttl секунд или
+    когда изменений накопится больше max_delta.
+    """
+
+    def __init__(self, ttl=None, max_delta=None):
+        self._ttl = ttl
+        self._max_delta = max_delta
+        self._lock = threading.RLock()
+        self._clear()
+
+    @property
+    def ttl(self):
+        """Время жизни графа до полной перестройки в секундах."""
+        if self._ttl is not None:
+            return self._ttl
+        return settings.FRIEND_GRAPH_TTL
+
+    @property
+    def max_delta(self):
+        """Число изменений, после которого граф перестраивается."""
+        return self._max_delta or settings.FRIEND_GRAPH_MAX_DELTA
+
+    def _clear(self):
+        """Сброс графа без блокировки."""
+        self._rows = {}
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._indices = EMPTY
+        self._added = defaultdict(set)
+        self._removed = defaultdict(set)
+        self._delta = 0
+        self._built_at = None
+
+    def _is_stale(self):
+        """Проверка необходимости перестройки графа."""
+        if self._built_at is None or self._delta > self.max_delta:
+            return True
+        return bool(self.ttl) and time.monotonic() - self._built_at > self.ttl
+
+    def _ensure_built(self):
+        """Построение графа при первом обращении или по истечении ttl."""
+        if self._is_stale():
+            self.rebuild()
+
+    def rebuild(self):
+        """Полная перестройка графа по таблице Friendship."""
+        from users.models import Friendship
+
+        pairs = np.array(
+            list(Friendship.objects.values_list("initiator_id", "friend_id")),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        edges = np.unique(np.concatenate((pairs, pairs[:, ::-1])), axis=0)
+        users, starts = np.unique(edges[:, 0], return_index=True)
+        with self._lock:
+            self._clear()
+            self._rows = dict(zip(users.tolist(), range(len(users))))
+            self._indptr = np.append(starts, len(edges)).astype(np.int64)
+            self._indices = edges[:, 1].copy()
+            self._built_at = time.monotonic()
+
+    def clear(self):
+        """Очистка графа. Он будет построен заново при следующем запросе."""
+        with self._lock:
+            self._clear()
+
+    def _update(self, user_id, friend_id, added):
+        """Учет добавления или удаления связи в обе стороны."""
+        with self._lock:
+            if self._built_at is None:
+                return
+            for source, target in ((user_id, friend_id), (friend_id, user_id)):
+                if added:
+                    self._removed[source].discard(target)
+                    self._added[source].add(target)
+                else:
+                    self._added[source].discard(target)
+                    self._removed[source].add(target)
+            self._delta += 1
+
+    def add(self, user_id, friend_id):
+        """Добавление дружбы."""
+        self._update(user_id, friend_id, added=True)
+
+    def remove(self, user_id, friend_id):
+        """Удаление дружбы."""
+        self._update(user_id, friend_id, added=False)
+
+    def _get_friends(self, user_id):
+        """Отсортированный массив id друзей пользователя без блокировки."""
+        row = self._rows.get(user_id)
+        if row is None:
+            friends = EMPTY
+        else:
+            start, end = self._indptr[row], self._indptr[row + 1]
+            friends = self._indices[start:end]
+        removed = self._removed.get(user_id)
+        if removed:
+            friends = friends[~np.isin(friends, list(removed))]
+        added = self._added.get(user_id)
+        if not added:
+            return friends
+        return np.union1d(friends, list(added))
+
+    def get_friends(self, user_id):
+        """Массив id друзей пользователя."""
+        self._ensure_built()
+        with self._lock:
+            return self._get_friends(user_id)
+
+    def get_suggestions(self, user_id, limit, exclude=()):
+        """Возможные знакомые пользователя.
+
+        Возвращает до limit пар (user_id, число общих друзей) по убыванию
+        числа общих друзей. Друзья пользователя и пользователи из exclude
+        пропускаются.
+        """
+        self._ensure_built()
+        with self._lock:
+            friends = self._get_friends(user_id)
+            if not len(friends):
+                return []
+            candidates = np.concatenate(
+                [self._get_friends(friend) for friend in friends.tolist()]
+            )
+        user_ids, counts = np.unique(candidates, return_counts=True)
+        mask = ~np.isin(user_ids, friends) & (user_ids != user_id)
+        if exclude:
+            mask &= ~np.isin(user_ids, list(exclude))
+        user_ids, counts = user_ids[mask], counts[mask]
+        order = np.lexsort((user_ids, -counts))[:limit]
+        return list(zip(user_ids[order].tolist(), counts[order].tolist()))
+
+
+friend_graph = FriendGraph()
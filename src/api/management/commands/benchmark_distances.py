@@ -0,0 +1,77 @@
+"""Микробенчмарк пакетного расчета расстояний."""
+
+import time
+
+import numpy as np
+from django.core.management import BaseCommand
+from geopy.distance import geodesic as gd
+
+from api.geo import get_distances
+
+# Точка отсчета - центр Москвы
+ORIGIN = (55.7386, 37.6068)
+
+
+class Command(BaseCommand):
+    """Сравнение get_distances с поштучным расчетом через geopy."""
+
+    help = "Compare batch distance engine with per-pair geopy calls"
+
+    def add_arguments(self, parser):
+        """Добавление аргументов."""
+        parser.add_argument(
+            "--points",
+            nargs="+",
+            type=int,
+            default=[10_000, 1_000_000],
+            help="Number of points in each run",
+        )
+        parser.add_argument(
+            "--geopy-sample",
+            type=int,
+            default=10_000,
+            help="Max number of points measured with geopy, "
+            "larger runs are extrapolated",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Number of repetitions for batch measurements",
+        )
+
+    @staticmethod
+    def _measure(func, repeat):
+        """Лучшее время выполнения функции в секундах."""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    def handle(self, *args, **options):
+        """Handle."""
+        rng = np.random.default_rng(0)
+        for count in options["points"]:
+            points = np.column_stack(
+                (rng.uniform(41, 70, count), rng.uniform(20, 180, count))
+            )
+            haversine = self._measure(
+                lambda: get_distances(ORIGIN, points), options["repeat"]
+            )
+            accurate = self._measure(
+                lambda: get_distances(ORIGIN, points, accurate=True),
+                options["repeat"],
+            )
+            sample = points[: options["geopy_sample"]]
+            geopy = self._measure(
+                lambda: [gd(ORIGIN, point).km for point in sample], 1
+            ) * (count / len(sample))
+            self.stdout.write(
+                f"{count} points: geopy {geopy:.3f}s"
+                f"{' (extrapolated)' if len(sample) < count else ''}, "
+                f"haversine {haversine:.4f}s "
+                f"(x{geopy / haversine:.0f}), "
+                f"accurate {accurate:.4f}s (x{geopy / accurate:.0f})"
+            )
@@ -0,0 +1,178 @@
+"""Бенчмарк сериализации страницы мероприятий на синтетических данных."""
+
+import json
+import time
+
+import numpy as np
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.querysets import annotate_events
+from api.serializers import EventSerializer
+from events.models import Event, EventMember
+from users.models import User
+
+BATCH_SIZE = 10_000
+
+
+class Command(BaseCommand):
+    """Сравнение числа запросов и задержки списка мероприятий.
+
+    Режим before сериализует мероприятия без подготовки queryset, как
+    раньше: участники, их число, организатор и участие текущего
+    пользователя загружаются отдельными запросами для каждого
+    мероприятия. Режим after использует annotate_events.
+    """
+
+    help = (
+        "Benchmark event page serialization with and without annotated "
+        "queryset on synthetic events and members, write results as JSON"
+    )
+
+    def add_arguments(self, parser):
+        """Добавление аргументов."""
+        parser.add_argument(
+            "--page-sizes",
+            nargs="+",
+            type=int,
+            default=[10, 50, 100],
+            help="Number of events on a page in each run",
+        )
+        parser.add_argument(
+            "--members",
+            type=int,
+            default=50,
+            help="Number of members of each synthetic event",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=20,
+            help="Number of measured requests per mode",
+        )
+        parser.add_argument(
+            "--output",
+            default="benchmark_event_list.json",
+            help="Path of the JSON file with results",
+        )
+
+    @staticmethod
+    def _generate(events, members):
+        """Создание синтетических мероприятий с участниками."""
+        User.objects.bulk_create(
+            (
+                User(
+                    email=f"event-bench-{i}@example.com",
+                    first_name="Бенчмарк",
+                    last_name="Бенчмарк",
+                    password="!",
+                )
+                for i in range(members)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        user_ids = list(
+            User.objects.filter(email__startswith="event-bench-").values_list(
+                "id", flat=True
+            )
+        )
+        Event.objects.bulk_create(
+            (
+                Event(
+                    name=f"event-bench-{i}",
+                    description="Бенчмарк",
+                    event_type="Бенчмарк",
+                )
+                for i in range(events)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        event_ids = Event.objects.filter(
+            name__startswith="event-bench-"
+        ).values_list("id", flat=True)
+        EventMember.objects.bulk_create(
+            (
+                EventMember(
+                    event_id=event_id, user_id=user_id, is_organizer=not i
+                )
+                for event_id in event_ids
+                for i, user_id in enumerate(user_ids)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        return User.objects.get(pk=user_ids[0])
+
+    @staticmethod
+    def _serialize(queryset, request):
+        """Сериализация страницы мероприятий."""
+        return EventSerializer(
+            queryset, many=True, context={"request": request}
+        ).data
+
+    def _run_mode(self, mode, page_size, request, options):
+        """Замер одного режима на странице заданного размера."""
+        queryset = Event.objects.filter(name__startswith="event-bench-")
+        if mode == "after":
+            queryset = annotate_events(queryset, request.user)
+
+        def call():
+            return self._serialize(queryset[:page_size], request)
+
+        timings = []
+        for _ in range(options["requests"]):
+            start = time.perf_counter()
+            call()
+            timings.append(time.perf_counter() - start)
+        with CaptureQueriesContext(connection) as queries:
+            call()
+        timings = np.array(timings) * 1000
+        return {
+            "mode": mode,
+            "page_size": page_size,
+            "p50_ms": round(float(np.percentile(timings, 50)), 3),
+            "p99_ms": round(float(np.percentile(timings, 99)), 3),
+            "queries": len(queries),
+        }
+
+    def handle(self, *args, **options):
+        """Handle."""
+        results = []
+        with transaction.atomic():
+            user = self._generate(
+                max(options["page_sizes"]), options["members"]
+            )
+            request = APIRequestFactory().get("/")
+            force_authenticate(request, user=user)
+            request = Request(request)
+            request.user = user
+            try:
+                for page_size in options["page_sizes"]:
+                    for mode in ("before", "after"):
+                        result = self._run_mode(
+                            mode, page_size, request, options
+                        )
+                        results.append(result)
+                        self.stdout.write(
+                            f"{page_size} events, {mode}: "
+                            f"p50 {result['p50_ms']}ms, "
+                            f"p99 {result['p99_ms']}ms, "
+                            f"{result['queries']} queries"
+                        )
+            finally:
+                transaction.set_rollback(True)
+        report = {
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "members": options["members"],
+            "requests": options["requests"],
+            "results": results,
+        }
+        with open(options["output"], "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(
+            self.style.SUCCESS(f"Results written to {options['output']}")
+        )
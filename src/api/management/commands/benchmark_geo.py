@@ -0,0 +1,231 @@
+"""Бенчмарк геолокационных запросов на синтетических данных."""
+
+import json
+import time
+import tracemalloc
+
+import numpy as np
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.spatial import user_location_index
+from api.views import EventViewSet, MyUserViewSet
+from events.models import Event, EventLocation
+from users.models import User, UserLocation
+
+BATCH_SIZE = 10_000
+# Область генерации координат - европейская часть России
+LAT_RANGE = (41.0, 70.0)
+LON_RANGE = (20.0, 60.0)
+
+SCENARIOS = {
+    "user_distance": (MyUserViewSet, "distance", True),
+    "user_distances": (MyUserViewSet, "distances", False),
+    "user_nearest": (MyUserViewSet, "nearest", False),
+    "event_distance": (EventViewSet, "distance", True),
+    "event_distances": (EventViewSet, "distances", False),
+}
+
+
+class Command(BaseCommand):
+    """Замер задержки, числа запросов и памяти геолокационных API."""
+
+    help = (
+        "Benchmark distance and radius search endpoints on synthetic "
+        "UserLocation/EventLocation datasets and write results as JSON"
+    )
+
+    def add_arguments(self, parser):
+        """Добавление аргументов."""
+        parser.add_argument(
+            "--sizes",
+            nargs="+",
+            type=int,
+            default=[1_000, 100_000, 1_000_000],
+            help="Number of synthetic users and events in each run",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=100,
+            help="Number of measured requests per scenario",
+        )
+        parser.add_argument(
+            "--radius",
+            type=int,
+            default=50,
+            help="Search radius in km for distances endpoints",
+        )
+        parser.add_argument(
+            "--scenarios",
+            nargs="+",
+            choices=SCENARIOS,
+            default=list(SCENARIOS),
+            help="Scenarios to run",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Random seed")
+        parser.add_argument(
+            "--output",
+            default="benchmark_geo.json",
+            help="Path of the JSON file with results",
+        )
+
+    @staticmethod
+    def _generate(size, rng):
+        """Создание синтетических пользователей и мероприятий."""
+        User.objects.bulk_create(
+            (
+                User(
+                    email=f"geo-bench-{i}@example.com",
+                    first_name="Бенчмарк",
+                    last_name="Бенчмарк",
+                    password="!",
+                    is_geoip_allowed=True,
+                )
+                for i in range(size)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        user_ids = list(
+            User.objects.filter(email__startswith="geo-bench-").values_list(
+                "id", flat=True
+            )
+        )
+        Event.objects.bulk_create(
+            (
+                Event(
+                    name=f"geo-bench-{i}",
+                    description="Бенчмарк",
+                    event_type="Бенчмарк",
+                )
+                for i in range(size)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        event_ids = list(
+            Event.objects.filter(name__startswith="geo-bench-").values_list(
+                "id", flat=True
+            )
+        )
+        for model, field, ids in (
+            (UserLocation, "user_id", user_ids),
+            (EventLocation, "event_id", event_ids),
+        ):
+            lats = rng.uniform(*LAT_RANGE, len(ids)).round(6)
+            lons = rng.uniform(*LON_RANGE, len(ids)).round(6)
+            model.objects.bulk_create(
+                (
+                    model(**{field: pk}, lat=lat, lon=lon)
+                    for pk, lat, lon in zip(ids, lats, lons)
+                ),
+                batch_size=BATCH_SIZE,
+            )
+        return user_ids, event_ids
+
+    @staticmethod
+    def _make_request(viewset, action, user, pk, radius):
+        """Вызов действия viewset от имени пользователя."""
+        view = viewset.as_view({"get": action}, detail=pk is not None)
+        request = APIRequestFactory().get(
+            "/", {"search": radius}, HTTP_HOST=settings.ALLOWED_HOSTS[0]
+        )
+        force_authenticate(request, user=user)
+        if pk is None:
+            return view(request)
+        lookup = viewset.lookup_url_kwarg or viewset.lookup_field
+        return view(request, **{lookup: pk})
+
+    def _run_scenario(self, name, users, user_ids, event_ids, rng, options):
+        """Замер одного сценария."""
+        viewset, action, detail = SCENARIOS[name]
+        targets = event_ids if viewset is EventViewSet else user_ids
+
+        def call():
+            user = users[rng.integers(len(users))]
+            pk = targets[rng.integers(len(targets))] if detail else None
+            response = self._make_request(
+                viewset, action, user, pk, options["radius"]
+            )
+            if response.status_code != 200:
+                raise CommandError(
+                    f"{name}: unexpected status {response.status_code}"
+                )
+
+        # Первый запрос строит пространственный индекс
+        start = time.perf_counter()
+        call()
+        warmup = time.perf_counter() - start
+        timings = []
+        for _ in range(options["requests"]):
+            start = time.perf_counter()
+            call()
+            timings.append(time.perf_counter() - start)
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as queries:
+            call()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        timings = np.array(timings) * 1000
+        return {
+            "scenario": name,
+            "warmup_ms": round(warmup * 1000, 3),
+            "p50_ms": round(float(np.percentile(timings, 50)), 3),
+            "p99_ms": round(float(np.percentile(timings, 99)), 3),
+            "mean_ms": round(float(timings.mean()), 3),
+            "queries": len(queries),
+            "peak_memory_kb": round(peak / 1024, 1),
+        }
+
+    def _run_size(self, size, options):
+        """Замер всех сценариев на наборе данных заданного размера."""
+        rng = np.random.default_rng(options["seed"])
+        results = []
+        with transaction.atomic():
+            start = time.perf_counter()
+            user_ids, event_ids = self._generate(size, rng)
+            generated = time.perf_counter() - start
+            self.stdout.write(f"{size}: generated in {generated:.1f}s")
+            users = list(
+                User.objects.filter(id__in=user_ids[: options["requests"] + 1])
+            )
+            user_location_index.clear()
+            try:
+                for name in options["scenarios"]:
+                    result = self._run_scenario(
+                        name, users, user_ids, event_ids, rng, options
+                    )
+                    result["size"] = size
+                    results.append(result)
+                    self.stdout.write(
+                        f"  {name}: p50 {result['p50_ms']}ms, "
+                        f"p99 {result['p99_ms']}ms, "
+                        f"{result['queries']} queries, "
+                        f"peak {result['peak_memory_kb']}KB"
+                    )
+            finally:
+                user_location_index.clear()
+                transaction.set_rollback(True)
+        return results
+
+    def handle(self, *args, **options):
+        """Handle."""
+        results = []
+        for size in options["sizes"]:
+            results.extend(self._run_size(size, options))
+        report = {
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "requests": options["requests"],
+            "radius_km": options["radius"],
+            "seed": options["seed"],
+            "results": results,
+        }
+        with open(options["output"], "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(
+            self.style.SUCCESS(f"Results written to {options['output']}")
+        )
@@ -0,0 +1,19 @@
+"""Пересчет поисковых документов пользователей и мероприятий."""
+
+from django.core.management import BaseCommand
+
+from api.search import event_search_index, user_search_index
+
+
+class Command(BaseCommand):
+    """Command."""
+
+    help = "Rebuild full-text search documents for users and events"
+
+    def handle(self, *args, **options):
+        """Handle."""
+        for index in (user_search_index, event_search_index):
+            index.rebuild()
+            self.stdout.write(
+                self.style.SUCCESS(f"Rebuilt {index.model_label} index")
+            )
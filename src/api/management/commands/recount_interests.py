@@ -0,0 +1,18 @@
+"""Пересчет счетчиков популярности интересов."""
+
+from django.core.management import BaseCommand
+
+from api.services import InterestService
+
+
+class Command(BaseCommand):
+    """Command."""
+
+    help = "Recount Interest.counter from UserInterest rows"
+
+    def handle(self, *args, **options):
+        """Handle."""
+        updated = InterestService.recount_counters()
+        self.stdout.write(
+            self.style.SUCCESS(f"Recounted {updated} interest counters")
+        )
@@ -0,0 +1,183 @@
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+# Меры сходства множеств интересов
+JACCARD = "jaccard"
+OVERLAP = "overlap"
+METRICS = (JACCARD, OVERLAP)
+
+
+class InterestMatrix:
+    """Матрица интересов пользователей в памяти процесса.
+
+    Строка матрицы - пользователь, столбец - интерес, значение True
+    означает, что пользователь выбрал интерес. Сходство пользователя со
+    всеми остальными считается одним векторным проходом по столбцам его
+    интересов. Строка пользователя перечитывается из базы при изменении
+    его интересов, матрица целиком перестраивается раз в ttl секунд.
+    """
+
+    def __init__(self, ttl=None):
+        self._ttl = ttl
+        self._lock = threading.RLock()
+        self._clear()
+
+    @property
+    def ttl(self):
+        """Время жизни матрицы до полной перестройки в секундах."""
+        if self._ttl is not None:
+            return self._ttl
+        return settings.INTEREST_MATRIX_TTL
+
+    def _clear(self):
+        """Сброс матрицы без блокировки."""
+        self._rows = {}
+        self._columns = {}
+        self._user_ids = np.empty(0, dtype=np.int64)
+        self._matrix = np.zeros((0, 0), dtype=bool)
+        self._built_at = None
+
+    def _is_stale(self):
+        """Проверка необходимости перестройки матрицы."""
+        if self._built_at is None:
+            return True
+        return bool(self.ttl) and time.monotonic() - self._built_at > self.ttl
+
+    def _ensure_built(self):
+        """Построение матрицы при первом обращении или по истечении ttl."""
+        if self._is_stale():
+            self.rebuild()
+
+    def _reserve(self, rows, columns):
+        """Увеличение матрицы до нужного размера с запасом."""
+        height, width = self._matrix.shape
+        if rows <= height and columns <= width:
+            return
+        matrix = np.zeros(
+            (max(rows, height * 2), max(columns, width * 2)), dtype=bool
+        )
+        matrix[:height, :width] = self._matrix
+        self._matrix = matrix
+        user_ids = np.zeros(matrix.shape[0], dtype=np.int64)
+        user_ids[: len(self._user_ids)] = self._user_ids
+        self._user_ids = user_ids
+
+    def _get_row(self, user_id):
+        """Номер строки пользователя, новая строка при необходимости."""
+        row = self._rows.get(user_id)
+        if row is None:
+            row = len(self._rows)
+            self._reserve(row + 1, self._matrix.shape[1])
+            self._rows[user_id] = row
+            self._user_ids[row] = user_id
+        return row
+
+    def _get_columns(self, interest_ids):
+        """Номера столбцов интересов, новые столбцы при необходимости."""
+        for interest_id in interest_ids:
+            if interest_id not in self._columns:
+                self._columns[interest_id] = len(self._columns)
+        self._reserve(self._matrix.shape[0], len(self._columns))
+        return [self._columns[interest_id] for interest_id in interest_ids]
+
+    def _set(self, user_id, interest_ids):
+        """Замена интересов пользователя без блокировки."""
+        row = self._get_row(user_id)
+        columns = self._get_columns(interest_ids)
+        self._matrix[row] = False
+        self._matrix[row, columns] = True
+
+    def rebuild(self):
+        """Полная перестройка матрицы по таблице UserInterest."""
+        from users.models import UserInterest
+
+        interests = {}
+        for user_id, interest_id in UserInterest.objects.values_list(
+            "user_id", "interest_id"
+        ).iterator():
+            interests.setdefault(user_id, []).append(interest_id)
+        with self._lock:
+            self._clear()
+            for user_id, interest_ids in interests.items():
+                self._set(user_id, interest_ids)
+            self._built_at = time.monotonic()
+
+    def clear(self):
+        """Очистка матрицы. Она будет построена заново при запросе."""
+        with self._lock:
+            self._clear()
+
+    def reload_user(self, user_id):
+        """Перечитывание интересов пользователя из базы."""
+        from users.models import UserInterest
+
+        if self._built_at is None:
+            return
+        interest_ids = list(
+            UserInterest.objects.filter(user_id=user_id).values_list(
+                "interest_id", flat=True
+            )
+        )
+        with self._lock:
+            if self._built_at is not None:
+                self._set(user_id, interest_ids)
+
+    def _update(self, user_id, interest_ids, value):
+        """Отметка или снятие интересов пользователя в матрице."""
+        with self._lock:
+            if self._built_at is None:
+                return
+            row = self._get_row(user_id)
+            columns = self._get_columns(list(interest_ids))
+            self._matrix[row, columns] = value
+
+    def add(self, user_id, interest_ids):
+        """Добавление интересов пользователя без обращения к базе."""
+        self._update(user_id, interest_ids, True)
+
+    def remove(self, user_id, interest_ids):
+        """Удаление интересов пользователя без обращения к базе."""
+        self._update(user_id, interest_ids, False)
+
+    def get_similar(self, user_id, limit, metric=JACCARD, exclude=()):
+        """Пользователи с похожими интересами.
+
+        Возвращает до limit кортежей (user_id, сходство, число общих
+        интересов) по убыванию сходства. Сходство - мера Жаккара или
+        коэффициент перекрытия множеств интересов.
+        """
+        self._ensure_built()
+        with self._lock:
+            row = self._rows.get(user_id)
+            if row is None:
+                return []
+            matrix = self._matrix[: len(self._rows)]
+            columns = np.flatnonzero(matrix[row])
+            if not len(columns):
+                return []
+            common = matrix[:, columns].sum(axis=1)
+            sizes = matrix.sum(axis=1)
+            user_ids = self._user_ids[: len(self._rows)].copy()
+        mask = common > 0
+        mask[row] = False
+        if exclude:
+            mask &= ~np.isin(user_ids, list(exclude))
+        user_ids, common, sizes = user_ids[mask], common[mask], sizes[mask]
+        if metric == OVERLAP:
+            scores = common / np.minimum(sizes, len(columns))
+        else:
+            scores = common / (sizes + len(columns) - common)
+        order = np.lexsort((user_ids, -common, -scores))[:limit]
+        return list(
+            zip(
+                user_ids[order].tolist(),
+                scores[order].tolist(),
+                common[order].tolist(),
+            )
+        )
+
+
+interest_matrix = InterestMatrix()
@@ -1,4 +1,13 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class MyPagination(PageNumberPagination):
@@ -13,3 +22,252 @@ class EventPagination(PageNumberPagination):
 
     page_size_query_param = "limit"
     page_size = 4
+
+
+class BaseCursorPagination:
+    """Общая часть курсорных пагинаций.
+
+    Курсор - закодированный в base64 JSON-список значений полей
+    сортировки последнего элемента страницы.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "limit"
+    page_size = 20
+    max_page_size = 100
+    invalid_cursor_message = "Некорректный курсор."
+
+    def get_page_size(self, request):
+        """Размер страницы из параметров запроса."""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_position(self, request, size):
+        """Список значений из курсора запроса."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded))
+        except (ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != size:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, *position):
+        """Курсор для позиции."""
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def get_next_link(self, request, position):
+        """Ссылка на страницу после позиции."""
+        if position is None:
+            return None
+        return replace_query_param(
+            request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(*position),
+        )
+
+
+class DistanceCursorPagination(BaseCursorPagination):
+    """Курсорная пагинация списка, упорядоченного по расстоянию.
+
+    Курсор хранит расстояние и id последнего элемента страницы, поэтому
+    следующая страница начинается сразу после него.
+    """
+
+    def decode_cursor(self, request):
+        """Позиция (расстояние, id) из курсора запроса."""
+        position = self.get_position(request, 2)
+        if position is None:
+            return None
+        try:
+            return float(position[0]), int(position[1])
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_paginated_response(self, request, data, position=None):
+        """Ответ со страницей и ссылкой на следующую страницу."""
+        return Response(
+            {"next": self.get_next_link(request, position), "results": data}
+        )
+
+
+class KeysetPagination(BaseCursorPagination, BasePagination):
+    """Курсорная пагинация по полям сортировки (keyset).
+
+    Последнее поле ordering должно быть уникальным. Следующая страница
+    выбирается условием на значения полей последнего элемента, поэтому
+    запрос страницы использует индекс по полям сортировки и не зависит
+    от ее номера: без COUNT и OFFSET.
+    """
+
+    def __init__(self, ordering=("-id",)):
+        self.ordering = ordering
+
+    def get_fields(self, model):
+        """Поля модели и направления сортировки."""
+        return [
+            (model._meta.get_field(name.lstrip("-")), name.startswith("-"))
+            for name in self.ordering
+        ]
+
+    def get_after_filter(self, fields, position):
+        """Условие на элементы после позиции."""
+        condition = Q()
+        equal = {}
+        for (field, descending), value in zip(fields, position):
+            try:
+                value = field.to_python(value)
+            except DjangoValidationError:
+                raise NotFound(self.invalid_cursor_message)
+            lookup = "lt" if descending else "gt"
+            condition |= Q(**equal, **{f"{field.attname}__{lookup}": value})
+            equal[field.attname] = value
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Страница после позиции из курсора."""
+        self.request = request
+        fields = self.get_fields(queryset.model)
+        queryset = queryset.order_by(*self.ordering)
+        position = self.get_position(request, len(fields))
+        if position is not None:
+            queryset = queryset.filter(self.get_after_filter(fields, position))
+        page_size = self.get_page_size(request)
+        # Запрашивается на один элемент больше, чтобы узнать, есть ли
+        # следующая страница
+        page = list(queryset[: page_size + 1])
+        self.position = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.position = [
+                field.value_to_string(page[-1]) for field, _ in fields
+            ]
+        return page
+
+    def get_paginated_response(self, data):
+        """Ответ со страницей и ссылкой на следующую страницу."""
+        return Response(
+            {
+                "next": self.get_next_link(self.request, self.position),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        """Схема ответа для документации API."""
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        """Параметры запроса для документации API."""
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Курсор следующей страницы.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Количество элементов на странице.",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+
+class SwitchablePagination(BasePagination):
+    """Пагинация, выбираемая параметром запроса pagination.
+
+    При pagination=cursor используется KeysetPagination по полям ordering,
+    иначе page_pagination_class или список без пагинации, если он None.
+    """
+
+    mode_query_param = "pagination"
+    cursor_mode = "cursor"
+    page_pagination_class = None
+    ordering = ("-id",)
+
+    def get_paginator(self, request):
+        """Пагинатор для режима из запроса."""
+        if request.query_params.get(self.mode_query_param) == self.cursor_mode:
+            return KeysetPagination(self.ordering)
+        if self.page_pagination_class is None:
+            return None
+        return self.page_pagination_class()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Страница queryset или None без пагинации."""
+        self.paginator = self.get_paginator(request)
+        if self.paginator is None:
+            return None
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        """Ответ со страницей."""
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        """Схема ответа постраничного режима для документации API."""
+        if self.page_pagination_class is None:
+            return schema
+        return self.page_pagination_class().get_paginated_response_schema(
+            schema
+        )
+
+    def get_schema_operation_parameters(self, view):
+        """Параметры запроса обоих режимов для документации API."""
+        parameters = [
+            {
+                "name": self.mode_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Режим пагинации: cursor - по курсору.",
+                "schema": {"type": "string", "enum": [self.cursor_mode]},
+            }
+        ]
+        if self.page_pagination_class is not None:
+            parameters += (
+                self.page_pagination_class().get_schema_operation_parameters(
+                    view
+                )
+            )
+        return parameters + KeysetPagination(
+            self.ordering
+        ).get_schema_operation_parameters(view)
+
+
+class UserPagination(SwitchablePagination):
+    """Пагинация пользователей."""
+
+    page_pagination_class = MyPagination
+    ordering = ("-id",)
+
+
+class EventListPagination(SwitchablePagination):
+    """Пагинация мероприятий."""
+
+    page_pagination_class = EventPagination
+    ordering = ("-start_date", "id")
+
+
+class CreatedAtPagination(SwitchablePagination):
+    """Пагинация уведомлений и заявок в друзья по дате создания."""
+
+    ordering = ("-created_at", "id")
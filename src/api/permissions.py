@@ -1,7 +1,8 @@
 from rest_framework import permissions
 
-from events.models import ParticipationRequest
-from users.models import User
+from events.models import EventMember
+
+from .cache import is_blocked_by
 
 
 class IsAdminOrAuthorOrReadOnly(permissions.BasePermission):
@@ -58,14 +59,15 @@ class IsEventOrganizer(permissions.BasePermission):
 
         Eсли текущий пользователь является организатором мероприятия.
         """
-        event = int(view.kwargs["pk"])
-        participation = ParticipationRequest.objects.get(pk=event)
-        organizer = User.objects.get(
-            user__is_organizer=True, user__event=participation.event
-        )
+        if request.method in permissions.SAFE_METHODS:
+            return True
         return (
-            request.method in permissions.SAFE_METHODS
-            or request.user == organizer
+            request.user.is_authenticated
+            and EventMember.objects.filter(
+                user=request.user,
+                is_organizer=True,
+                event__participation=int(view.kwargs["pk"]),
+            ).exists()
         )
 
 
@@ -84,7 +86,7 @@ class IsAdminOrAuthorOrReadOnlyAndNotBlocked(permissions.BasePermission):
         if request.method == "GET":
             if not (
                 obj.id == request.user.id or request.user.is_staff
-            ) and request.user.is_blocked(obj):
+            ) and is_blocked_by(request.user.id, obj.id):
                 return False
             return True
         if request.method == "POST":
@@ -0,0 +1,93 @@
+from django.db.models import Count, Exists, OuterRef, Prefetch, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from events.models import EventMember
+from users.models import Blacklist, Friendship, User
+
+# Аннотации пользователей. Имена не совпадают с методами модели User
+# is_blocked() и friends_count(), чтобы не перекрывать их
+IN_BLACKLIST = "in_blacklist"
+IS_FRIEND = "is_friend"
+FRIENDS_TOTAL = "friends_total"
+# Аннотации мероприятий. Имя не совпадает с методом Event.members_count()
+IS_MEMBER = "is_member"
+MEMBERS_TOTAL = "members_total"
+ORGANIZERS = "organizers"
+
+
+def annotate_users(queryset, user):
+    """Подготовка queryset пользователей для MyUserSerializer.
+
+    Добавляет аннотации in_blacklist (пользователь в черном списке
+    текущего), is_friend (пользователь - друг текущего) и friends_total
+    (число друзей), а также загружает город, интересы и друзей, чтобы
+    сериализация страницы пользователей не зависела от ее размера.
+    """
+    if user.is_authenticated:
+        in_blacklist = Exists(
+            Blacklist.objects.filter(user=user, blocked_user=OuterRef("pk"))
+        )
+        # Дружба хранится парой симметричных строк (users.0005), поэтому
+        # достаточно строки, где текущий пользователь - инициатор
+        is_friend = Exists(
+            Friendship.objects.filter(initiator=user, friend=OuterRef("pk"))
+        )
+    else:
+        in_blacklist = is_friend = Value(False)
+    # Подзапрос вместо Count("friends"): группировка основного запроса
+    # отменила бы сортировку по умолчанию
+    friends_total = Subquery(
+        Friendship.objects.filter(initiator=OuterRef("pk"))
+        .values("initiator")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return (
+        queryset.select_related("city")
+        .prefetch_related("interests", "friends")
+        .annotate(
+            **{
+                IN_BLACKLIST: in_blacklist,
+                IS_FRIEND: is_friend,
+                FRIENDS_TOTAL: Coalesce(friends_total, 0),
+            }
+        )
+    )
+
+
+def annotate_events(queryset, user):
+    """Подготовка queryset мероприятий для EventSerializer.
+
+    Добавляет аннотации is_member (текущий пользователь - участник) и
+    members_total (число участников), загружает участников и
+    организаторов в organizers, поэтому страница мероприятий
+    сериализуется фиксированным числом запросов.
+    """
+    if user.is_authenticated:
+        is_member = Exists(
+            EventMember.objects.filter(event=OuterRef("pk"), user=user)
+        )
+    else:
+        is_member = Value(False)
+    # Подзапрос вместо Count("members"), как и для пользователей
+    members_total = Subquery(
+        EventMember.objects.filter(event=OuterRef("pk"))
+        .values("event")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return queryset.prefetch_related(
+        Prefetch("members", queryset=User.objects.only("id")),
+        Prefetch(
+            "event",
+            queryset=EventMember.objects.filter(is_organizer=True).only(
+                "event_id", "user_id"
+            ),
+            to_attr=ORGANIZERS,
+        ),
+    ).annotate(
+        **{
+            IS_MEMBER: is_member,
+            MEMBERS_TOTAL: Coalesce(members_total, 0),
+        }
+    )
@@ -0,0 +1,223 @@
+import re
+
+from django.apps import apps
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+# Конфигурация полнотекстового поиска PostgreSQL: без стемминга,
+# документ и запрос нормализуются одинаково в normalize_search_text
+SEARCH_CONFIG = "simple"
+# Имя аннотации с релевантностью результата поиска
+SEARCH_RANK = "search_rank"
+BATCH_SIZE = 1000
+
+_search_indexes = {}
+
+
+def normalize_search_text(value):
+    """Нормализация текста для поискового документа и запроса.
+
+    Регистр и буква ё не учитываются, знаки препинания заменяются
+    пробелами, поэтому email и дата разбиваются на отдельные слова.
+    """
+    value = str(value).casefold().replace("ё", "е")
+    return " ".join(re.findall(r"\w+", value))
+
+
+def build_search_document(values):
+    """Поисковый документ из значений полей объекта."""
+    return " ".join(
+        normalize_search_text(value)
+        for value in values
+        if value is not None and value != ""
+    )
+
+
+class SearchIndex:
+    """Полнотекстовый индекс модели.
+
+    Документ объекта собирается из полей fields и хранится в поле
+    search_document. На PostgreSQL по нему построены GIN-индексы tsvector
+    и триграмм, на SQLite документ дублируется в таблицу FTS5 с rowid,
+    равным первичному ключу объекта.
+    """
+
+    def __init__(self, model, fields):
+        self.model_label = model
+        self.fields = fields
+        self.field_roots = {field.split("__")[0] for field in fields}
+        _search_indexes[model] = self
+
+    @property
+    def model(self):
+        """Модель индекса."""
+        return apps.get_model(self.model_label)
+
+    @staticmethod
+    def get_table(model):
+        """Имя таблицы FTS5 модели."""
+        return f"{model._meta.db_table}_search"
+
+    def update(self, queryset):
+        """Пересчет документов объектов queryset.
+
+        Записываются только изменившиеся документы.
+        """
+        model = self.model
+        changed = []
+        for pk, document, *values in queryset.values_list(
+            "pk", "search_document", *self.fields
+        ).iterator():
+            new_document = build_search_document(values)
+            if new_document != document:
+                changed.append(model(pk=pk, search_document=new_document))
+        if not changed:
+            return
+        model._default_manager.bulk_update(
+            changed, ["search_document"], batch_size=BATCH_SIZE
+        )
+        if connection.vendor == "sqlite":
+            table = connection.ops.quote_name(self.get_table(model))
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f"DELETE FROM {table} WHERE rowid = %s",
+                    [(obj.pk,) for obj in changed],
+                )
+                cursor.executemany(
+                    f"INSERT INTO {table} (rowid, document) VALUES (%s, %s)",
+                    [
+                        (obj.pk, obj.search_document)
+                        for obj in changed
+                        if obj.search_document
+                    ],
+                )
+
+    def update_instance(self, instance, update_fields=None):
+        """Пересчет документа сохраненного объекта."""
+        if update_fields is not None and not self.field_roots.intersection(
+            update_fields
+        ):
+            return
+        self.update(self.model.objects.filter(pk=instance.pk))
+
+    def remove(self, pk):
+        """Удаление документа удаленного объекта."""
+        if connection.vendor != "sqlite":
+            return
+        table = connection.ops.quote_name(self.get_table(self.model))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {table} WHERE rowid = %s", [pk])
+
+    def rebuild(self):
+        """Полный пересчет документов и индекса."""
+        model = self.model
+        if connection.vendor == "sqlite":
+            table = connection.ops.quote_name(self.get_table(model))
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {table}")
+            model.objects.update(search_document="")
+        self.update(model.objects.all())
+
+    def search(self, queryset, text):
+        """Объекты queryset, найденные по тексту, по убыванию релевантности.
+
+        Каждое слово запроса ищется как префикс слова документа. На
+        PostgreSQL дополнительно находятся объекты с похожими по
+        триграммам словами (опечатки).
+        """
+        words = normalize_search_text(text).split()
+        if not words:
+            return queryset
+        if connection.vendor == "postgresql":
+            queryset = self._search_postgresql(queryset, words)
+        else:
+            queryset = self._search_sqlite(queryset, words)
+        return queryset.order_by(f"-{SEARCH_RANK}", "-pk")
+
+    def _search_sqlite(self, queryset, words):
+        """Поиск по таблице FTS5, релевантность - bm25."""
+        model = queryset.model
+        table = connection.ops.quote_name(self.get_table(model))
+        pk_column = "{}.{}".format(
+            connection.ops.quote_name(model._meta.db_table),
+            connection.ops.quote_name(model._meta.pk.column),
+        )
+        match = " ".join(f'"{word}"*' for word in words)
+        return queryset.filter(
+            pk__in=RawSQL(
+                f"SELECT rowid FROM {table} WHERE {table} MATCH %s", (match,)
+            )
+        ).annotate(
+            **{
+                SEARCH_RANK: RawSQL(
+                    f"SELECT -bm25({table}) FROM {table} "
+                    f"WHERE {table} MATCH %s AND rowid = {pk_column}",
+                    (match,),
+                )
+            }
+        )
+
+    @staticmethod
+    def _search_postgresql(queryset, words):
+        """Поиск по tsvector и триграммам."""
+        from django.contrib.postgres.search import (
+            SearchQuery,
+            SearchRank,
+            SearchVector,
+            TrigramWordSimilarity,
+        )
+
+        text = " ".join(words)
+        vector = SearchVector("search_document", config=SEARCH_CONFIG)
+        query = SearchQuery(
+            " & ".join(f"{word}:*" for word in words),
+            config=SEARCH_CONFIG,
+            search_type="raw",
+        )
+        return (
+            queryset.annotate(search_vector=vector)
+            .filter(
+                Q(search_vector=query)
+                | Q(search_document__trigram_word_similar=text)
+            )
+            .annotate(
+                **{
+                    SEARCH_RANK: SearchRank(vector, query)
+                    + TrigramWordSimilarity(text, "search_document")
+                }
+            )
+        )
+
+
+def get_search_index(model):
+    """Полнотекстовый индекс модели."""
+    return _search_indexes[model._meta.label]
+
+
+user_search_index = SearchIndex(
+    "users.User",
+    ("first_name", "last_name", "email", "birthday", "city__name"),
+)
+event_search_index = SearchIndex(
+    "events.Event", ("name", "event_type", "address", "city__name")
+)
+
+
+def update_city_documents(city_id):
+    """Фоновая задача пересчета документов объектов города."""
+    for index in (user_search_index, event_search_index):
+        index.update(index.model.objects.filter(city_id=city_id))
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """Полнотекстовый поиск по параметру search.
+
+    Результаты упорядочены по убыванию релевантности.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        """Фильтрация queryset по поисковому запросу."""
+        text = request.query_params.get(self.search_param, "")
+        return get_search_index(queryset.model).search(queryset, text)
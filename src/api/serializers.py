@@ -1,7 +1,7 @@
 from django.contrib.auth import authenticate
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.core.validators import validate_email as django_validate_email
-from django.db.models import Q
+from django.db import transaction
 from djoser.serializers import (
     TokenCreateSerializer,
     UserCreateSerializer,
@@ -12,21 +12,34 @@ from rest_framework.exceptions import ValidationError
 from rest_framework.fields import SerializerMethodField
 from rest_framework.serializers import ModelSerializer, SlugRelatedField
 
-from config.constants import messages
+from config.constants import (
+    DEFAULT_RECOMMENDATIONS_LIMIT,
+    MAX_BULK_FRIEND_REQUESTS,
+    MAX_RECOMMENDATIONS_LIMIT,
+    messages,
+)
 from events.models import Event, EventMember, ParticipationRequest
 from notifications.models import Notification, NotificationSettings
-from users.models import (
-    Blacklist,
-    City,
-    FriendRequest,
-    Friendship,
-    Interest,
-    User,
-    UserInterest,
+from users.models import Blacklist, City, FriendRequest, Interest, User
+from users.validators import (
+    validate_email,
+    validate_image_size,
+    validate_password,
 )
-from users.validators import validate_email, validate_password
 
+from .cache import is_friend
 from .geo import save_event_location
+from .matching import JACCARD, METRICS
+from .querysets import (
+    FRIENDS_TOTAL,
+    IN_BLACKLIST,
+    IS_FRIEND,
+    IS_MEMBER,
+    MEMBERS_TOTAL,
+    ORGANIZERS,
+)
+from .services import EventMemberService, InterestService
+from .throttling import LoginAttemptLimiter
 
 
 class CustomTokenCreateSerializer(TokenCreateSerializer):
@@ -47,20 +60,19 @@ class CustomTokenCreateSerializer(TokenCreateSerializer):
             raise ValidationError(messages.INVALID_EMAIL_MSG)
         validate_password(password)
 
-        params = {"email": email}
+        request = self.context.get("request")
+        limiter = LoginAttemptLimiter(request, email)
+        limiter.check()
+        # ModelBackend хэширует пароль и для несуществующего email, поэтому
+        # время ответа не выдает наличие email в базе
         self.user = authenticate(
-            request=self.context.get("request"), **params, password=password
+            request=request, email=email, password=password
         )
-        if not self.user:
-            self.user = User.objects.filter(**params).first()
-            if self.user and not self.user.check_password(password):
-                self.fail("invalid_credentials")
-
-        if self.user and self.user.is_active:
-            return attrs
-
-        self.fail("invalid_credentials")
-        return None
+        if self.user is None:
+            limiter.register_failure()
+            self.fail("invalid_credentials")
+        limiter.reset()
+        return attrs
 
 
 class InterestSerializer(ModelSerializer):
@@ -85,6 +97,19 @@ class GetFriendsField(serializers.RelatedField):
         }
 
 
+class AvatarField(serializers.ImageField):
+    """Поле аватарки с проверкой размера до чтения файла."""
+
+    def to_internal_value(self, data):
+        """Проверка размера загруженного файла и изображения."""
+        if hasattr(data, "size"):
+            try:
+                validate_image_size(data)
+            except DjangoValidationError as error:
+                raise ValidationError(error.messages)
+        return super().to_internal_value(data)
+
+
 class MyUserBaseSerializer(serializers.Serializer):
     """Базовый сериализатор пользователя."""
 
@@ -125,8 +150,10 @@ class MyUserSerializer(UserSerializer, MyUserBaseSerializer):
     )
     interests = InterestSerializer(many=True, required=False)
     friends = GetFriendsField(read_only=True, many=True, required=False)
+    avatar = AvatarField(required=False, allow_null=True)
+    avatar_urls = serializers.SerializerMethodField()
     age = serializers.IntegerField(required=False)
-    friends_count = serializers.IntegerField(required=False)
+    friends_count = serializers.SerializerMethodField()
     network_nick = serializers.SerializerMethodField()
 
     class Meta:
@@ -145,6 +172,7 @@ class MyUserSerializer(UserSerializer, MyUserBaseSerializer):
             "city",
             "interests",
             "avatar",
+            "avatar_urls",
             "profession",
             "purpose",
             "network_nick",
@@ -155,15 +183,33 @@ class MyUserSerializer(UserSerializer, MyUserBaseSerializer):
 
         extra_kwargs = {**MyUserBaseSerializer.Meta.extra_kwargs}
 
+    @staticmethod
+    def get_interest_ids(interests):
+        """Получение id интересов по названиям одним запросом."""
+        names = {interest["name"] for interest in interests}
+        interest_ids = dict(
+            Interest.objects.filter(name__in=names).values_list("name", "id")
+        )
+        missing = names - interest_ids.keys()
+        if missing:
+            raise ValidationError(
+                {
+                    "interests": [
+                        messages.INTEREST_DOES_NOT_EXIST % name
+                        for name in sorted(missing)
+                    ]
+                }
+            )
+        return interest_ids.values()
+
     def create(self, validated_data):
         """Создание пользователя с указанными интересами."""
         if "interests" not in self.initial_data:
             return User.objects.create(**validated_data)
-        interests = validated_data.pop("interests")
-        user = User.objects.create(**validated_data)
-        for interest in interests:
-            current_interest = Interest.objects.get(**interest)
-            UserInterest.objects.create(user=user, interest=current_interest)
+        interest_ids = self.get_interest_ids(validated_data.pop("interests"))
+        with transaction.atomic():
+            user = User.objects.create(**validated_data)
+            InterestService.set_user_interests(user, interest_ids)
         return user
 
     def update(self, instance, validated_data):
@@ -172,13 +218,10 @@ class MyUserSerializer(UserSerializer, MyUserBaseSerializer):
         Друзей можно только удалять.
         """
         if "interests" in validated_data:
-            interests = validated_data.pop("interests")
-            instance.interests.clear()
-            for interest in interests:
-                current_interest = Interest.objects.get(**interest)
-                UserInterest.objects.create(
-                    user=instance, interest=current_interest
-                )
+            InterestService.set_user_interests(
+                instance,
+                self.get_interest_ids(validated_data.pop("interests")),
+            )
         current_friends = instance.friends
         if current_friends.exists() and "friends" in self.initial_data:
             friends = self.initial_data.pop("friends")
@@ -198,18 +241,19 @@ class MyUserSerializer(UserSerializer, MyUserBaseSerializer):
         """Метод сериализатора для ограничения просмотра поля network_nick."""
         request = self.context.get("request")
 
-        if (
-            Friendship.objects.filter(
-                # Q(is_added=True),
-                Q(initiator=request.user, friend=obj)
-                | Q(initiator=obj, friend=request.user),
-            ).exists()
-        ) or obj == request.user:
+        user = request.user
+        if obj == user:
             return obj.network_nick
-        return None
+        if hasattr(obj, IS_FRIEND):
+            friend = getattr(obj, IS_FRIEND)
+        else:
+            friend = user.is_authenticated and is_friend(user.id, obj.id)
+        return obj.network_nick if friend else None
 
-    def get_is_blocked(self, blocked_user):
+    def get_is_blocked(self, blocked_user) -> bool:
         """Метод сериализатора для просмотра блокировки пользователя."""
+        if hasattr(blocked_user, IN_BLACKLIST):
+            return getattr(blocked_user, IN_BLACKLIST)
         user = self.context.get("request").user
         if user.is_anonymous:
             return False
@@ -217,6 +261,29 @@ class MyUserSerializer(UserSerializer, MyUserBaseSerializer):
             user=user, blocked_user=blocked_user
         ).exists()
 
+    def get_avatar_urls(self, obj) -> dict:
+        """Ссылки на уменьшенные копии аватарки по размерам и форматам.
+
+        Пустой словарь, пока копии не созданы фоновой задачей.
+        """
+        request = self.context.get("request")
+        storage = obj.avatar.storage
+        urls = {}
+        for size, versions in obj.avatar_thumbnails.items():
+            urls[size] = {}
+            for extension, name in versions.items():
+                url = storage.url(name)
+                urls[size][extension] = (
+                    request.build_absolute_uri(url) if request else url
+                )
+        return urls
+
+    def get_friends_count(self, obj) -> int:
+        """Метод сериализатора для получения количества друзей."""
+        if hasattr(obj, FRIENDS_TOTAL):
+            return getattr(obj, FRIENDS_TOTAL)
+        return obj.friends_count()
+
 
 class MyUserCreateSerializer(UserCreateSerializer, MyUserBaseSerializer):
     """Сериализатор создания пользователя."""
@@ -282,6 +349,42 @@ class FriendRequestSerializer(serializers.ModelSerializer):
         return data
 
 
+class FriendRequestBulkCreateSerializer(serializers.Serializer):
+    """Сериализатор пакетной отправки заявок на дружбу."""
+
+    to_users = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BULK_FRIEND_REQUESTS,
+    )
+
+
+class FriendRequestBulkSerializer(serializers.Serializer):
+    """Сериализатор пакетного принятия или отклонения заявок на дружбу."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BULK_FRIEND_REQUESTS,
+    )
+
+
+class RecommendationQuerySerializer(serializers.Serializer):
+    """Сериализатор параметров запроса рекомендаций пользователей."""
+
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=MAX_RECOMMENDATIONS_LIMIT,
+        default=DEFAULT_RECOMMENDATIONS_LIMIT,
+    )
+
+
+class SimilarUsersQuerySerializer(RecommendationQuerySerializer):
+    """Сериализатор параметров запроса пользователей с похожими интересами."""
+
+    metric = serializers.ChoiceField(choices=METRICS, default=JACCARD)
+
+
 class GetMembersField(serializers.RelatedField):
     """Сериализатор списка участников мероприятия."""
 
@@ -294,7 +397,9 @@ class EventSerializer(ModelSerializer):
     """Сериализатор мероприятия."""
 
     members = GetMembersField(read_only=True, many=True, required=False)
-    members_count = serializers.IntegerField(required=False)
+    members_count = SerializerMethodField()
+    organizer = SerializerMethodField()
+    is_member = SerializerMethodField()
 
     class Meta:
         model = Event
@@ -311,62 +416,81 @@ class EventSerializer(ModelSerializer):
             "event_price",
             "image",
             "members_count",
+            "organizer",
+            "is_member",
             "min_age",
             "max_age",
             "min_count_members",
             "max_count_members",
         )
 
+    def get_members_count(self, obj) -> int:
+        """Метод сериализатора для получения количества участников."""
+        if hasattr(obj, MEMBERS_TOTAL):
+            return getattr(obj, MEMBERS_TOTAL)
+        return obj.members_count()
+
+    def get_organizer(self, obj) -> dict | None:
+        """Метод сериализатора для получения организатора мероприятия."""
+        if hasattr(obj, ORGANIZERS):
+            organizers = getattr(obj, ORGANIZERS)
+            organizer_id = organizers[0].user_id if organizers else None
+        else:
+            organizer_id = (
+                EventMember.objects.filter(event=obj, is_organizer=True)
+                .values_list("user_id", flat=True)
+                .first()
+            )
+        return None if organizer_id is None else {"id": organizer_id}
+
+    def get_is_member(self, obj) -> bool:
+        """Метод сериализатора для проверки участия текущего пользователя."""
+        if hasattr(obj, IS_MEMBER):
+            return getattr(obj, IS_MEMBER)
+        user = self.context.get("request").user
+        if user.is_anonymous:
+            return False
+        return EventMember.objects.filter(event=obj, user=user).exists()
+
+    @staticmethod
+    def get_member_ids(members):
+        """Получение id существующих участников одним запросом."""
+        member_ids = {member["id"] for member in members}
+        missing = member_ids - set(
+            User.objects.filter(id__in=member_ids).values_list("id", flat=True)
+        )
+        if missing:
+            raise ValidationError(
+                {
+                    "members": [
+                        messages.PK_DOES_NOT_EXIST_MSG.format(pk_value=pk)
+                        for pk in sorted(missing)
+                    ]
+                }
+            )
+        return member_ids
+
+    @transaction.atomic
     def create(self, validated_data):
         """Создание мероприятия с указанными участниками."""
-        if "members" not in self.initial_data:
-            event = Event.objects.create(**validated_data)
-            if "city" in self.initial_data or "address" in self.initial_data:
-                save_event_location(event, validated_data)
-            return event
-        members = self.initial_data.pop("members")
+        members = self.initial_data.pop("members", None)
+        member_ids = None if members is None else self.get_member_ids(members)
         event = Event.objects.create(**validated_data)
         if "city" in self.initial_data or "address" in self.initial_data:
             save_event_location(event, validated_data)
-        is_organizers = []
-        for member in members:
-            members_list = EventMember.objects.filter(
-                event=event, user=member["id"]
-            )
-            if members_list:
-                is_organizers.append(members_list[0].is_organizer)
-            else:
-                is_organizers.append(False)
-        for i, member in enumerate(members):
-            current_member = User.objects.get(**member)
-            EventMember.objects.create(
-                event=event, user=current_member, is_organizer=is_organizers[i]
-            )
+        if member_ids is not None:
+            EventMemberService.set_members(event, member_ids)
         return event
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """Обновление мероприятия с указанными участниками."""
         if "city" in self.initial_data or "address" in self.initial_data:
             save_event_location(instance, validated_data)
-        if "members" not in self.initial_data:
-            return super().update(instance, validated_data)
-        members = self.initial_data.pop("members")
-        is_organizers = []
-        for member in members:
-            members_list = EventMember.objects.filter(
-                event=instance, user=member["id"]
-            )
-            if members_list:
-                is_organizers.append(members_list[0].is_organizer)
-            else:
-                is_organizers.append(False)
-        instance.members.clear()
-        for i, member in enumerate(members):
-            current_member = User.objects.get(**member)
-            EventMember.objects.create(
-                event=instance,
-                user=current_member,
-                is_organizer=is_organizers[i],
+        if "members" in self.initial_data:
+            EventMemberService.set_members(
+                instance,
+                self.get_member_ids(self.initial_data.pop("members")),
             )
         return super().update(instance, validated_data)
 
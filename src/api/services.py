@@ -1,59 +1,202 @@
 from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
 from django.http import Http404
+from django.utils import timezone
 
 from events.models import EventMember, ParticipationRequest
-from users.models import FriendRequest, Friendship
+from users.models import (
+    FriendRequest,
+    Friendship,
+    Interest,
+    User,
+    UserInterest,
+)
 
+from .cache import get_blocked_by_ids, get_friend_ids, invalidate_friend_ids
+from .graph import friend_graph
+from .matching import interest_matrix
+from .utils import FRIEND_REQUEST_NOTIFICATIONS, send_bulk_notifications
 
-def handle_not_found(func):
-    """Декоратор для обработки исключений ObjectDoesNotExist.
 
-    Преобразует в Http404.
-    """
-    from functools import wraps
-
-    from django.core.exceptions import ObjectDoesNotExist
+def update_pending(queryset, status, **fields):
+    """Перевод ожидающей заявки из queryset в статус status.
 
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        try:
-            return func(*args, **kwargs)
-        except ObjectDoesNotExist:
-            raise Http404("Заявка не найдена.")
-
-    return wrapper
+    Условный UPDATE ... WHERE status = 'Pending' изменяет заявку, только
+    если ее еще не обработал параллельный запрос. Если заявка не найдена
+    или уже обработана, вызывается Http404.
+    """
+    updated = queryset.filter(status="Pending").update(
+        status=status, updated_at=timezone.now(), **fields
+    )
+    if not updated:
+        raise Http404("Заявка не найдена.")
 
 
 class FriendRequestService:
-    """Сервис для обработки бизнес-логики, связанной с заявками на дружбу."""
+    """Сервис для обработки бизнес-логики, связанной с заявками на дружбу.
+
+    Статус заявок меняется через update(), поэтому сигналы post_save
+    заявки не срабатывают: дружба и уведомления создаются здесь.
+    """
 
     @staticmethod
     @transaction.atomic
-    @handle_not_found
     def accept_friend_request(request_id, user):
         """Принимает заявку на дружбу.
 
-        Изменяет статус заявки на 'Принято' и создавая объект Friendship.
+        Изменяет статус заявки на 'Принято' и создает дружбу.
         """
-        friend_request = FriendRequest.objects.get(
-            pk=request_id, to_user=user, status="Pending"
-        )
-        friend_request.status = "Accepted"
-        friend_request.save()
-        Friendship.objects.get_or_create(
-            initiator=friend_request.from_user, friend=friend_request.to_user
+        friend_requests = FriendRequest.objects.filter(
+            pk=request_id, to_user=user
         )
+        update_pending(friend_requests, "Accepted")
+        from_user_id = friend_requests.values_list(
+            "from_user_id", flat=True
+        ).get()
+        FriendRequestService._add_friendships(user, [from_user_id])
+        FriendRequestService._notify("Accepted", user, [from_user_id])
 
     @staticmethod
     @transaction.atomic
-    @handle_not_found
     def decline_friend_request(request_id, user):
         """Отклоняет заявку на дружбу, изменяя её статус на 'Отклонено'."""
-        friend_request = FriendRequest.objects.get(
-            pk=request_id, to_user=user, status="Pending"
+        friend_requests = FriendRequest.objects.filter(
+            pk=request_id, to_user=user
+        )
+        update_pending(friend_requests, "Declined")
+        from_user_id = friend_requests.values_list(
+            "from_user_id", flat=True
+        ).get()
+        FriendRequestService._notify("Declined", user, [from_user_id])
+
+    @staticmethod
+    @transaction.atomic
+    def send_friend_requests(user, to_user_ids):
+        """Отправка заявок на дружбу нескольким пользователям.
+
+        Пропускаются сам пользователь, его друзья, несуществующие и
+        неактивные пользователи, добавившие его в черный список, те, кому
+        заявка уже отправлена, и те, чья заявка ему ожидает ответа.
+        Заявки и уведомления создаются пакетно, строка отправителя
+        блокируется от параллельной отправки тех же заявок.
+        Возвращает список созданных заявок.
+        """
+        list(User.objects.select_for_update().filter(pk=user.pk).values("pk"))
+        to_user_ids = set(to_user_ids) - {user.pk}
+        to_user_ids -= get_friend_ids(user.pk)
+        to_user_ids -= get_blocked_by_ids(user.pk)
+        requested = FriendRequest.objects.filter(
+            Q(from_user=user, to_user_id__in=to_user_ids)
+            | Q(from_user_id__in=to_user_ids, to_user=user, status="Pending")
+        ).values_list("from_user_id", "to_user_id")
+        to_user_ids -= {
+            from_user_id if to_user_id == user.pk else to_user_id
+            for from_user_id, to_user_id in requested
+        }
+        to_user_ids = User.objects.filter(
+            pk__in=to_user_ids, is_active=True
+        ).values_list("pk", flat=True)
+        friend_requests = FriendRequest.objects.bulk_create(
+            FriendRequest(from_user=user, to_user_id=to_user_id)
+            for to_user_id in sorted(to_user_ids)
+        )
+        FriendRequestService._notify(
+            "Pending",
+            user,
+            [friend_request.to_user_id for friend_request in friend_requests],
+        )
+        return friend_requests
+
+    @staticmethod
+    @transaction.atomic
+    def accept_friend_requests(request_ids, user):
+        """Пакетное принятие заявок на дружбу.
+
+        Создаются объекты Friendship и уведомления отправителям.
+        Возвращает id принятых заявок.
+        """
+        friend_requests = FriendRequestService._set_status(
+            request_ids, user, "Accepted"
+        )
+        from_user_ids = [from_user_id for _, from_user_id in friend_requests]
+        FriendRequestService._add_friendships(user, from_user_ids)
+        FriendRequestService._notify("Accepted", user, from_user_ids)
+        return [pk for pk, _ in friend_requests]
+
+    @staticmethod
+    @transaction.atomic
+    def decline_friend_requests(request_ids, user):
+        """Пакетное отклонение заявок на дружбу.
+
+        Возвращает id отклоненных заявок.
+        """
+        friend_requests = FriendRequestService._set_status(
+            request_ids, user, "Declined"
+        )
+        FriendRequestService._notify(
+            "Declined",
+            user,
+            [from_user_id for _, from_user_id in friend_requests],
+        )
+        return [pk for pk, _ in friend_requests]
+
+    @staticmethod
+    def _set_status(request_ids, user, status):
+        """Смена статуса ожидающих заявок пользователю одним запросом.
+
+        Возвращает пары (id заявки, id отправителя) измененных заявок.
+        """
+        friend_requests = list(
+            FriendRequest.objects.select_for_update()
+            .filter(pk__in=request_ids, to_user=user, status="Pending")
+            .order_by("pk")
+            .values_list("pk", "from_user_id")
+        )
+        FriendRequest.objects.filter(
+            pk__in=[pk for pk, _ in friend_requests], status="Pending"
+        ).update(status=status, updated_at=timezone.now())
+        return friend_requests
+
+    @staticmethod
+    def _add_friendships(user, friend_ids):
+        """Создание дружбы пользователя с friend_ids одним запросом."""
+        # Дружба хранится симметрично, создаются обе строки пары
+        Friendship.objects.bulk_create(
+            (
+                friendship
+                for friend_id in friend_ids
+                for friendship in (
+                    Friendship(initiator_id=friend_id, friend=user),
+                    Friendship(initiator=user, friend_id=friend_id),
+                )
+            ),
+            ignore_conflicts=True,
+        )
+        # bulk_create не отправляет сигналы, кэш и граф друзей
+        # обновляются после фиксации транзакции
+        transaction.on_commit(
+            lambda: FriendRequestService._add_friends(user.pk, friend_ids)
+        )
+
+    @staticmethod
+    def _notify(status, user, recipient_ids):
+        """Уведомления получателям об отправке или обработке заявок."""
+        if not recipient_ids:
+            return
+        notification_type, message = FRIEND_REQUEST_NOTIFICATIONS[status]
+        message = message.format(user)
+        send_bulk_notifications(
+            notification_type,
+            {recipient_id: message for recipient_id in recipient_ids},
         )
-        friend_request.status = "Declined"
-        friend_request.save()
+
+    @staticmethod
+    def _add_friends(user_id, friend_ids):
+        """Обновление кэша и графа друзей после пакетного принятия."""
+        invalidate_friend_ids(user_id, *friend_ids)
+        for friend_id in friend_ids:
+            friend_graph.add(friend_id, user_id)
 
 
 class ParticipationRequestService:
@@ -61,7 +204,6 @@ class ParticipationRequestService:
 
     @staticmethod
     @transaction.atomic
-    @handle_not_found
     def accept_event_participation(request_id, user):
         """Принятие заявки на участие в мероприятии.
 
@@ -69,21 +211,23 @@ class ParticipationRequestService:
 
         Cоздается объект EventMember.
         """
-        participation_request = ParticipationRequest.objects.get(
-            pk=request_id, status="Pending"
+        participation_requests = ParticipationRequest.objects.filter(
+            pk=request_id
         )
-        participation_request.status = "Accepted"
-        participation_request.processed_by = user
-        participation_request.save()
-        EventMember.objects.get_or_create(
-            user=participation_request.from_user,
-            event=participation_request.event,
-            is_organizer=False,
+        update_pending(participation_requests, "Accepted", processed_by=user)
+        from_user_id, event_id = participation_requests.values_list(
+            "from_user_id", "event_id"
+        ).get()
+        EventMember.objects.bulk_create(
+            [
+                EventMember(
+                    user_id=from_user_id, event_id=event_id, is_organizer=False
+                )
+            ],
+            ignore_conflicts=True,
         )
 
     @staticmethod
-    @transaction.atomic
-    @handle_not_found
     def decline_event_participation(request_id, user):
         """Отклонение заявки на участие в мероприятии.
 
@@ -91,9 +235,100 @@ class ParticipationRequestService:
 
         Заполняется поле "Кем обработано".
         """
-        participation_request = ParticipationRequest.objects.get(
-            pk=request_id, status="Pending"
+        update_pending(
+            ParticipationRequest.objects.filter(pk=request_id),
+            "Declined",
+            processed_by=user,
+        )
+
+
+class EventMemberService:
+    """Сервис для изменения участников мероприятий."""
+
+    @staticmethod
+    @transaction.atomic
+    def set_members(event, user_ids):
+        """Замена участников мероприятия.
+
+        Изменения вычисляются как разность множеств с текущими
+        участниками: удаляются отсутствующие в user_ids участники, кроме
+        организаторов, новые добавляются одним запросом. Флаг
+        организатора у оставшихся участников не меняется.
+        """
+        user_ids = set(user_ids)
+        current = dict(
+            EventMember.objects.filter(event=event).values_list(
+                "user_id", "is_organizer"
+            )
+        )
+        removed_ids = {
+            user_id
+            for user_id, is_organizer in current.items()
+            if not is_organizer and user_id not in user_ids
+        }
+        if removed_ids:
+            EventMember.objects.filter(
+                event=event, user_id__in=removed_ids
+            ).delete()
+        EventMember.objects.bulk_create(
+            EventMember(event=event, user_id=user_id, is_organizer=False)
+            for user_id in sorted(user_ids - current.keys())
+        )
+
+
+class InterestService:
+    """Сервис для изменения интересов пользователей."""
+
+    @staticmethod
+    @transaction.atomic
+    def set_user_interests(user, interest_ids):
+        """Замена интересов пользователя.
+
+        Добавляются и удаляются только изменившиеся связи, счетчики
+        популярности интересов изменяются атомарно. Строка пользователя
+        блокируется, чтобы параллельные изменения не пересекались.
+        """
+        list(User.objects.select_for_update().filter(pk=user.pk).values("pk"))
+        interest_ids = set(interest_ids)
+        current_ids = set(
+            UserInterest.objects.filter(user=user).values_list(
+                "interest_id", flat=True
+            )
+        )
+        removed_ids = current_ids - interest_ids
+        added_ids = interest_ids - current_ids
+        if removed_ids:
+            UserInterest.objects.filter(
+                user=user, interest_id__in=removed_ids
+            ).delete()
+            Interest.objects.filter(id__in=removed_ids).update(
+                counter=Greatest(F("counter") - 1, 0)
+            )
+        if added_ids:
+            UserInterest.objects.bulk_create(
+                UserInterest(user=user, interest_id=interest_id)
+                for interest_id in added_ids
+            )
+            Interest.objects.filter(id__in=added_ids).update(
+                counter=F("counter") + 1
+            )
+            # Удаленные связи убирает из матрицы сигнал post_delete,
+            # bulk_create сигналов не отправляет
+            transaction.on_commit(
+                lambda: interest_matrix.add(user.pk, added_ids)
+            )
+
+    @staticmethod
+    def recount_counters():
+        """Пересчет счетчиков популярности всех интересов одним запросом."""
+        return Interest.objects.update(
+            counter=Coalesce(
+                Subquery(
+                    UserInterest.objects.filter(interest=OuterRef("pk"))
+                    .values("interest")
+                    .annotate(total=Count("pk"))
+                    .values("total")
+                ),
+                0,
+            )
         )
-        participation_request.status = "Declined"
-        participation_request.processed_by = user
-        participation_request.save()
@@ -1,10 +1,22 @@
 import logging
 
 from django.apps import apps
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save,
+)
 from django.dispatch import receiver
 
-from .utils import handle_friend_request, send_notification
+from config.tasks import run_in_background
+
+from .utils import (
+    FRIEND_REQUEST_NOTIFICATIONS,
+    handle_friend_request,
+    send_notification,
+)
 
 
 @receiver(post_save, sender="users.User")
@@ -26,10 +38,10 @@ def friend_request_notification(sender, instance, created, **kwargs):
             recipient_settings = notification_settings.objects.get(
                 user=instance.to_user)
             if recipient_settings.receive_notifications:
-                message = (f"{instance.from_user} отправил "
-                           f"Вам запрос на добавления в друзья.")
-                notification_type = "FRIEND_REQUEST"
-                send_notification(instance.to_user, notification_type, message)
+                notification_type, message = FRIEND_REQUEST_NOTIFICATIONS[
+                    "Pending"]
+                send_notification(instance.to_user, notification_type,
+                                  message.format(instance.from_user))
         except notification_settings.DoesNotExist:
             logging.error(
                 "Настройки уведомлений не найдены для получателя.")
@@ -37,12 +49,235 @@ def friend_request_notification(sender, instance, created, **kwargs):
         handle_friend_request(instance)
 
 
-@receiver(post_save, sender="users.FriendRequest")
-def create_friendship(sender, instance, created, **kwargs):
-    """Создает объект Friendship после принятия заявки на дружбу."""
-    from users.models import Friendship
+@receiver(post_save, sender="users.Friendship")
+def create_reverse_friendship(sender, instance, created, **kwargs):
+    """Создает обратную строку дружбы."""
+    if created:
+        sender.objects.bulk_create(
+            [sender(initiator_id=instance.friend_id,
+                    friend_id=instance.initiator_id)],
+            ignore_conflicts=True,
+        )
+
+
+@receiver(post_delete, sender="users.Friendship")
+def delete_reverse_friendship(sender, instance, **kwargs):
+    """Удаляет обратную строку дружбы."""
+    sender.objects.filter(
+        initiator_id=instance.friend_id, friend_id=instance.initiator_id
+    ).delete()
+
+
+@receiver(m2m_changed, sender="users.Friendship")
+def update_friends_relation(sender, instance, action, pk_set, **kwargs):
+    """Обновляет кэш и граф друзей при добавлении через User.friends.
+
+    Симметричная связь сама создает обе строки, но без post_save.
+    Удаление строк отправляет post_delete и обрабатывается ниже.
+    """
+    from .cache import invalidate_friend_ids
+    from .graph import friend_graph
+
+    if action != "post_add":
+        return
+    user_id, friend_ids = instance.pk, set(pk_set)
+
+    def update():
+        invalidate_friend_ids(user_id, *friend_ids)
+        for friend_id in friend_ids:
+            friend_graph.add(user_id, friend_id)
+
+    transaction.on_commit(update)
+
+
+# Кэши и граф обновляются после фиксации транзакции: иначе параллельный
+# запрос до фиксации снова закэширует старые данные, а при откате кэш и
+# граф разойдутся с базой
+
+
+@receiver(post_save, sender="users.Friendship")
+@receiver(post_delete, sender="users.Friendship")
+def invalidate_friends_cache(sender, instance, **kwargs):
+    """Очищает кэш друзей участников дружбы."""
+    from .cache import invalidate_friend_ids
+
+    user_ids = (instance.initiator_id, instance.friend_id)
+    transaction.on_commit(lambda: invalidate_friend_ids(*user_ids))
+
 
-    if instance.status == "Accepted":
-        Friendship.objects.get_or_create(
-            initiator=instance.from_user, friend=instance.to_user
+@receiver(post_save, sender="users.Blacklist")
+@receiver(post_delete, sender="users.Blacklist")
+def invalidate_blacklist_cache(sender, instance, **kwargs):
+    """Очищает кэш заблокировавших пользователей."""
+    from .cache import invalidate_blocked_by_ids
+
+    user_id = instance.blocked_user_id
+    transaction.on_commit(lambda: invalidate_blocked_by_ids(user_id))
+
+
+@receiver(post_save, sender="users.Friendship")
+def add_friend_graph_edge(sender, instance, created, **kwargs):
+    """Добавляет дружбу в граф рекомендаций."""
+    from .graph import friend_graph
+
+    if created:
+        user_ids = (instance.initiator_id, instance.friend_id)
+        transaction.on_commit(lambda: friend_graph.add(*user_ids))
+
+
+@receiver(post_delete, sender="users.Friendship")
+def remove_friend_graph_edge(sender, instance, **kwargs):
+    """Удаляет дружбу из графа рекомендаций."""
+    from .graph import friend_graph
+
+    user_ids = (instance.initiator_id, instance.friend_id)
+    transaction.on_commit(lambda: friend_graph.remove(*user_ids))
+
+
+@receiver(post_save, sender="users.UserInterest")
+def add_user_interest(sender, instance, created, **kwargs):
+    """Добавляет интерес пользователя в матрицу интересов."""
+    from .matching import interest_matrix
+
+    if created:
+        user_id, interest_ids = instance.user_id, [instance.interest_id]
+        transaction.on_commit(
+            lambda: interest_matrix.add(user_id, interest_ids)
         )
+
+
+@receiver(post_delete, sender="users.UserInterest")
+def remove_user_interest(sender, instance, **kwargs):
+    """Удаляет интерес пользователя из матрицы интересов."""
+    from .matching import interest_matrix
+
+    user_id, interest_ids = instance.user_id, [instance.interest_id]
+    transaction.on_commit(
+        lambda: interest_matrix.remove(user_id, interest_ids)
+    )
+
+
+@receiver(m2m_changed, sender="users.UserInterest")
+def update_interests_relation(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """Обновляет матрицу интересов при изменении связей пользователя.
+
+    Матрица изменяется после фиксации транзакции, чтобы откат не
+    оставил в ней интересы, которых нет в базе.
+    """
+    from .matching import interest_matrix
+
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if reverse:
+        # Изменены пользователи интереса, матрица строится заново
+        update = interest_matrix.clear
+    elif action == "post_add":
+        user_id, interest_ids = instance.pk, set(pk_set)
+
+        def update():
+            interest_matrix.add(user_id, interest_ids)
+
+    elif action == "post_remove":
+        user_id, interest_ids = instance.pk, set(pk_set)
+
+        def update():
+            interest_matrix.remove(user_id, interest_ids)
+
+    else:
+        user_id = instance.pk
+
+        def update():
+            interest_matrix.reload_user(user_id)
+
+    transaction.on_commit(update)
+
+
+@receiver(post_save, sender="users.UserLocation")
+def index_user_location(sender, instance, **kwargs):
+    """Обновляет пространственный индекс при сохранении геолокации."""
+    from .spatial import user_location_index
+
+    user_location_index.add(instance.user_id, instance.lat, instance.lon)
+
+
+@receiver(post_delete, sender="users.UserLocation")
+def unindex_user_location(sender, instance, **kwargs):
+    """Удаляет геолокацию из пространственного индекса и буфера записи."""
+    from .geo import location_buffer
+    from .spatial import user_location_index
+
+    user_location_index.remove(instance.user_id)
+    location_buffer.forget(instance.user_id)
+
+
+@receiver(post_save, sender="users.User")
+@receiver(post_save, sender="events.Event")
+def update_search_document(sender, instance, update_fields=None, **kwargs):
+    """Обновляет поисковый документ пользователя или мероприятия."""
+    from .search import get_search_index
+
+    get_search_index(sender).update_instance(instance, update_fields)
+
+
+@receiver(post_delete, sender="users.User")
+@receiver(post_delete, sender="events.Event")
+def remove_search_document(sender, instance, **kwargs):
+    """Удаляет поисковый документ пользователя или мероприятия."""
+    from .search import get_search_index
+
+    get_search_index(sender).remove(instance.pk)
+
+
+@receiver(pre_save, sender="users.City")
+def remember_city_name(sender, instance, update_fields=None, **kwargs):
+    """Запоминает прежнее название города перед сохранением."""
+    instance._previous_name = None
+    if instance._state.adding or (
+        update_fields is not None and "name" not in update_fields
+    ):
+        return
+    instance._previous_name = (
+        sender.objects.filter(pk=instance.pk)
+        .values_list("name", flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender="users.City")
+def update_city_search_documents(
+    sender, instance, created, update_fields=None, **kwargs
+):
+    """Обновляет поисковые документы объектов города.
+
+    Документы пересчитываются в фоне и только при изменении названия:
+    у нового города еще нет пользователей и мероприятий.
+    """
+    from .search import update_city_documents
+
+    if created or (update_fields is not None and "name" not in update_fields):
+        return
+    if instance._previous_name == instance.name:
+        return
+    run_in_background(update_city_documents, instance.pk)
+
+
+@receiver(post_delete, sender="authtoken.Token")
+def invalidate_token_cache(sender, instance, **kwargs):
+    """Удаляет токен из кэша аутентификации при выходе."""
+    from .cache import invalidate_token
+
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender="users.User")
+@receiver(post_delete, sender="users.User")
+def invalidate_auth_user_cache(sender, instance, **kwargs):
+    """Удаляет пользователя из кэша аутентификации при изменении.
+
+    В том числе при смене пароля и деактивации.
+    """
+    from .cache import invalidate_auth_user
+
+    invalidate_auth_user(instance.pk)
@@ -0,0 +1,259 @@
+import math
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+
+from .geo import WGS84_A, get_bounding_box, get_distances
+
+# Наибольшая долгота, не совпадающая с -180 (180-й меридиан)
+MAX_LON = math.nextafter(180.0, 0.0)
+# Начальный радиус поиска ближайших соседей и радиус, заведомо
+# превышающий любое расстояние на поверхности Земли (км)
+NEAREST_START_RADIUS_KM = 10
+NEAREST_MAX_RADIUS_KM = math.pi * WGS84_A
+# Запас (км), с которым ячейка считается целиком лежащей ближе курсора
+NEAREST_INNER_MARGIN_KM = 1
+
+
+class UserLocationIndex:
+    """Сеточный пространственный индекс геолокаций пользователей.
+
+    Поверхность Земли разбивается на ячейки размером cell_size градусов.
+    Поиск в радиусе просматривает только ячейки, попадающие в
+    ограничивающий прямоугольник, и считает точное расстояние лишь для
+    найденных в них кандидатов.
+
+    Индекс хранится в памяти процесса, обновляется сигналами сохранения и
+    удаления UserLocation и полностью перестраивается из базы раз в ttl
+    секунд, чтобы подхватить изменения, сделанные другими процессами.
+    """
+
+    def __init__(self, cell_size=None, ttl=None):
+        self._cell_size = cell_size
+        self._ttl = ttl
+        self._lock = threading.RLock()
+        self._cells = defaultdict(set)
+        self._points = {}
+        self._built_at = None
+
+    @property
+    def cell_size(self):
+        """Размер ячейки в градусах."""
+        return self._cell_size or settings.GEO_INDEX_CELL_SIZE
+
+    @property
+    def ttl(self):
+        """Время жизни индекса до полной перестройки в секундах."""
+        if self._ttl is not None:
+            return self._ttl
+        return settings.GEO_INDEX_TTL
+
+    def _get_row(self, lat):
+        """Номер ряда ячеек по широте."""
+        return math.floor(lat / self.cell_size)
+
+    def _get_col(self, lon):
+        """Номер столбца ячеек по долготе."""
+        if lon >= 180:
+            lon -= 360
+        return math.floor(lon / self.cell_size)
+
+    def _get_cell(self, lat, lon):
+        """Ячейка, в которую попадает точка."""
+        return self._get_row(lat), self._get_col(lon)
+
+    def _is_stale(self):
+        """Проверка необходимости перестройки индекса."""
+        if self._built_at is None:
+            return True
+        return bool(self.ttl) and time.monotonic() - self._built_at > self.ttl
+
+    def _ensure_built(self):
+        """Построение индекса при первом обращении или по истечении ttl."""
+        if self._is_stale():
+            self.rebuild()
+
+    def rebuild(self):
+        """Полная перестройка индекса по таблице UserLocation."""
+        from users.models import UserLocation
+
+        cells = defaultdict(set)
+        points = {}
+        rows = UserLocation.objects.values_list("user_id", "lat", "lon")
+        for user_id, lat, lon in rows.iterator():
+            point = (float(lat), float(lon))
+            points[user_id] = point
+            cells[self._get_cell(*point)].add(user_id)
+        with self._lock:
+            self._cells = cells
+            self._points = points
+            self._built_at = time.monotonic()
+
+    def clear(self):
+        """Очистка индекса. Он будет построен заново при следующем поиске."""
+        with self._lock:
+            self._cells = defaultdict(set)
+            self._points = {}
+            self._built_at = None
+
+    def _discard(self, user_id):
+        """Удаление точки пользователя без блокировки."""
+        point = self._points.pop(user_id, None)
+        if point is None:
+            return
+        cell = self._get_cell(*point)
+        self._cells[cell].discard(user_id)
+        if not self._cells[cell]:
+            del self._cells[cell]
+
+    def add(self, user_id, lat, lon):
+        """Добавление или перемещение точки пользователя."""
+        point = (float(lat), float(lon))
+        with self._lock:
+            if self._built_at is None:
+                return
+            self._discard(user_id)
+            self._points[user_id] = point
+            self._cells[self._get_cell(*point)].add(user_id)
+
+    def remove(self, user_id):
+        """Удаление точки пользователя."""
+        with self._lock:
+            self._discard(user_id)
+
+    def _get_cells_in_box(self, min_lat, max_lat, min_lon, max_lon):
+        """Занятые ячейки, пересекающиеся с прямоугольником."""
+        min_row, max_row = self._get_row(min_lat), self._get_row(max_lat)
+        lon_ranges = (
+            [(min_lon, max_lon)]
+            if min_lon <= max_lon
+            else [(min_lon, 180.0), (-180.0, max_lon)]
+        )
+        col_ranges = [
+            (self._get_col(start), self._get_col(min(end, MAX_LON)))
+            for start, end in lon_ranges
+        ]
+        total = (max_row - min_row + 1) * sum(
+            end - start + 1 for start, end in col_ranges
+        )
+        if total > len(self._cells):
+            return [
+                cell
+                for cell in self._cells
+                if min_row <= cell[0] <= max_row
+                and any(start <= cell[1] <= end for start, end in col_ranges)
+            ]
+        return [
+            (row, col)
+            for row in range(min_row, max_row + 1)
+            for start, end in col_ranges
+            for col in range(start, end + 1)
+            if (row, col) in self._cells
+        ]
+
+    def query_radius(self, lat, lon, radius_km, exclude=()):
+        """Пользователи в радиусе radius_km от точки.
+
+        Возвращает список пар (user_id, расстояние в км), отсортированный по
+        возрастанию расстояния. Пользователи из exclude пропускаются.
+        """
+        self._ensure_built()
+        origin = (float(lat), float(lon))
+        box = get_bounding_box(*origin, radius_km)
+        with self._lock:
+            candidates = [
+                (user_id, self._points[user_id])
+                for cell in self._get_cells_in_box(*box)
+                for user_id in self._cells[cell]
+                if user_id not in exclude
+            ]
+        if not candidates:
+            return []
+        user_ids, points = zip(*candidates)
+        distances = get_distances(origin, points, accurate=True).round(3)
+        result = [
+            (user_id, float(distance))
+            for user_id, distance in zip(user_ids, distances)
+            if distance <= radius_km
+        ]
+        result.sort(key=lambda item: (item[1], item[0]))
+        return result
+
+    def _is_inside(self, origin, cell, radius_km):
+        """Проверка, что ячейка целиком лежит в радиусе radius_km.
+
+        Если вся ячейка лежит в полушарии точки (разность долгот не
+        больше 90°), расстояние от точки до ячейки максимально в одном из
+        ее углов. Ячейки дальнего полушария не считаются лежащими внутри.
+        """
+        row, col = cell
+        size = self.cell_size
+        if any(
+            math.cos(math.radians(lon - origin[1])) < 0
+            for lon in (col * size, (col + 1) * size)
+        ):
+            return False
+        corners = [
+            (lat, lon)
+            for lat in (max(row * size, -90.0), min((row + 1) * size, 90.0))
+            for lon in (col * size, (col + 1) * size)
+        ]
+        distances = get_distances(origin, corners, accurate=True)
+        return distances.max() + NEAREST_INNER_MARGIN_KM < radius_km
+
+    def query_nearest(self, lat, lon, count, after=None, exclude=()):
+        """Ближайшие к точке count пользователей.
+
+        after - позиция (расстояние, user_id), после которой начинается
+        выдача. Просматривается только кольцо от расстояния курсора до
+        внешнего радиуса: ячейки, целиком лежащие ближе курсора,
+        пропускаются. Внешний радиус удваивается, пока не наберется count
+        пользователей, при этом расстояния считаются только для точек
+        из ячеек, добавленных на очередном шаге. Результаты внутри радиуса
+        полны, поэтому найденные пользователи действительно ближайшие.
+        """
+        self._ensure_built()
+        origin = (float(lat), float(lon))
+        inner = after[0] if after is not None else 0
+        step = NEAREST_START_RADIUS_KM
+        scanned = set()
+        found = []
+        while True:
+            radius = min(inner + step, NEAREST_MAX_RADIUS_KM)
+            box = get_bounding_box(*origin, radius)
+            with self._lock:
+                cells = {
+                    cell: [
+                        (user_id, self._points[user_id])
+                        for user_id in self._cells[cell]
+                        if user_id not in exclude
+                    ]
+                    for cell in self._get_cells_in_box(*box)
+                    if cell not in scanned
+                }
+            scanned.update(cells)
+            candidates = [
+                candidate
+                for cell, cell_candidates in cells.items()
+                if cell_candidates
+                and not (inner and self._is_inside(origin, cell, inner))
+                for candidate in cell_candidates
+            ]
+            if candidates:
+                user_ids, points = zip(*candidates)
+                distances = get_distances(origin, points, accurate=True)
+                found.extend(
+                    (user_id, float(distance))
+                    for user_id, distance in zip(user_ids, distances.round(3))
+                    if after is None or (distance, user_id) > after
+                )
+                found.sort(key=lambda item: (item[1], item[0]))
+            result = [item for item in found if item[1] <= radius]
+            if len(result) >= count or radius >= NEAREST_MAX_RADIUS_KM:
+                return result[:count]
+            step *= 2
+
+
+user_location_index = UserLocationIndex()
@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import Throttled
+
+from config.constants import messages
+
+from .geo import get_request_ip
+
+LOGIN_ATTEMPTS_IP_KEY = "login_attempts:ip:{}"
+LOGIN_ATTEMPTS_EMAIL_KEY = "login_attempts:email:{}:{}"
+
+
+class LoginAttemptLimiter:
+    """Ограничение числа неудачных попыток входа по IP-адресу и email.
+
+    Счетчики неудачных попыток хранятся в кэше Django и сбрасываются
+    через LOGIN_ATTEMPTS_WINDOW секунд после первой попытки. Попытка
+    сверх лимита отклоняется до проверки пароля. Попытки для email
+    считаются отдельно для каждого IP-адреса, чтобы перебор с чужого
+    адреса не блокировал вход владельцу email.
+    """
+
+    def __init__(self, request, email):
+        self.limits = {}
+        ip = get_request_ip(request) if request is not None else None
+        if ip is not None and settings.LOGIN_ATTEMPTS_PER_IP:
+            key = LOGIN_ATTEMPTS_IP_KEY.format(ip)
+            self.limits[key] = settings.LOGIN_ATTEMPTS_PER_IP
+        if settings.LOGIN_ATTEMPTS_PER_EMAIL:
+            self.email_key = LOGIN_ATTEMPTS_EMAIL_KEY.format(
+                ip or "", email.casefold()
+            )
+            self.limits[self.email_key] = settings.LOGIN_ATTEMPTS_PER_EMAIL
+        else:
+            self.email_key = None
+
+    def check(self):
+        """Отклонение попытки входа при превышении лимита."""
+        attempts = cache.get_many(self.limits)
+        if any(
+            attempts.get(key, 0) >= limit for key, limit in self.limits.items()
+        ):
+            raise Throttled(
+                wait=settings.LOGIN_ATTEMPTS_WINDOW,
+                detail=messages.TOO_MANY_LOGIN_ATTEMPTS_MSG,
+            )
+
+    def register_failure(self):
+        """Учет неудачной попытки входа."""
+        for key in self.limits:
+            # add создает счетчик с окном только при первой попытке
+            cache.add(key, 0, settings.LOGIN_ATTEMPTS_WINDOW)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, 1, settings.LOGIN_ATTEMPTS_WINDOW)
+
+    def reset(self):
+        """Сброс счетчика email с IP-адреса после успешного входа."""
+        if self.email_key is not None:
+            cache.delete(self.email_key)
@@ -2,6 +2,16 @@ import logging
 
 from django.apps import apps
 
+# Тип и шаблон уведомления отправителю заявки на дружбу по ее статусу
+FRIEND_REQUEST_NOTIFICATIONS = {
+    "Pending": ("FRIEND_REQUEST",
+                "{} отправил Вам запрос на добавления в друзья."),
+    "Accepted": ("FRIEND_REQUEST_ACCEPTED",
+                 "{} принял Ваш запрос на добавления в друзья."),
+    "Declined": ("FRIEND_REQUEST_REJECTED",
+                 "{} отклонил Ваш запрос на добавления в друзья."),
+}
+
 
 def send_notification(recipient, notification_type, message):
     """Отправляет уведомление получателю."""
@@ -27,18 +37,38 @@ def handle_friend_request(instance):
     try:
         recipient_settings = notification_settings.objects.get(
             user=instance.from_user)
-        if recipient_settings.receive_notifications:
-            if instance.status == "Accepted":
-                message = (f"{instance.to_user} принял Ваш "
-                           f"запрос на добавления в друзья.")
-                notification_type = "FRIEND_REQUEST_ACCEPTED"
-                send_notification(instance.from_user, notification_type,
-                                  message)
-            elif instance.status == "Declined":
-                message = (f"{instance.to_user} отклонил Ваш запрос на "
-                           f"добавления в друзья.")
-                notification_type = "FRIEND_REQUEST_REJECTED"
-                send_notification(instance.from_user, notification_type,
-                                  message)
+        if (recipient_settings.receive_notifications
+                and instance.status in ("Accepted", "Declined")):
+            notification_type, message = FRIEND_REQUEST_NOTIFICATIONS[
+                instance.status]
+            send_notification(instance.from_user, notification_type,
+                              message.format(instance.to_user))
     except notification_settings.DoesNotExist:
         logging.error("Настройки уведомлений для пользователя не найдены.")
+
+
+def send_bulk_notifications(notification_type, messages):
+    """Отправляет уведомления нескольким получателям одним запросом.
+
+    messages - словарь {id получателя: сообщение}. Уведомления создаются
+    только для получателей, у которых они включены в настройках.
+    """
+    notification_settings = apps.get_model("notifications",
+                                           "NotificationSettings")
+    notifications = apps.get_model("notifications", "Notification")
+    recipient_ids = set(notification_settings.objects.filter(
+        user_id__in=messages, receive_notifications=True
+    ).values_list("user_id", flat=True))
+    created = notifications.objects.bulk_create(
+        notifications(
+            recipient_id=recipient_id,
+            type=notification_type,
+            message=message,
+        )
+        for recipient_id, message in messages.items()
+        if recipient_id in recipient_ids
+    )
+    logging.info(
+        f"Уведомления отправлены: Количество - {len(created)}, "
+        f"Тип уведомления - {notification_type}")
+    return created
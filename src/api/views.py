@@ -1,4 +1,4 @@
-from django.db.models import Q
+from django.db.models import Exists, OuterRef, Q
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
@@ -9,38 +9,44 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
-from config.constants import MAX_DISTANCE
-from events.models import Event, EventLocation, ParticipationRequest
+from events.models import Event, ParticipationRequest
 from notifications.models import Notification, NotificationSettings
-from users.models import (
-    Blacklist,
-    City,
-    FriendRequest,
-    Friendship,
-    Interest,
-    User,
-    UserLocation,
-)
+from users.models import Blacklist, City, FriendRequest, Interest, User
 
+from .cache import get_blocked_by_ids, get_friend_ids
 from .filters import EventsFilter, UserFilter
 from .geo import (
+    get_bounding_box_filter,
+    get_distances,
     get_event_distance,
     get_event_location,
+    get_max_distance,
     get_user_distance,
     get_user_location,
     save_user_location,
 )
-from .pagination import EventPagination, MyPagination
+from .graph import friend_graph
+from .matching import interest_matrix
+from .pagination import (
+    CreatedAtPagination,
+    DistanceCursorPagination,
+    EventListPagination,
+    UserPagination,
+)
 from .permissions import (
     IsAdminOrAuthorOrReadOnly,
     IsAdminOrAuthorOrReadOnlyAndNotBlocked,
     IsEventOrganizer,
     IsRecipient,
 )
+from .querysets import annotate_events, annotate_users
+from .search import FullTextSearchFilter
 from .serializers import (
     BlacklistSerializer,
     CitySerializer,
     EventSerializer,
+    FriendRequestBulkCreateSerializer,
+    FriendRequestBulkSerializer,
     FriendRequestSerializer,
     InterestSerializer,
     MyEventSerializer,
@@ -49,8 +55,20 @@ from .serializers import (
     NotificationSerializer,
     NotificationSettingsSerializer,
     ParticipationSerializer,
+    RecommendationQuerySerializer,
+    SimilarUsersQuerySerializer,
 )
 from .services import FriendRequestService, ParticipationRequestService
+from .spatial import user_location_index
+
+
+def get_blacklist_ids(user):
+    """Множество id пользователей из черного списка в обе стороны."""
+    return set(
+        Blacklist.objects.filter(user=user).values_list(
+            "blocked_user_id", flat=True
+        )
+    ) | get_blocked_by_ids(user.id)
 
 
 class MyUserViewSet(UserViewSet):
@@ -58,43 +76,54 @@ class MyUserViewSet(UserViewSet):
 
     queryset = User.objects.all()
     serializer_class = MyUserSerializer
-    pagination_class = MyPagination
-    filter_backends = (filters.SearchFilter, DjangoFilterBackend)
+    pagination_class = UserPagination
+    filter_backends = (FullTextSearchFilter, DjangoFilterBackend)
     filterset_class = UserFilter
-    search_fields = [
-        "email",
-        "first_name",
-        "last_name",
-        "birthday",
-        "city__name",
-    ]
     permission_classes = [
         IsAdminOrAuthorOrReadOnlyAndNotBlocked,
     ]
 
+    def get_queryset(self):
+        """Пользователи с аннотациями и связанными объектами.
+
+        В списке не выводятся пользователи, заблокировавшие текущего.
+        """
+        queryset = super().get_queryset()
+        user = self.request.user
+        if (
+            self.action == "list"
+            and user.is_authenticated
+            and not user.is_staff
+            and get_blocked_by_ids(user.id)
+        ):
+            queryset = queryset.exclude(
+                Exists(
+                    Blacklist.objects.filter(
+                        user=OuterRef("pk"), blocked_user=user
+                    )
+                )
+            )
+        return annotate_users(queryset, user)
+
+    def get_instance(self):
+        """Текущий пользователь для /users/me/, загруженный из базы.
+
+        request.user из кэша аутентификации содержит только часть полей,
+        поэтому профиль читается и сохраняется по актуальной строке.
+        """
+        return get_object_or_404(self.get_queryset(), pk=self.request.user.pk)
+
+    def initial(self, request, *args, **kwargs):
+        """Сохранение геолокации текущего пользователя перед запросом."""
+        super().initial(request, *args, **kwargs)
+        save_user_location(request)
+
     def get_serializer_class(self):
         """Выбор сериализатора."""
-        # Сохранение геолокации текущего пользователя
-        save_user_location(self.request.user)
         if self.request.method == "POST":
             return MyUserCreateSerializer
         return MyUserSerializer
 
-    def list(self, request, *args, **kwargs):
-        """Получение списка пользователей."""
-        if not request.user.is_staff:
-            blocks = Blacklist.objects.filter(blocked_user=request.user)
-            if blocks.exists():
-                blockers = []
-                for obj in blocks:
-                    blockers.append(obj.user.id)
-                queryset = User.objects.all().exclude(id__in=blockers)
-                serializer = MyUserSerializer(
-                    queryset, many=True, context={"request": request}
-                )
-                return Response(serializer.data, status=status.HTTP_200_OK)
-        return super().list(request, *args, **kwargs)
-
     @action(
         detail=False,
         methods=["get"],
@@ -103,15 +132,10 @@ class MyUserViewSet(UserViewSet):
     )
     def my_friends(self, request):
         """Вывод друзей текущего пользователя."""
-        friendships = Friendship.objects.filter(
-            initiator=self.request.user
-        ) | Friendship.objects.filter(friend=self.request.user)
-        friends = []
-        for friendship in friendships:
-            if friendship.initiator == self.request.user:
-                friends.append(friendship.friend)
-            else:
-                friends.append(friendship.initiator)
+        friends = annotate_users(
+            User.objects.filter(id__in=get_friend_ids(request.user.id)),
+            request.user,
+        )
         serializer = MyUserSerializer(
             friends, many=True, context={"request": request}
         )
@@ -189,26 +213,152 @@ class MyUserViewSet(UserViewSet):
 
     @action(detail=False, permission_classes=[IsAuthenticated])
     def distances(self, request):
-        """Получение расстояния до пользователей от текущего пользователя."""
-        locations = UserLocation.objects.all().exclude(user=self.request.user)
-        data = []
-        if self.request.query_params and self.request.query_params["search"]:
-            max_distance = int(self.request.query_params["search"])
-        else:
-            max_distance = MAX_DISTANCE
-        for location in locations:
-            distance = get_user_distance(
-                self.request.user, location.user, (location.lat, location.lon)
+        """Получение расстояния до пользователей от текущего пользователя.
+
+        Пользователи в радиусе `search` км (по умолчанию MAX_DISTANCE)
+        ищутся по пространственному индексу и сортируются по расстоянию.
+        """
+        origin = get_user_location(request.user)
+        if origin is None:
+            return Response([], status=status.HTTP_200_OK)
+        nearby = user_location_index.query_radius(
+            origin["latitude"],
+            origin["longitude"],
+            get_max_distance(request.query_params),
+            exclude={request.user.id},
+        )
+        users = User.objects.filter(
+            id__in=[user_id for user_id, _ in nearby], is_geoip_allowed=True
+        ).only("id", "first_name", "last_name")
+        users = {user.id: user for user in users}
+        data = [
+            {
+                "user": user_id,
+                "first_name": users[user_id].first_name,
+                "last_name": users[user_id].last_name,
+                "distance": distance,
+            }
+            for user_id, distance in nearby
+            if user_id in users
+        ]
+        return Response(data, status=status.HTTP_200_OK)
+
+    @action(detail=False, permission_classes=[IsAuthenticated])
+    def nearest(self, request):
+        """Получение ближайших к текущему пользователю пользователей.
+
+        Пользователи упорядочены по расстоянию, по `limit` на страницу.
+        Пропускаются пользователи из черного списка в обе стороны и
+        запретившие геолокацию.
+        """
+        paginator = DistanceCursorPagination()
+        origin = get_user_location(request.user)
+        if origin is None:
+            return paginator.get_paginated_response(request, [])
+        page_size = paginator.get_page_size(request)
+        after = paginator.decode_cursor(request)
+        exclude = get_blacklist_ids(request.user) | {request.user.id}
+        while True:
+            # Запрашивается на одного пользователя больше, чтобы узнать,
+            # есть ли следующая страница
+            nearest = user_location_index.query_nearest(
+                origin["latitude"],
+                origin["longitude"],
+                page_size + 1,
+                after=after,
+                exclude=exclude,
             )
-            if distance and distance["distance"] <= max_distance:
-                data.append(
-                    {
-                        "user": location.user.id,
-                        "first_name": location.user.first_name,
-                        "last_name": location.user.last_name,
-                        "distance": distance["distance"],
-                    }
-                )
+            users = User.objects.filter(
+                id__in=[user_id for user_id, _ in nearest],
+                is_geoip_allowed=True,
+            ).in_bulk()
+            hidden = {user_id for user_id, _ in nearest} - users.keys()
+            if not hidden:
+                break
+            exclude |= hidden
+        page = nearest[:page_size]
+        data = [
+            {
+                "user": user_id,
+                "first_name": users[user_id].first_name,
+                "last_name": users[user_id].last_name,
+                "distance": distance,
+            }
+            for user_id, distance in page
+        ]
+        position = None
+        if len(nearest) > page_size:
+            position = (page[-1][1], page[-1][0])
+        return paginator.get_paginated_response(request, data, position)
+
+    @action(detail=False, permission_classes=[IsAuthenticated])
+    def suggestions(self, request):
+        """Получение возможных знакомых текущего пользователя.
+
+        Пользователи упорядочены по числу общих друзей, выводится не
+        больше `limit`. Пропускаются пользователи из черного списка в обе
+        стороны и пользователи с неотвеченными заявками в друзья.
+        """
+        query = RecommendationQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        exclude = get_blacklist_ids(request.user)
+        exclude.update(
+            FriendRequest.objects.filter(
+                from_user=request.user, status="Pending"
+            ).values_list("to_user_id", flat=True),
+            FriendRequest.objects.filter(
+                to_user=request.user, status="Pending"
+            ).values_list("from_user_id", flat=True),
+        )
+        suggestions = friend_graph.get_suggestions(
+            request.user.id, query.validated_data["limit"], exclude=exclude
+        )
+        users = User.objects.only("id", "first_name", "last_name").in_bulk(
+            [user_id for user_id, _ in suggestions]
+        )
+        data = [
+            {
+                "user": user_id,
+                "first_name": users[user_id].first_name,
+                "last_name": users[user_id].last_name,
+                "mutual_friends": count,
+            }
+            for user_id, count in suggestions
+            if user_id in users
+        ]
+        return Response(data, status=status.HTTP_200_OK)
+
+    @action(detail=False, permission_classes=[IsAuthenticated])
+    def similar(self, request):
+        """Получение пользователей с похожими интересами.
+
+        Пользователи упорядочены по сходству интересов с текущим
+        пользователем: мере Жаккара (`metric=jaccard`, по умолчанию) или
+        коэффициенту перекрытия (`metric=overlap`), выводится не больше
+        `limit`. Пропускаются пользователи из черного списка в обе стороны.
+        """
+        query = SimilarUsersQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        similar = interest_matrix.get_similar(
+            request.user.id,
+            query.validated_data["limit"],
+            metric=query.validated_data["metric"],
+            exclude=get_blacklist_ids(request.user),
+        )
+        users = User.objects.only("id", "first_name", "last_name").in_bulk(
+            [user_id for user_id, _, _ in similar]
+        )
+        data = [
+            {
+                "user": user_id,
+                "first_name": users[user_id].first_name,
+                "last_name": users[user_id].last_name,
+                "similarity": round(score, 3),
+                "common_interests": common,
+            }
+            for user_id, score, common in similar
+            if user_id in users
+        ]
         return Response(data, status=status.HTTP_200_OK)
 
 
@@ -219,6 +369,7 @@ class FriendRequestViewSet(ModelViewSet):
     """
 
     serializer_class = FriendRequestSerializer
+    pagination_class = CreatedAtPagination
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -264,6 +415,60 @@ class FriendRequestViewSet(ModelViewSet):
             status=status.HTTP_200_OK,
         )
 
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="bulk",
+        serializer_class=FriendRequestBulkCreateSerializer,
+    )
+    def send_requests(self, request):
+        """Отправка заявок на дружбу нескольким пользователям."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        friend_requests = FriendRequestService.send_friend_requests(
+            request.user, serializer.validated_data["to_users"]
+        )
+        return Response(
+            FriendRequestSerializer(friend_requests, many=True).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="bulk/accept",
+        serializer_class=FriendRequestBulkSerializer,
+    )
+    def accept_requests(self, request):
+        """Принятие нескольких заявок на дружбу текущим пользователем."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = FriendRequestService.accept_friend_requests(
+            serializer.validated_data["ids"], request.user
+        )
+        return Response(
+            {"message": "Заявки на дружбу приняты.", "ids": ids},
+            status=status.HTTP_200_OK,
+        )
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="bulk/decline",
+        serializer_class=FriendRequestBulkSerializer,
+    )
+    def decline_requests(self, request):
+        """Отклонение нескольких заявок на дружбу текущим пользователем."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = FriendRequestService.decline_friend_requests(
+            serializer.validated_data["ids"], request.user
+        )
+        return Response(
+            {"message": "Заявки на дружбу отклонены.", "ids": ids},
+            status=status.HTTP_200_OK,
+        )
+
     # TODO: drf-yasg: Update decorator
     # @swagger_auto_schema(
     #     responses={
@@ -305,21 +510,25 @@ class EventViewSet(ModelViewSet):
     queryset = Event.objects.all()
     serializer_class = EventSerializer
     filter_backends = (
-        filters.SearchFilter,
+        FullTextSearchFilter,
         DjangoFilterBackend,
     )
     filterset_class = EventsFilter
-    search_fields = [
-        "name",
-        "event_type",
-        "city__name",
-        "address",
-    ]
-    pagination_class = EventPagination
+    pagination_class = EventListPagination
     permission_classes = [
         IsAdminOrAuthorOrReadOnly,
     ]
 
+    def get_queryset(self):
+        """Мероприятия с участниками, организатором и их числом.
+
+        Аннотации и загрузка связей нужны только при выводе мероприятий.
+        """
+        queryset = super().get_queryset()
+        if self.action in ("list", "retrieve"):
+            return annotate_events(queryset, self.request.user)
+        return queryset
+
     @action(detail=True, methods=["get"], permission_classes=[IsAuthenticated])
     def geolocation(self, request, **kwargs):
         """Получение геолокации мероприятия."""
@@ -345,24 +554,42 @@ class EventViewSet(ModelViewSet):
     @action(detail=False, permission_classes=[IsAuthenticated])
     def distances(self, request):
         """Получение расстояния до мероприятий от текущего пользователя."""
-        locations = EventLocation.objects.all()
-        data = []
-        if self.request.query_params and self.request.query_params["search"]:
-            max_distance = int(self.request.query_params["search"])
-        else:
-            max_distance = MAX_DISTANCE
-        for location in locations:
-            distance = get_event_distance(
-                self.request.user, location.event, (location.lat, location.lon)
+        origin = get_user_location(request.user)
+        if origin is None:
+            return Response([], status=status.HTTP_200_OK)
+        origin = (origin["latitude"], origin["longitude"])
+        max_distance = get_max_distance(request.query_params)
+        # Параметр search задает расстояние, поэтому поиск по тексту
+        # не применяется, остальные фильтры мероприятий учитываются
+        queryset = DjangoFilterBackend().filter_queryset(
+            request, self.get_queryset(), self
+        )
+        locations = list(
+            queryset.filter(
+                get_bounding_box_filter(
+                    *origin, max_distance, prefix="eventlocation__"
+                )
+            ).values_list(
+                "id", "name", "eventlocation__lat", "eventlocation__lon"
             )
-            if distance and distance["distance"] <= max_distance:
-                data.append(
-                    {
-                        "event": location.event.id,
-                        "name": location.event.name,
-                        "distance": distance["distance"],
-                    }
+        )
+        if not locations:
+            return Response([], status=status.HTTP_200_OK)
+        distances = get_distances(
+            origin,
+            [(lat, lon) for _, _, lat, lon in locations],
+            accurate=True,
+        ).round(3)
+        data = sorted(
+            (
+                {"event": event_id, "name": name, "distance": float(distance)}
+                for (event_id, name, _, _), distance in zip(
+                    locations, distances
                 )
+                if distance <= max_distance
+            ),
+            key=lambda item: (item["distance"], item["event"]),
+        )
         return Response(data, status=status.HTTP_200_OK)
 
 
@@ -449,6 +676,7 @@ class NotificationViewSet(ModelViewSet):
     """Вьюсет уведомлений пользователя."""
 
     serializer_class = NotificationSerializer
+    pagination_class = CreatedAtPagination
 
     def get_queryset(self):
         """Получает список уведомлений текущего пользователя."""
@@ -1,17 +1,17 @@
 from channels.db import database_sync_to_async
 from channels.middleware import BaseMiddleware
 from django.contrib.auth.models import AnonymousUser
-from rest_framework.authtoken.models import Token
+
+from api.cache import get_token_user
 
 
 @database_sync_to_async
 def get_user(token_key):
-    """Получение пользователя из токена аутентификации."""
-    try:
-        token = Token.objects.get(key=token_key)
-        return token.user
-    except Token.DoesNotExist:
+    """Получение пользователя из токена аутентификации через кэш."""
+    user = get_token_user(token_key)
+    if user is None or not user.is_active:
         return AnonymousUser()
+    return user
 
 
 class TokenAuthMiddleware(BaseMiddleware):
@@ -1,9 +1,8 @@
-from django.db.models import Q
 from rest_framework import exceptions
 
+from api.cache import is_friend
 from chat.models import Chat
 from config.constants import messages
-from users.models import Friendship
 
 
 def get_chat_and_permissions(user, chat_id):
@@ -29,13 +28,8 @@ def get_chat_and_permissions(user, chat_id):
 
 def check_friendshhip(user, other_user):
     """Проверка дружбы между пользователями."""
-    qs = Friendship.objects.filter(
-        Q(initiator=user, friend=other_user)
-        | Q(initiator=other_user, friend=user),
-    )
-    if not qs.exists():
+    if not is_friend(user.id, other_user.id):
         raise exceptions.ValidationError(
             detail=messages.USER_IS_NOT_FRIEND % str(other_user),
             code="user_not_friend",
         )
-    return qs.first()
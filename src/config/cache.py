@@ -0,0 +1,71 @@
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+# Признак отсутствия значения в кэше (None - допустимое значение)
+MISSING = object()
+
+_registry = weakref.WeakSet()
+
+
+class LocalCache:
+    """Потокобезопасный LRU-кэш в памяти процесса с необязательным TTL.
+
+    Хранит не более maxsize значений, при переполнении вытесняет давно не
+    использовавшиеся. Считает попадания и промахи.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        _registry.add(self)
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=MISSING):
+        """Получение значения по ключу."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, expires_at = item
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=MISSING):
+        """Сохранение значения. ttl=None - без ограничения срока."""
+        ttl = self.ttl if ttl is MISSING else ttl
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Удаление значения по ключу."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Очистка кэша и счетчиков."""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+def clear_local_caches():
+    """Очистка всех локальных кэшей процесса."""
+    for cache in list(_registry):
+        cache.clear()
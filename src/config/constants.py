@@ -20,13 +20,23 @@ MAX_LENGTH_PASSWORD = 50
 MAX_LENGTH_DESCRIBE = 500
 MAX_FILE_SIZE = 8 * 1024 * 1024  # 8388608
 MAX_FILE_SIZE_MB = 8
+# Размеры уменьшенных копий аватара в пикселях
+AVATAR_SIZES = (100, 300, 600)
+AVATAR_THUMBNAILS_DIR = "images/user/thumbnails"
+AVATAR_WEBP_QUALITY = 80
 MAX_MESSAGES_IN_CHAT = 30
 MAX_CHAT_MESSAGE_LENGTH = 1000
 MIN_USER_AGE = 14
 MAX_USER_AGE = 120
 MAX_LENGTH_TEXT = 1000
+MAX_LENGTH_GEOCODE_KEY = 2 * MAX_LENGTH_CHAR + 1
 
 MAX_DISTANCE = 500
+# Наибольшее число заявок на дружбу в одном пакетном запросе
+MAX_BULK_FRIEND_REQUESTS = 200
+# Число рекомендуемых пользователей по умолчанию и наибольшее в запросе
+DEFAULT_RECOMMENDATIONS_LIMIT = 20
+MAX_RECOMMENDATIONS_LIMIT = 100
 
 
 class Messages(object):
@@ -42,6 +52,9 @@ class Messages(object):
         f"до {MAX_LENGTH_PASSWORD} символов."
     )
     INVALID_CREDENTIALS_MSG = "Неверные имя пользователя или пароль."
+    TOO_MANY_LOGIN_ATTEMPTS_MSG = (
+        "Слишком много попыток входа. Повторите попытку позже."
+    )
     INVALID_EMAIL_MSG = "Некорректный адрес электронной почты."
     FIRST_NAME_LENGTH_MSG = (
         f"Имя должно содержать от {MIN_LENGTH_CHAR} до "
@@ -71,6 +84,10 @@ class Messages(object):
     USER_IS_NOT_FRIEND = (
         "Чтобы начать чат, вы должны быть в друзьях с пользователем %s."
     )
+    INTEREST_DOES_NOT_EXIST = "Интерес %s не найден."
+    FILE_SIZE_MSG = (
+        f"Размер файла превышает допустимый лимит: {MAX_FILE_SIZE_MB} MB."
+    )
 
     # Ниже получаем стандартные сообщения валидации Django и других пакетов
 
@@ -30,6 +30,7 @@ DJANGO_APPS = (
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
 )
 
 THIRD_PARTY_APPS = (
@@ -269,18 +270,60 @@ MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 GEOIP_PATH = os.path.join(BASE_DIR, "data/geoip")
 GEOIP_COUNTRY = "GeoLite2-Country.mmdb"
 GEOIP_CITY = "GeoLite2-City.mmdb"
+# LRU-кэш результатов поиска геолокации по IP-адресу
+GEOIP_CACHE_SIZE = int(os.getenv("GEOIP_CACHE_SIZE", 10000))
+GEOIP_CACHE_TTL = int(os.getenv("GEOIP_CACHE_TTL", 24 * 60 * 60))
+
+# Геокодирование адресов мероприятий
+GEOCODER_BACKEND = os.getenv(
+    "GEOCODER_BACKEND", "api.geocoding.SeleniumGeocoder"
+)
+GEOCODER_POOL_SIZE = int(os.getenv("GEOCODER_POOL_SIZE", 2))
+GEOCODER_TIMEOUT = int(os.getenv("GEOCODER_TIMEOUT", 3))
+GEOCODE_CACHE_SIZE = int(os.getenv("GEOCODE_CACHE_SIZE", 10000))
+GEOCODE_MISS_TTL = int(os.getenv("GEOCODE_MISS_TTL", 24 * 60 * 60))
+
+# Отложенная запись геолокаций пользователей: интервал сброса буфера
+# (0 - запись сразу), минимальные смещение (км) и интервал между записями
+USER_LOCATION_FLUSH_INTERVAL = int(
+    os.getenv("USER_LOCATION_FLUSH_INTERVAL", 5)
+)
+USER_LOCATION_MIN_DISTANCE = float(os.getenv("USER_LOCATION_MIN_DISTANCE", 1))
+USER_LOCATION_REFRESH_INTERVAL = int(
+    os.getenv("USER_LOCATION_REFRESH_INTERVAL", 10 * 60)
+)
+USER_LOCATION_CACHE_SIZE = int(os.getenv("USER_LOCATION_CACHE_SIZE", 100000))
+
+# Пространственный индекс геолокаций пользователей
+GEO_INDEX_CELL_SIZE = float(os.getenv("GEO_INDEX_CELL_SIZE", 0.5))
+GEO_INDEX_TTL = int(os.getenv("GEO_INDEX_TTL", 300))
+
+# Граф дружбы для рекомендаций: время жизни (с) и число изменений до
+# полной перестройки
+FRIEND_GRAPH_TTL = int(os.getenv("FRIEND_GRAPH_TTL", 300))
+FRIEND_GRAPH_MAX_DELTA = int(os.getenv("FRIEND_GRAPH_MAX_DELTA", 10000))
+
+# Матрица интересов для поиска похожих пользователей: время жизни (с)
+INTEREST_MATRIX_TTL = int(os.getenv("INTEREST_MATRIX_TTL", 300))
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Фоновые задачи
+BACKGROUND_TASKS_WORKERS = int(os.getenv("BACKGROUND_TASKS_WORKERS", 4))
+BACKGROUND_TASKS_EAGER = os.getenv("BACKGROUND_TASKS_EAGER", "False") == "True"
+
 REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_SCHEMA_CLASS": "config.schema.CustomAutoSchema",
     "EXCEPTION_HANDLER": "drf_standardized_errors.handler.exception_handler",
+    # Число доверенных прокси перед приложением (nginx), дописывающих
+    # адрес клиента в X-Forwarded-For. 0 - заголовок не учитывается
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", 1)),
 }
 
 SPECTACULAR_SETTINGS = {
@@ -318,6 +361,41 @@ DRF_STANDARDIZED_ERRORS = {
     "ALLOWED_ERROR_STATUS_CODES": ["400", "401", "403", "404", "405"],
 }
 
+CACHES = {
+    "default": (
+        {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+        if DEBUG
+        else {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": "redis://{}:{}/{}".format(
+                os.getenv("REDIS_HOST", "redis"),
+                os.getenv("REDIS_PORT", 6379),
+                os.getenv("REDIS_CACHE_DB", 1),
+            ),
+        }
+    ),
+}
+
+# Кэш связей пользователей (друзья, черный список): размер и срок жизни
+# (с) локального кэша процесса, срок жизни (с) в общем кэше
+RELATIONS_CACHE_SIZE = int(os.getenv("RELATIONS_CACHE_SIZE", 10000))
+RELATIONS_LOCAL_CACHE_TTL = int(os.getenv("RELATIONS_LOCAL_CACHE_TTL", 5))
+RELATIONS_CACHE_TTL = int(os.getenv("RELATIONS_CACHE_TTL", 60 * 60))
+
+# Кэш аутентификации по токену: размер и срок жизни (с) локального кэша
+# процесса, срок жизни (с) в общем кэше
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", 10000))
+AUTH_LOCAL_CACHE_TTL = int(os.getenv("AUTH_LOCAL_CACHE_TTL", 5))
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", 5 * 60))
+
+# Ограничение неудачных попыток входа: число попыток с одного IP-адреса
+# и для одного email с одного IP-адреса за окно (с), 0 - без ограничения
+LOGIN_ATTEMPTS_PER_IP = int(os.getenv("LOGIN_ATTEMPTS_PER_IP", 50))
+LOGIN_ATTEMPTS_PER_EMAIL = int(os.getenv("LOGIN_ATTEMPTS_PER_EMAIL", 10))
+LOGIN_ATTEMPTS_WINDOW = int(os.getenv("LOGIN_ATTEMPTS_WINDOW", 15 * 60))
+
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
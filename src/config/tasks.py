@@ -0,0 +1,91 @@
+import atexit
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from config.logging import logger
+
+_periodic_tasks = {}
+_periodic_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def get_executor():
+    """Общий для процесса пул потоков фоновых задач."""
+    return ThreadPoolExecutor(
+        max_workers=settings.BACKGROUND_TASKS_WORKERS,
+        thread_name_prefix="background",
+    )
+
+
+def _run_task(func, *args, **kwargs):
+    """Выполнение фоновой задачи в потоке пула."""
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    except Exception as e:
+        logger.exception(
+            f"В фоновой задаче {func.__name__} модуля {func.__module__} "
+            f"вызвано исключение: {str(e)}"
+        )
+        return None
+    finally:
+        close_old_connections()
+
+
+def run_in_background(func, *args, **kwargs):
+    """Запуск задачи в фоне после фиксации текущей транзакции.
+
+    При BACKGROUND_TASKS_EAGER задача выполняется синхронно в текущем
+    потоке, что удобно для тестов и локальной разработки.
+    """
+    if settings.BACKGROUND_TASKS_EAGER:
+        transaction.on_commit(lambda: func(*args, **kwargs))
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(_run_task, func, *args, **kwargs)
+    )
+
+
+def _run_at_exit(func):
+    """Выполнение задачи при завершении процесса."""
+    try:
+        func()
+    except Exception as e:
+        logger.exception(
+            f"В задаче {func.__name__} при завершении процесса вызвано "
+            f"исключение: {str(e)}"
+        )
+
+
+def _run_periodic(func, interval):
+    """Цикл периодической задачи."""
+    while True:
+        time.sleep(interval)
+        _run_task(func)
+
+
+def run_periodically(func, interval):
+    """Запуск задачи в фоновом потоке каждые interval секунд.
+
+    Повторный вызов для уже запущенной задачи ничего не делает. При
+    завершении процесса задача выполняется еще раз.
+    """
+    with _periodic_lock:
+        thread = _periodic_tasks.get(func)
+        if thread is not None and thread.is_alive():
+            return
+        thread = threading.Thread(
+            target=_run_periodic,
+            args=(func, interval),
+            name=f"periodic-{func.__name__}",
+            daemon=True,
+        )
+        if func not in _periodic_tasks:
+            atexit.register(_run_at_exit, func)
+        _periodic_tasks[func] = thread
+        thread.start()
@@ -0,0 +1,35 @@
+"""Заполнение кэша геокодирования по сохраненным геолокациям мероприятий."""
+
+from django.core.management import BaseCommand
+
+from api.geo import get_geocode_key
+from events.models import EventLocation, GeocodeResult
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    """Command."""
+
+    help = "Pre-warm geocode cache from existing EventLocation rows"
+
+    def handle(self, *args, **options):
+        """Handle."""
+        results = {}
+        locations = EventLocation.objects.filter(
+            event__city__isnull=False, event__address__isnull=False
+        ).values_list("event__city__name", "event__address", "lat", "lon")
+        for city, address, lat, lon in locations.iterator():
+            if address:
+                key = get_geocode_key(city, address)
+                results[key] = GeocodeResult(key=key, lat=lat, lon=lon)
+        GeocodeResult.objects.bulk_create(
+            results.values(),
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=["key"],
+            update_fields=["lat", "lon", "updated_at"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Cached {len(results)} geocode results")
+        )
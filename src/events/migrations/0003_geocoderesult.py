@@ -0,0 +1,65 @@
+# Generated by Django 5.0.2 on 2026-10-17 21:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0002_participationrequest_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GeocodeResult",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "key",
+                    models.CharField(
+                        max_length=301,
+                        unique=True,
+                        verbose_name="Нормализованный адрес",
+                    ),
+                ),
+                (
+                    "lon",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=6,
+                        max_digits=9,
+                        null=True,
+                        verbose_name="Долгота",
+                    ),
+                ),
+                (
+                    "lat",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=6,
+                        max_digits=9,
+                        null=True,
+                        verbose_name="Широта",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True, verbose_name="Обновлено"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Результат геокодирования",
+                "verbose_name_plural": "Результаты геокодирования",
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.2 on 2026-10-17 21:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0003_geocoderesult"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="eventlocation",
+            index=models.Index(
+                fields=["lat", "lon"], name="events_location_lat_lon_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 5.0.2 on 2026-10-17 21:38
+
+import re
+
+from django.db import migrations, models
+
+# Поисковый документ собирается так же, как в api.search на момент
+# миграции. Логика повторена здесь, чтобы миграция не зависела от
+# дальнейших изменений модуля
+SEARCH_CONFIG = "simple"
+SEARCH_FIELDS = ("name", "event_type", "address", "city__name")
+SEARCH_TABLE = "events_event_search"
+BATCH_SIZE = 1000
+
+
+def normalize_search_text(value):
+    """Нормализация текста для поискового документа."""
+    value = str(value).casefold().replace("ё", "е")
+    return " ".join(re.findall(r"\w+", value))
+
+
+def build_search_document(values):
+    """Поисковый документ из значений полей объекта."""
+    return " ".join(
+        normalize_search_text(value)
+        for value in values
+        if value is not None and value != ""
+    )
+
+
+def create_search_index(apps, schema_editor):
+    """Создание полнотекстового индекса и заполнение документов."""
+    model = apps.get_model("events", "Event")
+    connection = schema_editor.connection
+    table = schema_editor.quote_name(SEARCH_TABLE)
+    db_table = schema_editor.quote_name(model._meta.db_table)
+    if connection.vendor == "sqlite":
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {table} USING fts5(document, "
+            "tokenize='unicode61 remove_diacritics 2')"
+        )
+    elif connection.vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            f"CREATE INDEX {SEARCH_TABLE}_vector_idx "
+            f"ON {db_table} USING GIN (to_tsvector("
+            f"'{SEARCH_CONFIG}'::regconfig, "
+            "COALESCE(search_document, '')))"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX {SEARCH_TABLE}_trgm_idx "
+            f"ON {db_table} USING GIN (search_document gin_trgm_ops)"
+        )
+    objects = model._default_manager.using(connection.alias)
+    changed = [
+        model(pk=pk, search_document=build_search_document(values))
+        for pk, *values in objects.values_list("pk", *SEARCH_FIELDS).iterator()
+    ]
+    objects.bulk_update(changed, ["search_document"], batch_size=BATCH_SIZE)
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {table} (rowid, document) VALUES (%s, %s)",
+                [
+                    (obj.pk, obj.search_document)
+                    for obj in changed
+                    if obj.search_document
+                ],
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    """Удаление полнотекстового индекса."""
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        table = schema_editor.quote_name(SEARCH_TABLE)
+        schema_editor.execute(f"DROP TABLE IF EXISTS {table}")
+    elif vendor == "postgresql":
+        for suffix in ("vector_idx", "trgm_idx"):
+            schema_editor.execute(
+                f"DROP INDEX IF EXISTS {SEARCH_TABLE}_{suffix}"
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0004_eventlocation_lat_lon_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="search_document",
+            field=models.TextField(
+                blank=True,
+                default="",
+                editable=False,
+                verbose_name="Поисковый документ",
+            ),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
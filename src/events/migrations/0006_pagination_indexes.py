@@ -0,0 +1,19 @@
+# Generated by Django 5.0.2 on 2026-10-17 21:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0005_event_search_document"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["-start_date", "id"], name="events_start_date_id_idx"
+            ),
+        ),
+    ]
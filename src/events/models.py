@@ -3,7 +3,11 @@ from decimal import Decimal
 from django.db import models
 from django.utils import timezone
 
-from config.constants import MAX_LENGTH_CHAR, MAX_LENGTH_EVENT
+from config.constants import (
+    MAX_LENGTH_CHAR,
+    MAX_LENGTH_EVENT,
+    MAX_LENGTH_GEOCODE_KEY,
+)
 from users.models import City, Interest, User
 
 
@@ -78,6 +82,12 @@ class Event(models.Model):
         null=True,
         verbose_name="Максимальное количество участников",
     )
+    search_document = models.TextField(
+        blank=True,
+        default="",
+        editable=False,
+        verbose_name="Поисковый документ",
+    )
 
     class Meta:
         constraints = [
@@ -87,6 +97,12 @@ class Event(models.Model):
                 name="date_event_constraint",
             ),
         ]
+        indexes = [
+            # Курсорная пагинация списка мероприятий
+            models.Index(
+                fields=["-start_date", "id"], name="events_start_date_id_idx"
+            ),
+        ]
         verbose_name = "Мероприятие"
         verbose_name_plural = "Мероприятия"
         ordering = ("-start_date",)
@@ -151,11 +167,51 @@ class EventLocation(models.Model):
     class Meta:
         verbose_name = "Геолокация мероприятия"
         verbose_name_plural = "Геолокация мероприятий"
+        indexes = [
+            models.Index(
+                fields=["lat", "lon"], name="events_location_lat_lon_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.event} {self.lat}:{self.lon}"
 
 
+class GeocodeResult(models.Model):
+    """Модель кэша результатов геокодирования адресов.
+
+    Пустые координаты означают, что адрес не был найден геокодером.
+    """
+
+    key = models.CharField(
+        max_length=MAX_LENGTH_GEOCODE_KEY,
+        unique=True,
+        verbose_name="Нормализованный адрес",
+    )
+    lon = models.DecimalField(
+        verbose_name="Долгота",
+        max_digits=9,
+        decimal_places=6,
+        blank=True,
+        null=True,
+    )
+    lat = models.DecimalField(
+        verbose_name="Широта",
+        max_digits=9,
+        decimal_places=6,
+        blank=True,
+        null=True,
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновлено")
+
+    class Meta:
+        verbose_name = "Результат геокодирования"
+        verbose_name_plural = "Результаты геокодирования"
+
+    def __str__(self):
+        return f"{self.key} {self.lat}:{self.lon}"
+
+
 class ParticipationRequest(models.Model):
     """Модель заявки на участие в мероприятии."""
 
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.2 on 2026-10-17 21:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["recipient", "-created_at", "id"],
+                name="notifications_recipient_idx",
+            ),
+        ),
+    ]
@@ -27,6 +27,13 @@ class Notification(models.Model):
     read = models.BooleanField(default=False)
 
     class Meta:
+        indexes = [
+            # Курсорная пагинация уведомлений пользователя
+            models.Index(
+                fields=["recipient", "-created_at", "id"],
+                name="notifications_recipient_idx",
+            ),
+        ]
         verbose_name = "Уведомление"
         verbose_name_plural = "Уведомления"
 
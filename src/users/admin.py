@@ -1,11 +1,14 @@
 from datetime import date, timedelta
 
 from admin_auto_filters.filters import AutocompleteFilter
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin
+from django.http import Http404
 from django.utils import timezone
 from django.utils.safestring import mark_safe
 
+from api.services import FriendRequestService
+
 from .models import (
     Blacklist,
     City,
@@ -246,6 +249,35 @@ class FriendRequestAdmin(admin.ModelAdmin):
     date_hierarchy = "created_at"
     ordering = ("-created_at",)
 
+    def save_model(self, request, obj, form, change):
+        """Сохранение заявки в админке.
+
+        Смена статуса ожидающей заявки выполняется через
+        FriendRequestService условным UPDATE, поэтому дружба создается
+        только при переходе из статуса 'Pending', а повторное сохранение
+        принятой заявки не восстанавливает удаленную дружбу.
+        """
+        status = obj.status
+        process = {
+            "Accepted": FriendRequestService.accept_friend_request,
+            "Declined": FriendRequestService.decline_friend_request,
+        }.get(status)
+        if not (change and process and "status" in form.changed_data):
+            super().save_model(request, obj, form, change)
+            return
+        obj.status = form.initial["status"]
+        super().save_model(request, obj, form, change)
+        try:
+            process(obj.pk, obj.to_user)
+        except Http404:
+            self.message_user(
+                request,
+                "Статус не изменен: заявка уже обработана.",
+                messages.WARNING,
+            )
+        else:
+            obj.status = status
+
 
 @admin.register(Blacklist)
 class BlacklistAdmin(admin.ModelAdmin):
@@ -0,0 +1,109 @@
+import hashlib
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from config.constants import (
+    AVATAR_SIZES,
+    AVATAR_THUMBNAILS_DIR,
+    AVATAR_WEBP_QUALITY,
+)
+from config.logging import logger
+
+from .exceptions import ImageResizeError
+
+JPEG = "JPEG"
+WEBP = "WEBP"
+
+
+def get_content_hash(file):
+    """Хэш SHA-256 содержимого файла, читаемого по частям."""
+    content_hash = hashlib.sha256()
+    file.seek(0)
+    for chunk in file.chunks():
+        content_hash.update(chunk)
+    file.seek(0)
+    return content_hash.hexdigest()
+
+
+def get_extension(image_format):
+    """Расширение файла для формата изображения."""
+    return "jpg" if image_format == JPEG else image_format.lower()
+
+
+def encode_image(image, image_format):
+    """Изображение в заданном формате в виде байтов."""
+    # JPEG не поддерживает прозрачность и палитру
+    if image_format == JPEG and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    options = {"quality": AVATAR_WEBP_QUALITY} if image_format == WEBP else {}
+    output = BytesIO()
+    image.save(output, format=image_format, **options)
+    return output.getvalue()
+
+
+def make_thumbnails(file, content_hash, storage):
+    """Сохранение уменьшенных копий изображения во всех размерах.
+
+    Копии сохраняются в исходном формате и в WebP по пути, зависящему от
+    хэша содержимого, поэтому уже созданные файлы не пересоздаются.
+    Возвращает словарь {размер: {формат: имя файла}}.
+    """
+    try:
+        with Image.open(file) as source:
+            # Фотографии MPO с камер сохраняются как обычный JPEG
+            image_format = JPEG if source.format == "MPO" else source.format
+            image = ImageOps.exif_transpose(source)
+            image.load()
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ImageResizeError(
+            f"Не удалось изменить размер изображения: {str(e)}"
+        )
+    thumbnails = {}
+    for size in AVATAR_SIZES:
+        thumbnail = image.copy()
+        thumbnail.thumbnail((size, size), Image.LANCZOS)
+        versions = {}
+        for version_format in dict.fromkeys((image_format, WEBP)):
+            extension = get_extension(version_format)
+            name = f"{AVATAR_THUMBNAILS_DIR}/{content_hash}/{size}.{extension}"
+            if not storage.exists(name):
+                name = storage.save(
+                    name,
+                    ContentFile(encode_image(thumbnail, version_format)),
+                )
+            versions[extension] = name
+        thumbnails[str(size)] = versions
+    return thumbnails
+
+
+def process_avatar(user_id, content_hash):
+    """Создание уменьшенных копий аватара пользователя.
+
+    Выполняется в фоне. Если аватар успел смениться, задача ничего не
+    делает: копии создаст задача для нового аватара.
+    """
+    from .models import User
+
+    user = (
+        User.objects.filter(pk=user_id, avatar_hash=content_hash)
+        .only("avatar")
+        .first()
+    )
+    if user is None or not user.avatar:
+        return
+    try:
+        with user.avatar.open("rb") as file:
+            thumbnails = make_thumbnails(
+                file, content_hash, user.avatar.storage
+            )
+    except ImageResizeError as e:
+        logger.warning(f"Аватар пользователя {user_id} не обработан: {e}")
+        return
+    from api.cache import invalidate_auth_user
+
+    User.objects.filter(pk=user_id, avatar_hash=content_hash).update(
+        avatar_thumbnails=thumbnails
+    )
+    invalidate_auth_user(user_id)
@@ -0,0 +1,34 @@
+"""Создание уменьшенных копий сохраненных аватарок."""
+
+from django.core.management import BaseCommand
+
+from users.images import get_content_hash, process_avatar
+from users.models import User
+
+
+class Command(BaseCommand):
+    """Command."""
+
+    help = "Create avatar thumbnails for users that do not have them yet"
+
+    def handle(self, *args, **options):
+        """Handle."""
+        users = (
+            User.objects.exclude(avatar="")
+            .exclude(avatar__isnull=True)
+            .filter(avatar_thumbnails={})
+            .only("avatar", "avatar_hash")
+        )
+        processed = 0
+        for user in users.iterator():
+            if not user.avatar.storage.exists(user.avatar.name):
+                continue
+            if not user.avatar_hash:
+                with user.avatar.open("rb") as file:
+                    user.avatar_hash = get_content_hash(file)
+                User.objects.filter(pk=user.pk).update(
+                    avatar_hash=user.avatar_hash
+                )
+            process_avatar(user.pk, user.avatar_hash)
+            processed += 1
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} avatars"))
@@ -0,0 +1,46 @@
+# Generated by Django 5.0.2 on 2026-10-17 21:44
+
+import users.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_user_search_document"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="avatar_hash",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                max_length=64,
+                verbose_name="Хэш содержимого аватарки",
+            ),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="avatar_thumbnails",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                verbose_name="Уменьшенные копии аватарки",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="user",
+            name="avatar",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                upload_to="images/user/",
+                validators=[users.validators.validate_image_size],
+                verbose_name="Аватарка",
+            ),
+        ),
+    ]
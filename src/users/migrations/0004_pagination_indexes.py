@@ -0,0 +1,27 @@
+# Generated by Django 5.0.2 on 2026-10-17 21:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_user_avatar_thumbnails"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="friendrequest",
+            index=models.Index(
+                fields=["from_user", "-created_at", "id"],
+                name="users_friendreq_from_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="friendrequest",
+            index=models.Index(
+                fields=["to_user", "-created_at", "id"],
+                name="users_friendreq_to_idx",
+            ),
+        ),
+    ]
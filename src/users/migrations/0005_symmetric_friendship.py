@@ -0,0 +1,59 @@
+# Generated by Django 5.0.2 on 2026-10-17 23:05
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def mirror_friendships(apps, schema_editor):
+    """Добавление обратных строк дружбы.
+
+    Пары A-B и B-A, созданные раньше как разные дружбы, становятся одной
+    симметричной дружбой, дружба с самим собой удаляется.
+    """
+    Friendship = apps.get_model("users", "Friendship")
+    db = schema_editor.connection.alias
+    friendships = Friendship.objects.using(db)
+    friendships.filter(initiator=models.F("friend")).delete()
+    pairs = set(friendships.values_list("initiator_id", "friend_id"))
+    friendships.bulk_create(
+        (
+            Friendship(initiator_id=friend_id, friend_id=initiator_id)
+            for initiator_id, friend_id in pairs
+            if (friend_id, initiator_id) not in pairs
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+def unmirror_friendships(apps, schema_editor):
+    """Удаление обратных строк дружбы при откате миграции."""
+    Friendship = apps.get_model("users", "Friendship")
+    db = schema_editor.connection.alias
+    friendships = Friendship.objects.using(db)
+    pairs = friendships.values_list("pk", "initiator_id", "friend_id")
+    # Из двух строк пары остается созданная раньше
+    kept = {}
+    for pk, initiator_id, friend_id in pairs.order_by("pk"):
+        kept.setdefault(frozenset((initiator_id, friend_id)), pk)
+    friendships.exclude(pk__in=kept.values()).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(mirror_friendships, unmirror_friendships),
+        migrations.AddConstraint(
+            model_name="friendship",
+            constraint=models.CheckConstraint(
+                check=models.Q(
+                    ("initiator", models.F("friend")), _negated=True
+                ),
+                name="friendship_not_self",
+            ),
+        ),
+    ]
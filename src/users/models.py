@@ -1,23 +1,18 @@
-import os
 from datetime import date
-from io import BytesIO
 
 from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
-from django.core.files.base import ContentFile
 from django.core.mail import send_mail
 from django.core.validators import MinLengthValidator, RegexValidator
 from django.db import models
+from django.db.models.functions import Greatest
 from django.dispatch import receiver
 from django.shortcuts import get_object_or_404
 from django.utils.translation import gettext_lazy as _
 from django_rest_passwordreset.signals import reset_password_token_created
-from PIL import Image
 
 from config.constants import (
-    MAX_FILE_SIZE,
-    MAX_FILE_SIZE_MB,
     MAX_LENGTH_CHAR,
     MAX_LENGTH_DESCRIBE,
     MAX_LENGTH_EMAIL,
@@ -25,9 +20,10 @@ from config.constants import (
     messages,
 )
 from config.settings import DEFAULT_FROM_EMAIL
+from config.tasks import run_in_background
 
-from .exceptions import ImageResizeError, ImageSizeError
-from .validators import validate_birthday
+from .images import get_content_hash, process_avatar
+from .validators import validate_birthday, validate_image_size
 
 
 class City(models.Model):
@@ -165,6 +161,20 @@ class User(AbstractUser):
         blank=True,
         null=True,
         upload_to="images/user/",
+        validators=[validate_image_size],
+    )
+    avatar_hash = models.CharField(
+        "Хэш содержимого аватарки",
+        max_length=64,
+        blank=True,
+        default="",
+        editable=False,
+    )
+    avatar_thumbnails = models.JSONField(
+        "Уменьшенные копии аватарки",
+        blank=True,
+        default=dict,
+        editable=False,
     )
     profession = models.CharField(
         "Работа",
@@ -198,6 +208,12 @@ class User(AbstractUser):
         help_text="Разрешено или нет определение геолокации",
         verbose_name="Разрешение поиска геолокации",
     )
+    search_document = models.TextField(
+        "Поисковый документ",
+        blank=True,
+        default="",
+        editable=False,
+    )
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["first_name", "last_name"]
 
@@ -211,56 +227,32 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
-    @staticmethod
-    def resize_image(image_bytes):
-        """Изменение размера изображения с сохранением пропорций."""
-        try:
-            with Image.open(BytesIO(image_bytes)) as img:
-                img.thumbnail((100, 100), Image.LANCZOS)
-                output = BytesIO()
-                img.save(output, format=img.format)
-                return output.getvalue()
-        except Exception as e:
-            raise ImageResizeError(
-                f"Не удалось изменить размер изображения: {str(e)}"
-            )
-
-    @staticmethod
-    def check_image_size(image_bytes):
-        """Проверка размера изображения."""
-        image_size_mb = len(image_bytes) / (1024 * 1024)
-        if len(image_bytes) > MAX_FILE_SIZE:
-            raise ImageSizeError(
-                f"Размер файла {image_size_mb:.2f} "
-                f"байт превышает допустимый лимит: {MAX_FILE_SIZE_MB} MB."
-            )
+    def update_avatar_hash(self):
+        """Обновление хэша аватарки.
 
-    def save_resized_image(self, image, filename):
-        """Сохранение измененного изображения."""
-        content_file = ContentFile(image)
-        self.avatar.save(filename, content_file, save=False)
+        Хэш считается только для нового загруженного файла, при остальных
+        сохранениях файл не читается. Возвращает True, если содержимое
+        аватарки изменилось и нужно создать уменьшенные копии.
+        """
+        if not self.avatar:
+            self.avatar_hash = ""
+            self.avatar_thumbnails = {}
+            return False
+        if self.avatar._committed:
+            return False
+        content_hash = get_content_hash(self.avatar)
+        if content_hash == self.avatar_hash:
+            return False
+        self.avatar_hash = content_hash
+        self.avatar_thumbnails = {}
+        return True
 
     def save(self, *args, **kwargs):
-        """Сохранение аватара заданного размера с проверкой его размера."""
-        if self.avatar:
-            filename, ext = os.path.splitext(self.avatar.name)
-            try:
-                with self.avatar.open("rb") as f:
-                    image_bytes = f.read()
-
-                resized_image = self.resize_image(image_bytes)
-                self.check_image_size(resized_image)
-                new_filename = f"{filename}_resized{ext}"
-                self.save_resized_image(resized_image, new_filename)
-
-            except ImageSizeError as e:
-                raise ValidationError(f"Ошибка размера файла: {e}")
-            except ImageResizeError as e:
-                raise ValidationError(f"Ошибка при изменении размера: {e}")
-            except Exception as e:
-                raise ValidationError(f"Неизвестная ошибка: {e}")
-
+        """Сохранение с фоновой обработкой новой аватарки."""
+        avatar_changed = self.update_avatar_hash()
         super().save(*args, **kwargs)
+        if avatar_changed:
+            run_in_background(process_avatar, self.pk, self.avatar_hash)
 
     @property
     def max_file_size(self):
@@ -316,10 +308,20 @@ class UserInterest(models.Model):
     interest = models.ForeignKey(Interest, on_delete=models.CASCADE)
 
     def save(self, *args, **kwargs):
-        """Увеличение значения счетчика интереса."""
-        self.interest.counter += 1
-        self.interest.save()
+        """Увеличение значения счетчика интереса при создании связи."""
+        adding = self._state.adding
         super().save(*args, **kwargs)
+        if adding:
+            Interest.objects.filter(pk=self.interest_id).update(
+                counter=models.F("counter") + 1
+            )
+
+    def delete(self, *args, **kwargs):
+        """Уменьшение значения счетчика интереса."""
+        Interest.objects.filter(pk=self.interest_id).update(
+            counter=Greatest(models.F("counter") - 1, 0)
+        )
+        return super().delete(*args, **kwargs)
 
     class Meta:
         constraints = [
@@ -395,6 +397,17 @@ class FriendRequest(models.Model):
                 name="unique_friend",
             )
         ]
+        indexes = [
+            # Курсорная пагинация заявок пользователя
+            models.Index(
+                fields=["from_user", "-created_at", "id"],
+                name="users_friendreq_from_idx",
+            ),
+            models.Index(
+                fields=["to_user", "-created_at", "id"],
+                name="users_friendreq_to_idx",
+            ),
+        ]
 
         ordering = ["-created_at"]
         verbose_name = "Заявка в друзья"
@@ -402,7 +415,14 @@ class FriendRequest(models.Model):
 
 
 class Friendship(models.Model):
-    """Модель представления дружеской связи между двумя пользователями."""
+    """Модель представления дружеской связи между двумя пользователями.
+
+    Дружба хранится симметрично двумя строками (initiator, friend) и
+    (friend, initiator), как у симметричной связи User.friends. Поэтому
+    друзья пользователя и проверка дружбы пары - поиск по уникальному
+    индексу с initiator в начале. Обратная строка создается и удаляется
+    сигналами.
+    """
 
     initiator = models.ForeignKey(
         User,
@@ -422,7 +442,11 @@ class Friendship(models.Model):
         constraints = [
             models.UniqueConstraint(
                 fields=["initiator", "friend"], name="unique_friendship"
-            )
+            ),
+            models.CheckConstraint(
+                check=~models.Q(initiator=models.F("friend")),
+                name="friendship_not_self",
+            ),
         ]
         verbose_name = "Друг"
         verbose_name_plural = "Друзья"
@@ -4,6 +4,7 @@ from django.core.exceptions import ValidationError
 from django.utils import timezone
 
 from config.constants import (
+    MAX_FILE_SIZE,
     MAX_LENGTH_EMAIL,
     MAX_LENGTH_PASSWORD,
     MAX_USER_AGE,
@@ -86,3 +87,9 @@ def validate_password(password):
         raise ValidationError(messages.EMPTY_FIELD_MSG)
 
     return password
+
+
+def validate_image_size(image):
+    """Проверка размера загруженного файла без чтения его содержимого."""
+    if image.size > MAX_FILE_SIZE:
+        raise ValidationError(messages.FILE_SIZE_MSG)
@@ -1,7 +1,7 @@
 import pytest
 
 from events.models import Event
-from users.models import City
+from users.models import City, Interest
 
 
 @pytest.fixture
@@ -10,6 +10,14 @@ def city():
     return City.objects.create(name="Москва")
 
 
+@pytest.fixture
+def interests():
+    """Тестовые данные для интересов."""
+    return Interest.objects.bulk_create(
+        Interest(name=name) for name in ("Футбол", "Шахматы", "Кино")
+    )
+
+
 @pytest.fixture
 def event_1(city):
     """Тестовые данные для мероприятия 1."""
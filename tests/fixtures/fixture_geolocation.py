@@ -1,9 +1,18 @@
 import pytest
 
+from api.spatial import user_location_index
 from events.models import Event, EventLocation
 from users.models import City, UserLocation
 
 
+@pytest.fixture(autouse=True)
+def clear_user_location_index():
+    """Сбрасывает пространственный индекс между тестами."""
+    user_location_index.clear()
+    yield
+    user_location_index.clear()
+
+
 @pytest.fixture
 def city1():
     """Тестовые данные для города 1."""
@@ -64,6 +73,14 @@ def user_location_2(another_user):
     )
 
 
+@pytest.fixture
+def user_location_3(third_user):
+    """Тестовые данные 3."""
+    return UserLocation.objects.create(
+        user=third_user, lon=37.617600, lat=55.755800
+    )
+
+
 @pytest.fixture
 def event_location_1(event_g1):
     """Тестовые данные 1."""
@@ -1,4 +1,7 @@
 import pytest
+from django.core.cache import cache
+
+from config.cache import clear_local_caches
 
 
 @pytest.fixture
@@ -11,6 +14,24 @@ def memory_channel_layers(settings):
     }
 
 
+@pytest.fixture(autouse=True)
+def eager_background_tasks(settings):
+    """Выполняет фоновые задачи синхронно с офлайн-геокодером."""
+    settings.BACKGROUND_TASKS_EAGER = True
+    settings.USER_LOCATION_FLUSH_INTERVAL = 0
+    settings.GEOCODER_BACKEND = "api.geocoding.StubGeocoder"
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Очищает локальные кэши процесса и кэш Django между тестами."""
+    clear_local_caches()
+    cache.clear()
+    yield
+    clear_local_caches()
+    cache.clear()
+
+
 @pytest.fixture(autouse=True)
 def null_logging(settings):
     """Переопределяет конфигурацию логирования."""
@@ -1,9 +1,27 @@
 import pytest
 from rest_framework.test import APIClient
 
+from api.graph import friend_graph
+from api.matching import interest_matrix
 from users.models import Friendship
 
 
+@pytest.fixture(autouse=True)
+def clear_friend_graph():
+    """Сбрасывает граф дружбы между тестами."""
+    friend_graph.clear()
+    yield
+    friend_graph.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_interest_matrix():
+    """Сбрасывает матрицу интересов между тестами."""
+    interest_matrix.clear()
+    yield
+    interest_matrix.clear()
+
+
 @pytest.fixture
 def user(django_user_model):
     """Тестовые данные для пользователя 1."""
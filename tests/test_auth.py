@@ -3,6 +3,10 @@ import string
 from http import HTTPStatus
 
 import pytest
+from django.contrib.auth.hashers import get_hasher
+from django.contrib.auth.signals import user_login_failed
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from config import constants as cnst
 from config.constants import messages as msg
@@ -196,6 +200,134 @@ class TestAuthAPI:
             f"{HTTPStatus.OK}, а вернулся {users_me_response.status_code}."
         )
 
+    def test_auth_token_cache(self, user_client, user):
+        """Проверка аутентификации по токену без запросов к базе."""
+        user_client.get(self.user_profile_url)
+        with CaptureQueriesContext(connection) as queries:
+            response = user_client.get(self.user_profile_url)
+        assert response.status_code == HTTPStatus.OK
+        assert not any(
+            "authtoken_token" in query["sql"] for query in queries
+        ), "Проверьте, что пользователь по токену берется из кэша."
+        user.first_name = "Измененный"
+        user.save()
+        response = user_client.get(self.user_profile_url)
+        assert (
+            response.json()["first_name"] == "Измененный"
+        ), "Проверьте, что кэш очищается при изменении пользователя."
+        user.is_active = False
+        user.save()
+        response = user_client.get(self.user_profile_url)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            "Проверьте, что деактивированный пользователь не проходит "
+            "аутентификацию."
+        )
+
+    def test_auth_cached_user_not_saved_stale(
+        self, django_user_model, user_client, user
+    ):
+        """Проверка, что изменение профиля не затирает другие изменения."""
+        user_client.get(self.user_profile_url)
+        # Изменение без сигналов: кэш аутентификации не очищается
+        django_user_model.objects.filter(pk=user.pk).update(
+            last_name="Другой", profession="Инженер"
+        )
+        response = user_client.patch(
+            self.user_profile_url, {"first_name": "Новый"}, format="json"
+        )
+        assert response.status_code == HTTPStatus.OK
+        user.refresh_from_db()
+        assert (user.first_name, user.last_name, user.profession) == (
+            "Новый",
+            "Другой",
+            "Инженер",
+        ), "Проверьте, что пользователь из кэша не сохраняет старые значения."
+
+    @pytest.mark.parametrize("email", ["testone@test.ru", "none@test.ru"])
+    def test_auth_single_password_hash(self, monkeypatch, client, user, email):
+        """Проверка одного хэширования пароля при неудачном входе."""
+        hasher = type(get_hasher())
+        encode = hasher.encode
+        calls = []
+
+        def counted_encode(self, *args, **kwargs):
+            calls.append(args)
+            return encode(self, *args, **kwargs)
+
+        # Проверка пароля тоже вычисляет хэш через encode
+        monkeypatch.setattr(hasher, "encode", counted_encode)
+        response = client.post(
+            self.login_url, data={"email": email, "password": "wrongpass1"}
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert (
+            len(calls) == 1
+        ), "Проверьте, что пароль хэшируется один раз за попытку входа."
+
+    def test_auth_attempts_limit(self, settings, client, user):
+        """Проверка ограничения числа неудачных попыток входа."""
+        settings.LOGIN_ATTEMPTS_PER_EMAIL = 2
+        data = {"email": "testone@test.ru", "password": "wrongpass1"}
+        for _ in range(2):
+            response = client.post(self.login_url, data=data)
+            assert response.status_code == HTTPStatus.BAD_REQUEST
+        data["password"] = "alskdj01"
+        response = client.post(self.login_url, data=data)
+        assert (
+            response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+        ), "Проверьте, что попытки входа сверх лимита отклоняются."
+
+    def test_auth_attempts_limit_spoofed_ip(self, settings, client, user):
+        """Проверка лимита по IP при подмене X-Forwarded-For клиентом."""
+        settings.LOGIN_ATTEMPTS_PER_IP = 2
+        data = {"email": "testone@test.ru", "password": "wrongpass1"}
+        statuses = [
+            client.post(
+                self.login_url,
+                data=data,
+                # Прокси дописывает реальный адрес клиента в конец
+                HTTP_X_FORWARDED_FOR=f"10.0.0.{number}, 203.0.113.5",
+            ).status_code
+            for number in range(3)
+        ]
+        assert statuses[-1] == HTTPStatus.TOO_MANY_REQUESTS, (
+            "Проверьте, что подмена начала заголовка X-Forwarded-For не "
+            "обходит ограничение попыток входа с IP-адреса."
+        )
+
+    def test_auth_attempts_limit_other_ip(self, settings, client, user):
+        """Проверка, что перебор с чужого IP не блокирует вход владельцу."""
+        settings.LOGIN_ATTEMPTS_PER_EMAIL = 2
+        data = {"email": "testone@test.ru", "password": "wrongpass1"}
+        for _ in range(3):
+            client.post(self.login_url, data=data, REMOTE_ADDR="203.0.113.5")
+        data["password"] = "alskdj01"
+        response = client.post(
+            self.login_url, data=data, REMOTE_ADDR="198.51.100.7"
+        )
+        assert (
+            response.status_code == HTTPStatus.OK
+        ), "Проверьте, что попытки для email считаются по IP-адресу."
+
+    def test_auth_login_failed_signal(self, client, user):
+        """Проверка входа через authenticate() с сигналом о неудаче."""
+        calls = []
+
+        def receiver(sender, credentials, **kwargs):
+            calls.append(credentials["email"])
+
+        user_login_failed.connect(receiver)
+        try:
+            client.post(
+                self.login_url,
+                data={"email": "testone@test.ru", "password": "wrongpass1"},
+            )
+        finally:
+            user_login_failed.disconnect(receiver)
+        assert calls == [
+            "testone@test.ru"
+        ], "Проверьте, что неудачный вход отправляет user_login_failed."
+
     @pytest.mark.skip(reason="Необходимо пофиксить поведение анонимного юзера")
     def test_auth_unauthenticated_user(self, client):
         """У анонимного пользователя не должно быть доступа."""
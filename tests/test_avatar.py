@@ -0,0 +1,74 @@
+from http import HTTPStatus
+from io import BytesIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+
+from users.models import User
+
+API_URL = "/api/v1"
+
+
+def make_avatar(color="red", size=(800, 400)):
+    """Создание загружаемого PNG-изображения."""
+    output = BytesIO()
+    Image.new("RGBA", size, color).save(output, format="PNG")
+    return SimpleUploadedFile(
+        "avatar.png", output.getvalue(), content_type="image/png"
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAvatar:
+    """Тесты обработки аватарки пользователя."""
+
+    @pytest.fixture(autouse=True)
+    def media_root(self, settings, tmp_path):
+        """Сохранение файлов во временную директорию."""
+        settings.MEDIA_ROOT = tmp_path
+
+    def test_avatar_thumbnails(self, user_client, user, city):
+        """Проверка создания уменьшенных копий при смене аватарки."""
+        url = f"{API_URL}/users/{user.id}/"
+        response = user_client.patch(
+            url, {"avatar": make_avatar()}, format="multipart"
+        )
+        assert response.status_code == HTTPStatus.OK
+        response = user_client.get(url)
+        avatar_urls = response.json()["avatar_urls"]
+        assert sorted(avatar_urls, key=int) == ["100", "300", "600"]
+        assert all(
+            sorted(versions) == ["png", "webp"]
+            for versions in avatar_urls.values()
+        ), "Проверьте, что копии создаются в исходном формате и в WebP."
+        user.refresh_from_db()
+        name = user.avatar_thumbnails["300"]["webp"]
+        with Image.open(user.avatar.storage.path(name)) as thumbnail:
+            size = thumbnail.size
+        assert size == (300, 150), "Проверьте сохранение пропорций."
+        avatar, content_hash = user.avatar.name, user.avatar_hash
+        response = user_client.patch(url, {"city": city.name})
+        assert response.status_code == HTTPStatus.OK
+        user.refresh_from_db()
+        assert (
+            user.avatar.name == avatar
+        ), "Проверьте, что аватарка не изменяется при других изменениях."
+        user_client.patch(
+            url, {"avatar": make_avatar("blue")}, format="multipart"
+        )
+        user.refresh_from_db()
+        assert (
+            user.avatar_hash != content_hash
+        ), "Проверьте, что хэш меняется при загрузке новой аватарки."
+
+    def test_avatar_too_large(self, monkeypatch, user_client, user):
+        """Проверка ограничения размера загружаемой аватарки."""
+        monkeypatch.setattr("users.validators.MAX_FILE_SIZE", 100)
+        response = user_client.patch(
+            f"{API_URL}/users/{user.id}/",
+            {"avatar": make_avatar()},
+            format="multipart",
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert not User.objects.get(id=user.id).avatar
@@ -101,3 +101,31 @@ class TestBlacklistAPI:
             "Проверьте, что авторизованному пользователю при попытке "
             "удалить список возвращается статус 204."
         )
+
+    def test_user_list_excludes_blockers(
+        self, user_client, user, another_user, third_user
+    ):
+        """Проверка исключения заблокировавших из списка пользователей."""
+        url = f"{API_URL}/users/"
+        response = user_client.get(url)
+        assert len(response.json()["results"]) == 3
+        blacklist = Blacklist.objects.create(
+            user=another_user, blocked_user=user
+        )
+        test_data = user_client.get(url).json()
+        assert "results" in test_data, (
+            "Проверьте, что список пользователей для заблокированного "
+            "пользователя выводится постранично."
+        )
+        assert another_user.id not in [
+            item["id"] for item in test_data["results"]
+        ], (
+            "Проверьте, что в списке пользователей нет заблокировавших "
+            "текущего пользователя."
+        )
+        blacklist.delete()
+        response = user_client.get(url)
+        assert len(response.json()["results"]) == 3, (
+            "Проверьте, что после удаления из черного списка пользователь "
+            "снова выводится в списке."
+        )
@@ -1,8 +1,10 @@
 from http import HTTPStatus
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
-from events.models import Event
+from events.models import Event, EventMember, ParticipationRequest
 
 # from django.db.utils import IntegrityError
 
@@ -67,3 +69,116 @@ class TestEventsAPI:
             response.status_code == HTTPStatus.UNAUTHORIZED
         ), """Проверьте, что неавторизованному пользователю при попытке
             создать мероприятие возвращается статус 401."""
+
+    def test_event_list_organizer_is_friend(
+        self, user_client, user, another_user, third_user, event_1, event_2
+    ):
+        """Проверка фильтра по друзьям-организаторам без повторов."""
+        for friend in (another_user, third_user):
+            user.initiator.create(friend=friend)
+            EventMember.objects.create(
+                user=friend, event=event_1, is_organizer=True
+            )
+        EventMember.objects.create(
+            user=another_user, event=event_2, is_organizer=False
+        )
+        response = user_client.get(
+            self.event_url, {"organizer_is_friend": "true"}
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert [item["id"] for item in response.json()["results"]] == [
+            event_1.id
+        ], (
+            "Проверьте, что мероприятие с несколькими друзьями-"
+            "организаторами выводится один раз."
+        )
+
+    def test_participation_accept(
+        self, user_client, user, another_user, event_1
+    ):
+        """Проверка однократного принятия заявки на участие."""
+        EventMember.objects.create(user=user, event=event_1, is_organizer=True)
+        participation = ParticipationRequest.objects.create(
+            from_user=another_user, event=event_1
+        )
+        url = f"/api/v1/participation/{participation.id}/accept/"
+        response = user_client.post(url)
+        assert response.status_code == HTTPStatus.OK
+        response = user_client.post(url)
+        assert (
+            response.status_code == HTTPStatus.NOT_FOUND
+        ), "Проверьте, что обработанную заявку нельзя принять повторно."
+        participation.refresh_from_db()
+        assert participation.status == "Accepted"
+        assert participation.processed_by == user
+        assert EventMember.objects.filter(
+            user=another_user, event=event_1, is_organizer=False
+        ).exists()
+
+    def test_event_list_queries(
+        self, user_client, user, another_user, third_user, event_1, city
+    ):
+        """Проверка вывода списка мероприятий постоянным числом запросов."""
+        EventMember.objects.create(user=user, event=event_1, is_organizer=True)
+        EventMember.objects.create(
+            user=another_user, event=event_1, is_organizer=False
+        )
+        user_client.get(self.event_url)
+        with CaptureQueriesContext(connection) as queries:
+            response = user_client.get(self.event_url)
+        (item,) = response.json()["results"]
+        assert item["members_count"] == 2
+        assert item["organizer"] == {"id": user.id}
+        assert item["is_member"] is True
+        assert sorted(member["id"] for member in item["members"]) == [
+            user.id,
+            another_user.id,
+        ]
+        for number in range(3):
+            event = Event.objects.create(
+                name=f"Мероприятие {number}",
+                description="Описание",
+                event_type="Тип",
+                city=city,
+            )
+            EventMember.objects.create(
+                user=third_user, event=event, is_organizer=True
+            )
+        with CaptureQueriesContext(connection) as more_queries:
+            response = user_client.get(self.event_url)
+        assert len(response.json()["results"]) == 4
+        assert len(more_queries) == len(queries), (
+            "Проверьте, что число запросов не зависит от числа мероприятий "
+            "на странице."
+        )
+
+    def test_event_members_update(
+        self, user_client, user, another_user, third_user, event_1
+    ):
+        """Проверка изменения участников с сохранением организаторов."""
+        user.is_staff = True
+        user.save()
+        EventMember.objects.create(user=user, event=event_1, is_organizer=True)
+        EventMember.objects.create(
+            user=another_user, event=event_1, is_organizer=False
+        )
+        url = self.event_detail_url.format(event_id=event_1.id)
+        response = user_client.patch(
+            url, {"members": [{"id": third_user.id}]}, format="json"
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert set(
+            EventMember.objects.filter(event=event_1).values_list(
+                "user_id", "is_organizer"
+            )
+        ) == {(user.id, True), (third_user.id, False)}, (
+            "Проверьте, что организатор остается участником, а остальные "
+            "участники заменяются переданными."
+        )
+        response = user_client.patch(
+            url,
+            {"members": [{"id": another_user.id}, {"id": 10**6}]},
+            format="json",
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert EventMember.objects.filter(event=event_1).count() == 2
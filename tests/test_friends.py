@@ -0,0 +1,300 @@
+from http import HTTPStatus
+
+import pytest
+from django.contrib import admin
+from django.forms import modelform_factory
+from django.http import Http404
+
+from api.cache import get_friend_ids
+from api.services import FriendRequestService
+from notifications.models import Notification, NotificationSettings
+from users.models import Blacklist, FriendRequest, Friendship
+
+API_URL = "/api/v1"
+
+
+@pytest.mark.django_db(transaction=True)
+class TestFriendsCache:
+    """Тесты кэша друзей пользователя."""
+
+    def test_friend_ids_cached(
+        self, django_assert_num_queries, user, another_user, friends
+    ):
+        """Проверка кэширования множества друзей пользователя."""
+        assert get_friend_ids(user.id) == {another_user.id}
+        assert get_friend_ids(another_user.id) == {user.id}
+        with django_assert_num_queries(0):
+            assert another_user.id in get_friend_ids(user.id), (
+                "Проверьте, что повторное получение друзей не обращается "
+                "к базе данных."
+            )
+
+    def test_friend_ids_invalidated(self, user_client, user, another_user):
+        """Проверка обновления кэша при изменении дружбы."""
+        url = f"{API_URL}/users/my_friends/"
+        assert user_client.get(url).json() == []
+        friendship = user.initiator.create(friend=another_user)
+        response = user_client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert [item["id"] for item in response.json()] == [
+            another_user.id
+        ], "Проверьте, что новый друг появляется в списке друзей."
+        friendship.delete()
+        assert (
+            user_client.get(url).json() == []
+        ), "Проверьте, что удаленный друг исчезает из списка друзей."
+
+
+@pytest.mark.django_db(transaction=True)
+class TestSymmetricFriendship:
+    """Тесты симметричного хранения дружбы."""
+
+    def test_reverse_row(self, user, another_user):
+        """Проверка создания и удаления обратной строки дружбы."""
+        friendship = Friendship.objects.create(
+            initiator=user, friend=another_user
+        )
+        Friendship.objects.get_or_create(initiator=another_user, friend=user)
+        assert set(
+            Friendship.objects.values_list("initiator_id", "friend_id")
+        ) == {
+            (user.id, another_user.id),
+            (another_user.id, user.id),
+        }, "Проверьте, что дружба хранится двумя строками без повторов."
+        assert list(another_user.friends.all()) == [user]
+        assert another_user.friends_count() == 1
+        friendship.delete()
+        assert (
+            not Friendship.objects.exists()
+        ), "Проверьте, что удаление дружбы удаляет обе строки."
+
+    def test_friends_relation(self, user, another_user, third_user):
+        """Проверка изменения дружбы через связь User.friends."""
+        assert get_friend_ids(third_user.id) == set()
+        user.friends.add(another_user, third_user)
+        assert get_friend_ids(third_user.id) == {
+            user.id
+        }, "Проверьте, что кэш друзей очищается при добавлении друзей."
+        user.friends.remove(third_user)
+        assert Friendship.objects.count() == 2
+        assert get_friend_ids(third_user.id) == set()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestFriendSuggestions:
+    """Тесты рекомендаций возможных знакомых."""
+
+    url = f"{API_URL}/users/suggestions/"
+
+    def test_suggestions_by_mutual_friends(
+        self, django_user_model, user_client, user, another_user, third_user
+    ):
+        """Проверка сортировки рекомендаций по числу общих друзей."""
+        fourth_user = django_user_model.objects.create_user(
+            first_name="Четвертый",
+            last_name="Юзер",
+            email="fourth_user@mail.ru",
+            password="Qwerty123",
+        )
+        Friendship.objects.create(initiator=user, friend=another_user)
+        assert user_client.get(self.url).json() == []
+        # Граф уже построен, далее он обновляется сигналами
+        Friendship.objects.create(initiator=another_user, friend=third_user)
+        Friendship.objects.create(initiator=user, friend=fourth_user)
+        Friendship.objects.create(initiator=third_user, friend=fourth_user)
+        response = user_client.get(self.url)
+        assert response.status_code == HTTPStatus.OK
+        assert [
+            (item["user"], item["mutual_friends"]) for item in response.json()
+        ] == [(third_user.id, 2)], (
+            "Проверьте, что рекомендуются не друзья пользователя с числом "
+            "общих друзей."
+        )
+
+    def test_suggestions_exclude_blocked(
+        self, user_client, user, another_user, third_user
+    ):
+        """Проверка исключения черного списка из рекомендаций."""
+        Friendship.objects.create(initiator=user, friend=another_user)
+        Friendship.objects.create(initiator=another_user, friend=third_user)
+        Blacklist.objects.create(user=third_user, blocked_user=user)
+        assert (
+            user_client.get(self.url).json() == []
+        ), "Проверьте, что заблокировавшие пользователи не рекомендуются."
+
+    @pytest.mark.parametrize("limit", ["0", "101", "abc"])
+    def test_suggestions_invalid_limit(self, user_client, limit):
+        """Проверка ошибки при некорректном числе рекомендаций."""
+        response = user_client.get(self.url, {"limit": limit})
+        assert (
+            response.status_code == HTTPStatus.BAD_REQUEST
+        ), "Проверьте, что параметр limit проверяется."
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBulkFriendRequests:
+    """Тесты пакетной отправки и обработки заявок на дружбу."""
+
+    url = f"{API_URL}/friends/bulk/"
+
+    def test_bulk_send(self, user_client, user, another_user, third_user):
+        """Проверка пакетной отправки заявок с пропуском недопустимых."""
+        Blacklist.objects.create(user=third_user, blocked_user=user)
+        response = user_client.post(
+            self.url,
+            {"to_users": [another_user.id, third_user.id, user.id, 10**6]},
+            format="json",
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        assert [item["to_user"] for item in response.json()] == [
+            another_user.id
+        ], (
+            "Проверьте, что заявки не отправляются себе, несуществующим и "
+            "заблокировавшим пользователям."
+        )
+        response = user_client.post(
+            self.url, {"to_users": [another_user.id]}, format="json"
+        )
+        assert response.json() == [], "Проверьте пропуск повторных заявок."
+        assert list(
+            Notification.objects.values_list("recipient_id", "type")
+        ) == [(another_user.id, "FRIEND_REQUEST")]
+
+    def test_bulk_send_skip_friends_and_incoming(
+        self, user_client, user, another_user, third_user
+    ):
+        """Проверка пропуска друзей и отправителей ожидающих заявок."""
+        Friendship.objects.create(initiator=user, friend=another_user)
+        FriendRequest.objects.create(from_user=third_user, to_user=user)
+        response = user_client.post(
+            self.url,
+            {"to_users": [another_user.id, third_user.id]},
+            format="json",
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        assert response.json() == [], (
+            "Проверьте, что заявки не отправляются друзьям и "
+            "пользователям, чья заявка ожидает ответа."
+        )
+        assert not FriendRequest.objects.filter(from_user=user).exists()
+
+    def test_bulk_accept(self, user_client, user, another_user, third_user):
+        """Проверка пакетного принятия заявок и уведомлений."""
+        friend_requests = [
+            FriendRequest.objects.create(from_user=sender, to_user=user)
+            for sender in (another_user, third_user)
+        ]
+        foreign_request = FriendRequest.objects.create(
+            from_user=another_user, to_user=third_user
+        )
+        NotificationSettings.objects.filter(user=third_user).update(
+            receive_notifications=False
+        )
+        Notification.objects.all().delete()
+        assert get_friend_ids(user.id) == set()
+        response = user_client.post(
+            f"{self.url}accept/",
+            {
+                "ids": [item.id for item in friend_requests]
+                + [foreign_request.id]
+            },
+            format="json",
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()["ids"] == [
+            item.id for item in friend_requests
+        ], "Проверьте, что принимаются только заявки пользователю."
+        assert set(FriendRequest.objects.values_list("id", "status")) == {
+            (friend_requests[0].id, "Accepted"),
+            (friend_requests[1].id, "Accepted"),
+            (foreign_request.id, "Pending"),
+        }
+        assert get_friend_ids(user.id) == {
+            another_user.id,
+            third_user.id,
+        }, "Проверьте, что кэш друзей обновляется после принятия заявок."
+        assert list(
+            Notification.objects.values_list("recipient_id", "type")
+        ) == [(another_user.id, "FRIEND_REQUEST_ACCEPTED")], (
+            "Проверьте, что уведомления получают только отправители с "
+            "включенными уведомлениями."
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class TestFriendRequestTransitions:
+    """Тесты смены статуса заявки на дружбу."""
+
+    def test_accept_once(
+        self, django_assert_max_num_queries, user, another_user
+    ):
+        """Проверка принятия заявки фиксированным числом запросов."""
+        friend_request = FriendRequest.objects.create(
+            from_user=another_user, to_user=user
+        )
+        Notification.objects.all().delete()
+        with django_assert_max_num_queries(7):
+            FriendRequestService.accept_friend_request(friend_request.id, user)
+        with pytest.raises(Http404):
+            FriendRequestService.accept_friend_request(friend_request.id, user)
+        with pytest.raises(Http404):
+            FriendRequestService.decline_friend_request(
+                friend_request.id, user
+            )
+        assert Friendship.objects.count() == 2
+        assert list(Notification.objects.values_list("type", flat=True)) == [
+            "FRIEND_REQUEST_ACCEPTED"
+        ], "Проверьте, что повторное принятие заявки не дублирует уведомление."
+
+    @staticmethod
+    def save_in_admin(friend_request, status):
+        """Сохранение заявки со статусом status через форму админки."""
+        form = modelform_factory(
+            FriendRequest, fields=("from_user", "to_user", "status")
+        )(
+            {
+                "from_user": friend_request.from_user_id,
+                "to_user": friend_request.to_user_id,
+                "status": status,
+            },
+            instance=friend_request,
+        )
+        assert form.is_valid(), form.errors
+        admin.site._registry[FriendRequest].save_model(
+            None, form.save(commit=False), form, True
+        )
+
+    def test_accept_in_admin(self, user, another_user):
+        """Проверка создания дружбы при принятии заявки в админке."""
+        friend_request = FriendRequest.objects.create(
+            from_user=another_user, to_user=user
+        )
+        friend_request.status = "Accepted"
+        friend_request.save()
+        assert not Friendship.objects.exists(), (
+            "Проверьте, что сохранение заявки вне сервиса не создает "
+            "дружбу."
+        )
+        friend_request.status = "Pending"
+        friend_request.save()
+        self.save_in_admin(friend_request, "Accepted")
+        assert set(
+            Friendship.objects.values_list("initiator_id", "friend_id")
+        ) == {(user.id, another_user.id), (another_user.id, user.id)}
+        assert get_friend_ids(user.id) == {another_user.id}
+        friend_request.refresh_from_db()
+        assert friend_request.status == "Accepted"
+
+    def test_resave_accepted_in_admin(self, user, another_user):
+        """Проверка, что пересохранение принятой заявки не создает дружбу."""
+        friend_request = FriendRequest.objects.create(
+            from_user=another_user, to_user=user
+        )
+        FriendRequestService.accept_friend_request(friend_request.id, user)
+        Friendship.objects.filter(initiator=user).delete()
+        friend_request.refresh_from_db()
+        self.save_in_admin(friend_request, "Accepted")
+        assert not Friendship.objects.exists(), (
+            "Проверьте, что повторное сохранение принятой заявки в админке "
+            "не восстанавливает удаленную дружбу."
+        )
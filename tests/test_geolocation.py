@@ -1,10 +1,37 @@
+import io
+import json
 from http import HTTPStatus
 
 import pytest
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import RequestFactory
+from selenium.common.exceptions import WebDriverException
 
-from users.models import UserLocation
+from api import geo, spatial
+from api.geo import (
+    geocode_cache,
+    get_client_ip,
+    get_geo_event,
+    get_geo_ip,
+    get_geocode_key,
+    location_buffer,
+    save_event_location,
+)
+from api.geocoding import (
+    BaseGeocoder,
+    SeleniumGeocoder,
+    StubGeocoder,
+    get_geocoder,
+)
+from api.management.commands.benchmark_geo import SCENARIOS
+from api.spatial import UserLocationIndex
+from config.cache import clear_local_caches
+from events.models import EventLocation, GeocodeResult
+from users.models import Blacklist, UserLocation
 
 API_URL = "/api/v1"
+PUBLIC_IP = "77.88.55.88"
 
 
 @pytest.mark.django_db(transaction=True)
@@ -166,6 +193,26 @@ class TestEventGeolocatioAPI:
             "получения расстояний до мероприятий возвращается 1 расстояние."
         )
 
+    def test_user_get_distances_filtered(
+        self,
+        user_client,
+        user,
+        user_location_1,
+        event_g1,
+        event_location_1,
+        event_g2,
+        event_location_2,
+    ):
+        """Проверка совместного применения фильтров мероприятий."""
+        url = f"{API_URL}/events/distances/?city={event_g2.city_id}"
+        user.is_geoip_allowed = True
+        user.save()
+        response = user_client.get(url)
+        assert [item["event"] for item in response.json()] == [event_g2.id], (
+            "Проверьте, что при получении расстояний до мероприятий "
+            "учитываются фильтры мероприятий."
+        )
+
 
 @pytest.mark.django_db(transaction=True)
 class TestUserGeolocatioAPI:
@@ -190,7 +237,7 @@ class TestUserGeolocatioAPI:
         url = f"{API_URL}/users/{user.id}/"
         user.is_geoip_allowed = True
         user.save()
-        response = user_client.get(url)
+        response = user_client.get(url, HTTP_X_FORWARDED_FOR=PUBLIC_IP)
         assert response.status_code == HTTPStatus.OK, (
             "Проверьте, что авторизованному пользователю при попытке "
             "сохранить геолокацию возвращается статус 200."
@@ -365,3 +412,405 @@ class TestUserGeolocatioAPI:
             "Проверьте, что авторизованному пользователю при попытке "
             "получения расстояния с ограничением возвращается пустой список."
         )
+
+    def test_user_get_distances_sorted(
+        self,
+        user_client,
+        user,
+        another_user,
+        third_user,
+        user_location_1,
+        user_location_2,
+        user_location_3,
+    ):
+        """Проверка сортировки расстояний до пользователей."""
+        url = f"{API_URL}/users/distances/"
+        for current_user in (user, another_user, third_user):
+            current_user.is_geoip_allowed = True
+            current_user.save()
+        response = user_client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            "Проверьте, что авторизованному пользователю при попытке "
+            "получения расстояний с разрешением возвращается статус 200."
+        )
+        info = response.json()
+        assert [item["user"] for item in info] == [
+            third_user.id,
+            another_user.id,
+        ], (
+            "Проверьте, что расстояния до пользователей отсортированы по "
+            "возрастанию."
+        )
+        assert info[0]["distance"] <= info[1]["distance"], (
+            "Проверьте, что расстояния до пользователей отсортированы по "
+            "возрастанию."
+        )
+
+    def test_user_get_nearest_paginated(
+        self,
+        user_client,
+        user,
+        another_user,
+        third_user,
+        user_location_1,
+        user_location_2,
+        user_location_3,
+    ):
+        """Проверка постраничного получения ближайших пользователей."""
+        url = f"{API_URL}/users/nearest/?limit=1"
+        for current_user in (user, another_user, third_user):
+            current_user.is_geoip_allowed = True
+            current_user.save()
+        response = user_client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            "Проверьте, что авторизованному пользователю при попытке "
+            "получения ближайших пользователей возвращается статус 200."
+        )
+        info = response.json()
+        assert [item["user"] for item in info["results"]] == [
+            third_user.id
+        ], "Проверьте, что первым возвращается ближайший пользователь."
+        response = user_client.get(info["next"])
+        info = response.json()
+        assert [item["user"] for item in info["results"]] == [
+            another_user.id
+        ], (
+            "Проверьте, что следующая страница начинается после "
+            "последнего пользователя предыдущей."
+        )
+        assert (
+            info["next"] is None
+        ), "Проверьте, что у последней страницы нет ссылки на следующую."
+
+    def test_user_get_nearest_blacklist(
+        self,
+        user_client,
+        user,
+        another_user,
+        third_user,
+        user_location_1,
+        user_location_2,
+        user_location_3,
+    ):
+        """Проверка исключения черного списка из ближайших пользователей."""
+        url = f"{API_URL}/users/nearest/"
+        for current_user in (user, another_user):
+            current_user.is_geoip_allowed = True
+            current_user.save()
+        Blacklist.objects.create(user=another_user, blocked_user=user)
+        response = user_client.get(url)
+        assert response.json()["results"] == [], (
+            "Проверьте, что в ближайших пользователях нет заблокировавших "
+            "и запретивших геолокацию пользователей."
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class TestUserLocationIndex:
+    """Тесты пространственного индекса геолокаций пользователей."""
+
+    def test_nearest_deep_page(self, monkeypatch):
+        """Проверка поиска следующей страницы только в кольце."""
+        index = UserLocationIndex(cell_size=0.5, ttl=0)
+        index.rebuild()
+        for user_id in range(200):
+            index.add(user_id, 55.7 + user_id / 10_000, 37.6)
+        for user_id in range(200, 203):
+            index.add(user_id, 55.7 + (user_id - 190) / 10, 37.6)
+        expected = index.query_radius(55.7, 37.6, 1000)
+        user_id, distance = expected[200]
+        after = (distance, user_id)
+        evaluated = []
+
+        def get_distances(origin, points, **kwargs):
+            evaluated.append(len(points))
+            return geo.get_distances(origin, points, **kwargs)
+
+        monkeypatch.setattr(spatial, "get_distances", get_distances)
+        result = index.query_nearest(55.7, 37.6, 2, after=after)
+        assert (
+            result == expected[201:203]
+        ), "Проверьте, что следующая страница начинается после курсора."
+        assert sum(evaluated) < 50, (
+            "Проверьте, что расстояния не считаются заново для точек "
+            "ближе курсора."
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class TestGeocodeCache:
+    """Тесты кэша геокодирования."""
+
+    def test_geocode_key_normalized(self):
+        """Проверка нормализации ключа кэша."""
+        assert get_geocode_key("Москва", "ул. Ёлочная,  1") == (
+            get_geocode_key(" москва ", "Ул Елочная 1")
+        ), "Проверьте, что адреса нормализуются перед кэшированием."
+
+    def test_geocode_repeated_address(self):
+        """Проверка повторного геокодирования адреса."""
+        first = get_geo_event("Москва", "Кремль")
+        db_misses = geocode_cache.stats["db_misses"]
+        second = get_geo_event("москва", "кремль")
+        assert (
+            first == second
+        ), "Проверьте, что повторный адрес возвращает те же координаты."
+        assert (
+            geocode_cache.stats["db_misses"] == db_misses
+        ), "Проверьте, что повторный адрес не передается геокодеру."
+        assert (
+            GeocodeResult.objects.count() == 1
+        ), "Проверьте, что результат геокодирования сохраняется в базе."
+
+    def test_warm_geocode_cache(self, event_g1, event_location_1):
+        """Проверка заполнения кэша по геолокациям мероприятий."""
+        call_command("warm_geocode_cache")
+        event_location_1.refresh_from_db()
+        result = GeocodeResult.objects.get(
+            key=get_geocode_key(event_g1.city, event_g1.address)
+        )
+        assert (result.lat, result.lon) == (
+            event_location_1.lat,
+            event_location_1.lon,
+        ), "Проверьте, что кэш заполняется координатами мероприятий."
+
+
+@pytest.mark.django_db(transaction=True)
+class TestGeocoding:
+    """Тесты фонового геокодирования мероприятий."""
+
+    def test_geocode_cache_miss_and_hit(self, monkeypatch):
+        """Проверка обращения к геокодеру только при промахе кэша."""
+        calls = []
+
+        class Geocoder(StubGeocoder):
+            def geocode(self, city, address):
+                calls.append(address)
+                return super().geocode(city, address)
+
+        monkeypatch.setattr(geo, "get_geocoder", Geocoder)
+        data = get_geo_event("Москва", "Кремль")
+        assert calls == [
+            "Кремль"
+        ], "Проверьте, что при промахе кэша адрес передается геокодеру."
+        result = GeocodeResult.objects.get()
+        assert [float(result.lat), float(result.lon)] == data
+        clear_local_caches()
+        db_hits = geocode_cache.stats["db_hits"]
+        assert get_geo_event("Москва", "Кремль") == data
+        assert len(calls) == 1, (
+            "Проверьте, что сохраненный в базе результат не передается "
+            "геокодеру повторно."
+        )
+        assert geocode_cache.stats["db_hits"] == db_hits + 1
+
+    def test_geocode_not_found(self, monkeypatch, settings):
+        """Проверка кэширования ненайденного адреса на GEOCODE_MISS_TTL."""
+        calls = []
+
+        class Geocoder(BaseGeocoder):
+            def geocode(self, city, address):
+                calls.append(address)
+
+        monkeypatch.setattr(geo, "get_geocoder", Geocoder)
+        assert get_geo_event("Москва", "Нигде") is None
+        clear_local_caches()
+        assert get_geo_event("Москва", "Нигде") is None
+        assert len(calls) == 1, (
+            "Проверьте, что ненайденный адрес не передается геокодеру "
+            "повторно до истечения GEOCODE_MISS_TTL."
+        )
+        settings.GEOCODE_MISS_TTL = 0
+        clear_local_caches()
+        assert get_geo_event("Москва", "Нигде") is None
+        assert (
+            len(calls) == 2
+        ), "Проверьте, что ненайденный адрес геокодируется повторно."
+
+    def test_geocode_event_stub(self, event_g1):
+        """Проверка заполнения геолокации мероприятия офлайн-геокодером."""
+        save_event_location(event_g1, {})
+        location = EventLocation.objects.get(event=event_g1)
+        expected = StubGeocoder().geocode(str(event_g1.city), event_g1.address)
+        assert [float(location.lat), float(location.lon)] == expected, (
+            "Проверьте, что координаты мероприятия сохраняются фоновой "
+            "задачей."
+        )
+
+    def test_geocode_selenium_unavailable(
+        self, monkeypatch, settings, event_g1
+    ):
+        """Проверка геокодирования без доступного браузера."""
+        settings.GEOCODER_BACKEND = "api.geocoding.SeleniumGeocoder"
+
+        def create_driver():
+            raise WebDriverException("chromedriver not found")
+
+        monkeypatch.setattr(
+            SeleniumGeocoder, "_create_driver", staticmethod(create_driver)
+        )
+        save_event_location(event_g1, {})
+        assert not EventLocation.objects.filter(event=event_g1).exists()
+        assert not GeocodeResult.objects.exists(), (
+            "Проверьте, что недоступность геокодера не кэшируется как "
+            "ненайденный адрес."
+        )
+        assert get_geocoder()._created == 0, (
+            "Проверьте, что неудачный запуск браузера освобождает место "
+            "в пуле."
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class TestLocationBuffer:
+    """Тесты отложенной записи геолокаций пользователей."""
+
+    def test_location_update_throttled(self, user):
+        """Проверка пропуска частых обновлений геолокации."""
+        user.is_geoip_allowed = True
+        user.save()
+        assert location_buffer.update(user.id, 55.7386, 37.6068)
+        assert not location_buffer.update(user.id, 59.9386, 30.3141), (
+            "Проверьте, что геолокация не перезаписывается чаще "
+            "USER_LOCATION_REFRESH_INTERVAL."
+        )
+        location = UserLocation.objects.get(user=user)
+        assert (
+            float(location.lat) == 55.7386
+        ), "Проверьте, что сохранена первая геолокация пользователя."
+
+    def test_location_update_not_moved(self, settings, user):
+        """Проверка пропуска обновления без смещения пользователя."""
+        settings.USER_LOCATION_REFRESH_INTERVAL = 0
+        user.is_geoip_allowed = True
+        user.save()
+        assert location_buffer.update(user.id, 55.7386, 37.6068)
+        assert not location_buffer.update(user.id, 55.7387, 37.6069), (
+            "Проверьте, что геолокация не перезаписывается при смещении "
+            "меньше USER_LOCATION_MIN_DISTANCE."
+        )
+        assert location_buffer.update(user.id, 59.9386, 30.3141), (
+            "Проверьте, что геолокация обновляется при смещении "
+            "пользователя."
+        )
+
+    def test_location_flush(self, monkeypatch, settings, user, another_user):
+        """Проверка пакетной записи накопленных геолокаций."""
+        settings.USER_LOCATION_FLUSH_INTERVAL = 60 * 60
+        started = []
+        monkeypatch.setattr(
+            geo,
+            "run_periodically",
+            lambda func, interval: started.append((func, interval)),
+        )
+        user.is_geoip_allowed = True
+        user.save()
+        location_buffer.update(user.id, 55.7386, 37.6068)
+        location_buffer.update(another_user.id, 59.9386, 30.3141)
+        assert started[0] == (location_buffer.flush, 60 * 60), (
+            "Проверьте, что геолокации записываются периодической фоновой "
+            "задачей."
+        )
+        assert (
+            not UserLocation.objects.exists()
+        ), "Проверьте, что геолокации записываются в базу отложенно."
+        assert location_buffer.flush() == 1, (
+            "Проверьте, что записываются только геолокации пользователей, "
+            "разрешивших геолокацию."
+        )
+        assert UserLocation.objects.filter(user=user).exists()
+        assert (
+            location_buffer.flush() == 0
+        ), "Проверьте, что записанные геолокации удаляются из буфера."
+
+    def test_location_flush_failed(self, monkeypatch, settings, user):
+        """Проверка сохранения геолокаций в буфере при ошибке записи."""
+        settings.USER_LOCATION_FLUSH_INTERVAL = 60 * 60
+        monkeypatch.setattr(geo, "run_periodically", lambda *args: None)
+        user.is_geoip_allowed = True
+        user.save()
+        location_buffer.update(user.id, 55.7386, 37.6068)
+
+        def bulk_create(*args, **kwargs):
+            raise DatabaseError
+
+        with monkeypatch.context() as patch:
+            patch.setattr(UserLocation.objects, "bulk_create", bulk_create)
+            with pytest.raises(DatabaseError):
+                location_buffer.flush()
+        assert location_buffer.flush() == 1, (
+            "Проверьте, что геолокация остается в буфере, если запись в "
+            "базу не удалась."
+        )
+        assert UserLocation.objects.filter(user=user).exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_geo(tmp_path):
+    """Проверка записи результатов бенчмарка геолокации."""
+    output = tmp_path / "benchmark.json"
+    call_command(
+        "benchmark_geo",
+        sizes=[20],
+        requests=2,
+        output=str(output),
+        stdout=io.StringIO(),
+    )
+    report = json.loads(output.read_text())
+    assert {item["scenario"] for item in report["results"]} == set(
+        SCENARIOS
+    ), "Проверьте, что бенчмарк выполняет все сценарии."
+    assert (
+        not UserLocation.objects.exists()
+    ), "Проверьте, что синтетические данные бенчмарка удаляются."
+
+
+class TestGeoIP:
+    """Тесты определения геолокации по IP-адресу."""
+
+    def test_client_ip_forwarded(self, settings):
+        """Проверка получения IP-адреса клиента за доверенным прокси."""
+        request = RequestFactory().get(
+            "/", HTTP_X_FORWARDED_FOR=f"10.0.0.1, {PUBLIC_IP}"
+        )
+        assert get_client_ip(request) == PUBLIC_IP, (
+            "Проверьте, что IP-адрес клиента берется из значения, "
+            "добавленного прокси в конец заголовка X-Forwarded-For."
+        )
+        settings.REST_FRAMEWORK = {
+            **settings.REST_FRAMEWORK,
+            "NUM_PROXIES": 0,
+        }
+        assert get_client_ip(request) is None, (
+            "Проверьте, что без доверенных прокси заголовок "
+            "X-Forwarded-For не учитывается."
+        )
+
+    def test_client_ip_private(self):
+        """Проверка игнорирования локальных и некорректных адресов."""
+        factory = RequestFactory()
+        assert get_client_ip(factory.get("/")) is None, (
+            "Проверьте, что для локального адреса клиента геолокация "
+            "не определяется."
+        )
+        request = factory.get("/", HTTP_X_FORWARDED_FOR="example.com")
+        assert (
+            get_client_ip(request) is None
+        ), "Проверьте, что некорректный IP-адрес клиента игнорируется."
+
+    def test_geo_ip_cached(self, monkeypatch):
+        """Проверка кэширования геолокации по IP-адресу."""
+        calls = []
+
+        class Reader:
+            def city(self, address):
+                calls.append(address)
+                return {"latitude": 55.7386, "longitude": 37.6068}
+
+        monkeypatch.setattr(geo, "get_geoip_reader", Reader)
+        assert get_geo_ip(PUBLIC_IP) == [55.7386, 37.6068]
+        assert get_geo_ip(PUBLIC_IP) == [55.7386, 37.6068]
+        assert len(calls) == 1, (
+            "Проверьте, что повторный запрос геолокации с того же "
+            "IP-адреса не обращается к базе GeoIP."
+        )
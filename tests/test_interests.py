@@ -0,0 +1,114 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from users.models import Interest, UserInterest
+
+API_URL = "/api/v1"
+
+
+@pytest.mark.django_db(transaction=True)
+class TestSimilarUsers:
+    """Тесты поиска пользователей с похожими интересами."""
+
+    url = f"{API_URL}/users/similar/"
+
+    def test_similar_users(
+        self, user_client, user, another_user, third_user, interests
+    ):
+        """Проверка сортировки пользователей по сходству интересов."""
+        football, chess, cinema = interests
+        for current_user, current_interests in (
+            (user, (football, chess)),
+            (another_user, (football,)),
+            (third_user, (cinema,)),
+        ):
+            for interest in current_interests:
+                UserInterest.objects.create(
+                    user=current_user, interest=interest
+                )
+        response = user_client.get(self.url)
+        assert response.status_code == HTTPStatus.OK
+        assert [
+            (item["user"], item["similarity"]) for item in response.json()
+        ] == [(another_user.id, 0.5)], (
+            "Проверьте, что выводятся только пользователи с общими "
+            "интересами и мерой Жаккара."
+        )
+        # Матрица уже построена, далее она обновляется сигналами
+        third_user.interests.add(football, chess)
+        response = user_client.get(self.url, {"metric": "overlap"})
+        assert [
+            (item["user"], item["similarity"]) for item in response.json()
+        ] == [(third_user.id, 1.0), (another_user.id, 1.0)], (
+            "Проверьте, что изменения интересов учитываются и что "
+            "коэффициент перекрытия считается верно."
+        )
+
+    @pytest.mark.parametrize(
+        "params", [{"metric": "cosine"}, {"limit": "0"}, {"limit": "101"}]
+    )
+    def test_similar_users_invalid_params(self, user_client, params):
+        """Проверка ошибки при неизвестной мере сходства или limit."""
+        response = user_client.get(self.url, params)
+        assert (
+            response.status_code == HTTPStatus.BAD_REQUEST
+        ), "Проверьте, что параметры запроса проверяются."
+
+
+@pytest.mark.django_db(transaction=True)
+class TestUserInterestsUpdate:
+    """Тесты изменения интересов пользователя."""
+
+    def patch_interests(self, client, user, interests):
+        """Изменение интересов пользователя через API."""
+        return client.patch(
+            f"{API_URL}/users/{user.id}/",
+            {"interests": [{"name": interest.name} for interest in interests]},
+            format="json",
+        )
+
+    def test_update_interests(self, user_client, user):
+        """Проверка числа запросов и счетчиков популярности."""
+        interests = Interest.objects.bulk_create(
+            Interest(name=f"Интерес {number}") for number in range(20)
+        )
+        with CaptureQueriesContext(connection) as few:
+            response = self.patch_interests(user_client, user, interests[:2])
+        assert response.status_code == HTTPStatus.OK
+        self.patch_interests(user_client, user, [])
+        with CaptureQueriesContext(connection) as many:
+            response = self.patch_interests(user_client, user, interests)
+        assert len(response.json()["interests"]) == 20
+        assert len(many) == len(
+            few
+        ), "Проверьте, что число запросов не зависит от числа интересов."
+        response = self.patch_interests(user_client, user, interests[15:])
+        assert {item["name"] for item in response.json()["interests"]} == {
+            interest.name for interest in interests[15:]
+        }
+        counters = dict(Interest.objects.values_list("id", "counter"))
+        counters = [counters[interest.id] for interest in interests]
+        assert (
+            counters == [0] * 15 + [1] * 5
+        ), "Проверьте, что счетчики интересов изменяются при обновлении."
+
+    def test_update_unknown_interest(self, user_client, user):
+        """Проверка ошибки при неизвестном интересе."""
+        response = self.patch_interests(
+            user_client, user, [Interest(name="Неизвестный")]
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_recount_interests(self, user, another_user, interests):
+        """Проверка пересчета счетчиков интересов."""
+        user.interests.add(*interests)
+        another_user.interests.add(interests[0])
+        Interest.objects.update(counter=10)
+        call_command("recount_interests")
+        assert list(
+            Interest.objects.order_by("id").values_list("counter", flat=True)
+        ) == [2, 1, 1], "Проверьте пересчет счетчиков интересов."
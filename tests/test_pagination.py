@@ -0,0 +1,85 @@
+from http import HTTPStatus
+
+import pytest
+from django.utils import timezone
+
+from events.models import Event
+from notifications.models import Notification
+
+API_URL = "/api/v1"
+
+
+def get_all_pages(client, url, params):
+    """Обход всех страниц курсорной пагинации."""
+    pages = []
+    response = client.get(url, {"pagination": "cursor", **params})
+    while True:
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        pages.append([item["id"] for item in data["results"]])
+        if data["next"] is None:
+            return pages
+        response = client.get(data["next"])
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCursorPagination:
+    """Тесты курсорной пагинации списков."""
+
+    def test_users_cursor_pagination(
+        self, user_client, user, another_user, third_user
+    ):
+        """Проверка обхода пользователей по курсору."""
+        pages = get_all_pages(user_client, f"{API_URL}/users/", {"limit": 2})
+        assert pages == [[third_user.id, another_user.id], [user.id]], (
+            "Проверьте, что пользователи выводятся по убыванию id без "
+            "пропусков и повторов."
+        )
+        response = user_client.get(f"{API_URL}/users/")
+        assert (
+            "count" in response.json()
+        ), "Проверьте, что по умолчанию используется постраничный режим."
+
+    def test_events_cursor_pagination(self, user_client, city):
+        """Проверка обхода мероприятий с одинаковой датой начала."""
+        start_date = timezone.now()
+        events = Event.objects.bulk_create(
+            Event(
+                name=f"Мероприятие {number}",
+                description="Описание",
+                event_type="Тип",
+                start_date=start_date,
+                city=city,
+            )
+            for number in range(5)
+        )
+        pages = get_all_pages(user_client, f"{API_URL}/events/", {"limit": 2})
+        assert pages == [
+            [events[0].id, events[1].id],
+            [events[2].id, events[3].id],
+            [events[4].id],
+        ], "Проверьте порядок мероприятий с одинаковой датой начала."
+
+    def test_notifications_cursor_pagination(self, user_client, user):
+        """Проверка обхода уведомлений по курсору."""
+        notifications = [
+            Notification.objects.create(recipient=user, message=str(number))
+            for number in range(3)
+        ]
+        pages = get_all_pages(
+            user_client, f"{API_URL}/notification/", {"limit": 2}
+        )
+        assert sum(pages, []) == [
+            notification.id for notification in reversed(notifications)
+        ], "Проверьте, что уведомления выводятся от новых к старым."
+        response = user_client.get(f"{API_URL}/notification/")
+        assert (
+            len(response.json()) == 3
+        ), "Проверьте, что по умолчанию уведомления выводятся без пагинации."
+
+    def test_invalid_cursor(self, user_client):
+        """Проверка ошибки при некорректном курсоре."""
+        response = user_client.get(
+            f"{API_URL}/users/", {"pagination": "cursor", "cursor": "abc"}
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND
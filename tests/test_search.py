@@ -0,0 +1,79 @@
+from http import HTTPStatus
+
+import pytest
+
+from api import search
+from users.models import City
+
+API_URL = "/api/v1"
+
+
+@pytest.mark.django_db(transaction=True)
+class TestFullTextSearch:
+    """Тесты полнотекстового поиска пользователей и мероприятий."""
+
+    def test_search_users(self, user_client, user, another_user, third_user):
+        """Проверка поиска пользователей по префиксам слов и email."""
+        url = f"{API_URL}/users/"
+        response = user_client.get(url, {"search": "юз ВТОР"})
+        assert response.status_code == HTTPStatus.OK
+        assert [item["id"] for item in response.json()["results"]] == [
+            another_user.id
+        ], "Проверьте, что все слова запроса ищутся как префиксы."
+        response = user_client.get(url, {"search": "testthree@test.ru"})
+        assert [item["id"] for item in response.json()["results"]] == [
+            third_user.id
+        ], "Проверьте поиск пользователя по email."
+
+    def test_search_users_ranked(self, user_client, user, another_user):
+        """Проверка сортировки пользователей по релевантности."""
+        user.first_name = "Ежик"
+        user.last_name = "Ёжиков"
+        user.save()
+        another_user.last_name = "Ежиков"
+        another_user.save()
+        response = user_client.get(f"{API_URL}/users/", {"search": "ежик"})
+        assert [item["id"] for item in response.json()["results"]] == [
+            user.id,
+            another_user.id,
+        ], (
+            "Проверьте, что буква ё не учитывается и пользователи "
+            "упорядочены по релевантности."
+        )
+
+    def test_search_events(self, user_client, event_1, event_2):
+        """Проверка поиска мероприятий и обновления документа города."""
+        url = f"{API_URL}/events/"
+        response = user_client.get(url, {"search": "event_type_2"})
+        assert response.status_code == HTTPStatus.OK
+        assert [item["id"] for item in response.json()["results"]] == [
+            event_2.id
+        ], "Проверьте поиск мероприятия по типу."
+        city = City.objects.get(id=event_1.city_id)
+        city.name = "Казань"
+        city.save()
+        response = user_client.get(url, {"search": "казан"})
+        assert {item["id"] for item in response.json()["results"]} == {
+            event_1.id,
+            event_2.id,
+        }, "Проверьте, что документы обновляются при изменении города."
+        event_2.delete()
+        response = user_client.get(url, {"search": "казан"})
+        assert [item["id"] for item in response.json()["results"]] == [
+            event_1.id
+        ], "Проверьте, что удаленное мероприятие не находится."
+
+    def test_search_city_not_renamed(self, monkeypatch, event_1):
+        """Проверка пропуска пересчета документов без смены названия."""
+        calls = []
+        monkeypatch.setattr(search, "update_city_documents", calls.append)
+        city = City.objects.get(id=event_1.city_id)
+        city.save()
+        city.save(update_fields=[])
+        assert calls == [], (
+            "Проверьте, что документы не пересчитываются, если название "
+            "города не изменилось."
+        )
+        city.name = "Казань"
+        city.save(update_fields=["name"])
+        assert calls == [city.id]
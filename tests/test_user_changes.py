@@ -1,6 +1,11 @@
 from http import HTTPStatus
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.querysets import FRIENDS_TOTAL, IS_FRIEND, annotate_users
+from users.models import Blacklist, Friendship, User
 
 API_URL = "/api/v1"
 
@@ -54,6 +59,65 @@ class TestUserChangesAPI:
                 response.status_code == HTTPStatus.UNAUTHORIZED
             ), f"Ошибка доступа `{test_data['detail']}`"
 
+    def test_user_list_num_queries(
+        self,
+        django_user_model,
+        user_client,
+        user,
+        another_user,
+        city,
+        interests,
+    ):
+        """Проверка постоянного числа запросов при получении списка."""
+
+        def create_user(number):
+            new_user = django_user_model.objects.create_user(
+                first_name="Тестовый",
+                last_name="Юзер",
+                email=f"user_{number}@mail.ru",
+                password="Qwerty123",
+                city=city,
+            )
+            new_user.interests.add(*interests)
+            Friendship.objects.create(initiator=new_user, friend=user)
+            Blacklist.objects.create(user=user, blocked_user=new_user)
+
+        create_user(1)
+        # Первый запрос заполняет кэши связей пользователя
+        user_client.get(self.objects_url)
+        with CaptureQueriesContext(connection) as small_page:
+            response = user_client.get(self.objects_url)
+        assert len(response.json()["results"]) == 3
+        for number in range(2, 5):
+            create_user(number)
+        with CaptureQueriesContext(connection) as large_page:
+            response = user_client.get(self.objects_url)
+        assert len(response.json()["results"]) == 6
+        assert len(large_page) == len(small_page), (
+            "Проверьте, что число запросов при получении списка "
+            "пользователей не зависит от размера страницы."
+        )
+
+    def test_user_list_friend_annotations(
+        self, user, another_user, third_user
+    ):
+        """Проверка аннотаций дружбы, хранящейся парой строк."""
+        # Обратная строка дружбы создается сигналом
+        Friendship.objects.create(initiator=another_user, friend=user)
+        Friendship.objects.create(initiator=user, friend=third_user)
+        users = annotate_users(
+            User.objects.filter(pk__in=[another_user.pk, third_user.pk]),
+            user,
+        ).in_bulk()
+        for friend in (another_user, third_user):
+            assert getattr(
+                users[friend.pk], IS_FRIEND
+            ), "Проверьте, что дружба учитывается независимо от инициатора."
+        total = annotate_users(User.objects.filter(pk=user.pk), user).get()
+        assert (
+            getattr(total, FRIENDS_TOTAL) == 2
+        ), "Проверьте, что каждый друг учитывается один раз."
+
     @pytest.mark.skip(reason="Необходимо пофиксить поведение анонимного юзера")
     def test_user_put_not_auth(self, client, user):
         """Проверка изменения неавторизованного пользователя."""